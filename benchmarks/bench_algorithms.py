@@ -0,0 +1,232 @@
+"""
+Benchmarks for the LSB, LSBM and RLSB encoders and decoders.
+
+Run from the project directory:
+
+    python -m benchmarks.bench_algorithms --quick --output results.json
+    python -m benchmarks.bench_algorithms --baseline baseline.json --threshold 0.15
+
+Each case is timed over several repeats (the fastest run is kept) and run once
+more under tracemalloc to record the peak of Python and NumPy allocations.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import PIL
+from PIL import Image
+
+from src.algorithms.lsb import encode_lsb, decode_lsb
+from src.algorithms.lsbm import encode_lsbm, decode_lsbm
+from src.algorithms.rlsb import encode_rlsb, decode_rlsb
+from src.algorithms.payload import payload_capacity
+
+FORMAT_VERSION = 1
+SEED = 12345
+
+SIZES = (0.1, 1.0, 5.0, 12.0, 24.0, 50.0)  # Megapixels
+FILLS = (0.01, 0.1, 0.5, 1.0)  # Fraction of the cover's capacity used by the payload
+MODES = ('RGB', 'RGBA')
+ALGORITHMS = ('lsb', 'lsbm', 'rlsb')
+QUICK_SIZES = (0.1, 1.0)
+QUICK_FILLS = (0.01, 1.0)
+
+ENCODERS = {
+    'lsb': lambda image, payload: encode_lsb(image, payload),
+    'lsbm': lambda image, payload: encode_lsbm(image, payload, SEED),
+    'rlsb': lambda image, payload: encode_rlsb(image, payload, SEED),
+}
+DECODERS = {
+    'lsb': lambda image: decode_lsb(image, strict=True),
+    'lsbm': lambda image: decode_lsbm(image, strict=True),
+    'rlsb': lambda image: decode_rlsb(image, SEED, strict=True),
+}
+
+
+def make_cover(megapixels, mode, rng):
+    """
+    Build a noise cover of roughly the given size with a 4:3 aspect ratio.
+    """
+    width = max(1, int(math.sqrt(megapixels * 1e6 * 4 / 3)))
+    height = max(1, int(megapixels * 1e6 / width))
+    bands = len(mode)
+    pixels = rng.integers(0, 256, size=(height, width, bands), dtype=np.uint8)
+    return Image.frombytes(mode, (width, height), pixels.tobytes())
+
+
+def measure(function, repeat):
+    """
+    Time a call over several repeats, then run it once under tracemalloc.
+
+    Returns:
+    tuple: (fastest seconds, peak traced bytes, result of the last call)
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def case_id(case):
+    return f"{case['algorithm']}-{case['operation']}-{case['megapixels']}MP-{case['mode']}-fill{case['fill']}"
+
+
+def run_grid(sizes=SIZES, fills=FILLS, modes=MODES, algorithms=ALGORITHMS, repeat=3, progress=None):
+    """
+    Run every combination of cover size, payload fill, cover mode and algorithm.
+
+    Parameters:
+    sizes (iterable): Cover sizes in megapixels.
+    fills (iterable): Payload sizes as fractions of the cover's capacity.
+    modes (iterable): Pillow modes of the covers.
+    algorithms (iterable): Algorithms to run.
+    repeat (int): Timed runs per case; the fastest is kept.
+    progress (callable): Called with each result as it completes.
+
+    Returns:
+    list: One result per encode and decode case.
+    """
+    rng = np.random.default_rng(SEED)
+    results = []
+    for megapixels in sizes:
+        for mode in modes:
+            cover = make_cover(megapixels, mode, rng)
+            pixels = cover.width * cover.height
+            for fill in fills:
+                payload_size = max(1, int(payload_capacity(pixels * len(mode), 1, len(mode)) * fill))
+                payload = rng.integers(0, 256, size=payload_size, dtype=np.uint8).tobytes()
+                for algorithm in algorithms:
+                    base = {'algorithm': algorithm, 'megapixels': megapixels, 'mode': mode, 'fill': fill,
+                            'width': cover.width, 'height': cover.height, 'payload_bytes': payload_size}
+                    encoded = None
+                    for operation in ('encode', 'decode'):
+                        case = dict(base, operation=operation)
+                        case['id'] = case_id(case)
+                        try:
+                            if operation == 'encode':
+                                seconds, peak, encoded = measure(lambda: ENCODERS[algorithm](cover, payload), repeat)
+                            else:
+                                if encoded is None:
+                                    raise RuntimeError('encode failed')
+                                seconds, peak, decoded = measure(lambda: DECODERS[algorithm](encoded), repeat)
+                                if decoded != payload:
+                                    raise RuntimeError('decoded payload does not match')
+                            case.update(status='ok', seconds=seconds, peak_bytes=peak,
+                                        pixels_per_second=pixels / seconds if seconds else math.inf,
+                                        bytes_per_second=payload_size / seconds if seconds else math.inf)
+                        except Exception as e:
+                            case.update(status='error', error=f"{type(e).__name__}: {e}")
+                        results.append(case)
+                        if progress is not None:
+                            progress(case)
+    return results
+
+
+def build_report(results):
+    return {
+        'format': FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pillow': PIL.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare two reports case by case.
+
+    Parameters:
+    baseline (dict): The stored report.
+    current (dict): The new report.
+    threshold (float): The allowed slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+    list: (case id, baseline seconds, current seconds, ratio) for every case
+    that got slower by more than the threshold or stopped working.
+    """
+    previous = {case['id']: case for case in baseline['results'] if case.get('status') == 'ok'}
+    regressions = []
+    for case in current['results']:
+        before = previous.get(case['id'])
+        if before is None:
+            continue
+        if case.get('status') != 'ok':
+            regressions.append((case['id'], before['seconds'], None, math.inf))
+            continue
+        ratio = case['seconds'] / before['seconds'] if before['seconds'] else math.inf
+        if ratio > 1 + threshold:
+            regressions.append((case['id'], before['seconds'], case['seconds'], ratio))
+    return regressions
+
+
+def format_result(case):
+    if case['status'] != 'ok':
+        return f"{case['id']:<45} {case['error']}"
+    return (f"{case['id']:<45} {case['seconds'] * 1000:10.2f} ms {case['pixels_per_second'] / 1e6:10.1f} MP/s "
+            f"{case['bytes_per_second'] / 1e6:10.2f} MB/s {case['peak_bytes'] / 2**20:9.1f} MiB peak")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the steganography algorithms")
+    parser.add_argument('--sizes', type=float, nargs='+', help='Cover sizes in megapixels')
+    parser.add_argument('--fills', type=float, nargs='+', help='Payload sizes as fractions of capacity')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), help='Cover modes')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=list(ALGORITHMS), help='Algorithms to run')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the fastest is kept')
+    parser.add_argument('--quick', action='store_true', help=f'Use the small grid {QUICK_SIZES} MP x fills {QUICK_FILLS}')
+    parser.add_argument('--output', type=str, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', type=str, help='Compare against this results file and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown against the baseline (default 0.10)')
+    parser.add_argument('--current', type=str, help='Compare this results file against --baseline instead of running')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.current:
+        with open(args.current, encoding='utf-8') as current_file:
+            report = json.load(current_file)
+    else:
+        sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+        fills = args.fills or (QUICK_FILLS if args.quick else FILLS)
+        results = run_grid(sizes, fills, args.modes, args.algorithms, args.repeat, lambda case: print(format_result(case)))
+        report = build_report(results)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output_file:
+                json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, report, args.threshold)
+        for case, before, after, ratio in regressions:
+            after_text = 'failed' if after is None else f"{after * 1000:.2f} ms ({ratio:.2f}x)"
+            print(f"REGRESSION {case}: {before * 1000:.2f} ms -> {after_text}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
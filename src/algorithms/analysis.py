@@ -0,0 +1,291 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from .bitplane import cover_image, pixel_array
+from .metrics import stage
+
+# Score at or above which an image is flagged as likely carrying an LSB payload
+DEFAULT_THRESHOLD = 0.1
+
+# Pixel groups RS analysis looks at. Larger images are sampled by evenly spaced
+# rows, which keeps its cost flat while the estimate stays within about a
+# percent of the one from every group.
+RS_MAX_GROUPS = 1 << 20
+
+# Pair codes counted per np.bincount call, so the widened copy it makes stays in cache
+HISTOGRAM_CHUNK = 1 << 18
+
+# Pairs of values expected less often than this are left out of the chi-square test
+CHI_SQUARE_MIN_EXPECTED = 5
+
+
+class ChannelPlanes:
+    """
+    The channel values of an 8-bit image, laid out once for all three tests.
+
+    Each band is stored as its own plane, cropped to a multiple of 4 columns, so
+    horizontally adjacent values of a band are adjacent bytes. Every pair of
+    bytes is then a 16-bit pair code, right value << 8 | left value, and the
+    codes are views of the planes rather than copies:
+
+    - codes of the disjoint pairs (0, 1), (2, 3), ... give the pair histogram,
+      from which the chi-square and sample pair tests are computed;
+    - codes of pairs (0, 1), (1, 2) and (2, 3) of each group of 4 values index
+      the lookup tables of RS analysis.
+    """
+
+    def __init__(self, pixels: np.ndarray):
+        """
+        Parameters:
+            pixels (np.ndarray): A (height, width, bands) uint8 array.
+        """
+        if pixels.dtype != np.uint8:
+            raise ValueError(f"Steganalysis needs 8-bit channels, got {pixels.dtype}")
+        width = pixels.shape[1] // 4 * 4
+        if width == 0 or pixels.shape[0] == 0:
+            raise ValueError("The image is too small to analyze; it needs at least 4 columns")
+        self.values = np.ascontiguousarray(pixels[:, :width].transpose(2, 0, 1))
+        self._pair_histogram = None
+
+    @property
+    def pair_histogram(self) -> np.ndarray:
+        """
+        Counts of the disjoint horizontal pairs as a (256, 256) array indexed [right, left].
+        """
+        if self._pair_histogram is None:
+            codes = self.values.reshape(-1).view('<u2')
+            counts = np.zeros(1 << 16, dtype=np.int64)
+            for start in range(0, codes.size, HISTOGRAM_CHUNK):
+                counts += np.bincount(codes[start:start + HISTOGRAM_CHUNK], minlength=1 << 16)
+            self._pair_histogram = counts.reshape(256, 256)
+        return self._pair_histogram
+
+    @property
+    def histogram(self) -> np.ndarray:
+        """
+        Counts of each channel value.
+        """
+        pairs = self.pair_histogram
+        return pairs.sum(axis=0) + pairs.sum(axis=1)
+
+    def group_codes(self, max_groups: int = RS_MAX_GROUPS):
+        """
+        Returns the pair codes of values (0, 1), (1, 2) and (2, 3) of each group
+        of 4 values, as three (rows, groups per row) arrays, from evenly spaced
+        rows when the image has more than max_groups groups.
+        """
+        bands, height, width = self.values.shape
+        rows = bands * height
+        step = max(1, -(-rows * (width // 4) // max_groups))
+        count = -(-rows // step)
+        buffer = self.values.reshape(-1)
+
+        def view(offset):
+            return np.ndarray((count, width // 4), dtype='<u2', buffer=buffer, offset=offset,
+                              strides=(step * width, 4))
+
+        return view(0), view(1), view(2)
+
+
+def _flip(values):
+    # F1: the LSB flip of LSB replacement
+    return values ^ 1
+
+
+def _shifted_flip(values):
+    # F-1: the flip between the pairs (2k - 1, 2k), taking 0 to -1 and 255 to 256
+    return ((values + 1) ^ 1) - 1
+
+
+@lru_cache(maxsize=None)
+def _rs_tables():
+    """
+    Lookup tables giving, for each pair code, how flipping the middle two values
+    of a group changes one term of its smoothness |x1 - x0| + |x2 - x1| + |x3 - x2|.
+
+    Each table entry packs four changes as bytes, biased by 2 so they stay
+    positive: flipping with F1, with F-1, and the same two on the image with
+    every LSB flipped. The three tables are for the terms of pairs (0, 1),
+    (1, 2) and (2, 3); summing their entries gives each group's four changes,
+    biased by 6, without carries between the bytes.
+    """
+    codes = np.arange(1 << 16, dtype=np.int32)
+    left, right = codes & 0xFF, codes >> 8
+    tables = [np.zeros(1 << 16, dtype='<u4') for _ in range(3)]
+    variants = [(flip, inverted) for inverted in (False, True) for flip in (_flip, _shifted_flip)]
+    for byte, (flip, inverted) in enumerate(variants):
+        u, v = (left ^ 1, right ^ 1) if inverted else (left, right)
+        smoothness = np.abs(v - u)
+        changes = (np.abs(flip(v) - u), np.abs(flip(v) - flip(u)), np.abs(v - flip(u)))
+        for table, changed in zip(tables, changes):
+            table += ((changed - smoothness + 2) << (8 * byte)).astype(np.uint32)
+    return tuple(tables)
+
+
+@lru_cache(maxsize=None)
+def _sample_pair_masks():
+    """
+    Masks over the pair histogram selecting the sample pair sets X, Y and the
+    pairs whose values differ at most in their LSB.
+    """
+    right = np.arange(256)[:, np.newaxis]
+    left = np.arange(256)[np.newaxis, :]
+    even = right % 2 == 0
+    x = (even & (left < right)) | (~even & (left > right))
+    y = (even & (left > right)) | (~even & (left < right))
+    close = (left >> 1) == (right >> 1)
+    return x, y, close
+
+
+def _smaller_root(a: float, b: float, c: float) -> float:
+    # The root of a z^2 + b z + c nearest zero; the real part when there is none
+    if abs(a) < 1e-12:
+        return -c / b if abs(b) > 1e-12 else 0.0
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return -b / (2 * a)
+    roots = ((-b + math.sqrt(discriminant)) / (2 * a), (-b - math.sqrt(discriminant)) / (2 * a))
+    return min(roots, key=abs)
+
+
+def _clip(rate: float) -> float:
+    return min(1.0, max(0.0, rate))
+
+
+def _gamma_survival(a: float, x: float) -> float:
+    """
+    Returns the regularized upper incomplete gamma function Q(a, x).
+    """
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # Series for the lower function P(a, x)
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Continued fraction for Q(a, x), by Lentz's method
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    fraction = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        fraction *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return fraction * math.exp(log_prefix)
+
+
+def chi_square(planes: ChannelPlanes) -> float:
+    """
+    The chi-square attack of Westfeld and Pfitzmann. LSB replacement with random
+    bits evens out the counts of each pair of values 2k and 2k + 1; the test
+    measures how even they are.
+
+    Returns:
+        float: The probability that the image carries a payload in every LSB.
+        Payloads that fill only part of the image score low, and clean images
+        with smooth histograms can score high.
+    """
+    counts = planes.histogram.astype(np.float64)
+    observed = counts[0::2]
+    expected = (counts[0::2] + counts[1::2]) / 2
+    kept = expected >= CHI_SQUARE_MIN_EXPECTED
+    categories = int(kept.sum())
+    if categories < 2:
+        return 0.0
+    statistic = float((((observed[kept] - expected[kept]) ** 2) / expected[kept]).sum())
+    return _gamma_survival((categories - 1) / 2, statistic / 2)
+
+
+def rs_analysis(planes: ChannelPlanes, max_groups: int = RS_MAX_GROUPS) -> float:
+    """
+    RS (regular/singular groups) analysis of Fridrich, Goljan and Du, with
+    groups of 4 horizontally adjacent values and the mask [0, 1, 1, 0].
+
+    Returns:
+        float: The estimated fraction of channel values that carry payload bits,
+        between 0 and 1.
+    """
+    first, middle, last = _rs_tables()
+    pairs = planes.group_codes(max_groups)
+    sums = first[pairs[0]]
+    sums += middle[pairs[1]]
+    sums += last[pairs[2]]
+    changes = sums.view(np.uint8).reshape(-1, 4)
+    groups = changes.shape[0]
+    if not groups:
+        return 0.0
+    # Regular minus singular groups, as a fraction of all groups, for each variant
+    differences = [float(np.count_nonzero(changes[:, byte] > 6) - np.count_nonzero(changes[:, byte] < 6)) / groups
+                   for byte in range(4)]
+    d0, d_inverse0, d1, d_inverse1 = differences
+    z = _smaller_root(2 * (d1 + d0), d_inverse0 - d_inverse1 - d1 - 3 * d0, d0 - d_inverse0)
+    return _clip(z / (z - 0.5)) if z != 0.5 else 1.0
+
+
+def sample_pairs(planes: ChannelPlanes) -> float:
+    """
+    Sample pair analysis of Dumitrescu, Wu and Wang, on horizontally adjacent pairs.
+
+    Returns:
+        float: The estimated fraction of channel values that carry payload bits,
+        between 0 and 1.
+    """
+    counts = planes.pair_histogram
+    x_mask, y_mask, close_mask = _sample_pair_masks()
+    total = float(counts.sum())
+    x, y, close = (float(counts[mask].sum()) for mask in (x_mask, y_mask, close_mask))
+    return _clip(_smaller_root(close / 2, 2 * x - total, y - x))
+
+
+def analyze_pixels(pixels: np.ndarray, max_groups: int = RS_MAX_GROUPS) -> dict:
+    """
+    Runs the three tests on a (height, width, bands) uint8 pixel array.
+
+    Returns:
+        dict: 'chi_square', 'rs' and 'sample_pairs' as returned by the tests,
+        and 'score', the larger of the two estimated embedding rates. The
+        chi-square probability is left out of the score: it is also high for
+        clean images with smooth histograms.
+    """
+    with stage('analyze', pixels=pixels.shape[0] * pixels.shape[1], nbytes=pixels.nbytes):
+        planes = ChannelPlanes(pixels)
+        scores = {
+            'chi_square': chi_square(planes),
+            'rs': rs_analysis(planes, max_groups),
+            'sample_pairs': sample_pairs(planes),
+        }
+    scores['score'] = max(scores['rs'], scores['sample_pairs'])
+    return scores
+
+
+def analyze_image(image: Image.Image, max_groups: int = RS_MAX_GROUPS) -> dict:
+    """
+    Screens an image for an LSB payload in every band it would be embedded into.
+
+    Parameters:
+        image (Image.Image): The image to analyze. Palette images are analyzed
+            in their colors; 16-bit images are not supported.
+        max_groups (int): The most pixel groups RS analysis samples.
+
+    Returns:
+        dict: The scores, as returned by analyze_pixels.
+    """
+    return analyze_pixels(pixel_array(cover_image(image)), max_groups)
@@ -0,0 +1,136 @@
+from functools import partial
+import numpy as np
+from PIL import Image
+
+from .bitplane import BitReader, MAX_BITS_PER_CHANNEL, cover_image, pixel_array, iter_lsb_bits, iter_order_bits
+from .payload import MAGIC, HEADER, HEADER_SIZE, ALGORITHM_NAMES, PayloadError, read_payload
+from .permutation import ORDERINGS, pixel_order
+
+# Confidence of a framed payload whose checksum matched
+FRAMED_CONFIDENCE = 1.0
+
+# Highest confidence of a legacy delimiter-terminated message, which carries no checksum
+LEGACY_CONFIDENCE = 0.5
+
+# A legacy message this long and fully printable scores LEGACY_CONFIDENCE
+LEGACY_FULL_LENGTH = 16
+
+# Legacy messages with a smaller share of printable ASCII are treated as noise
+MIN_PRINTABLE = 0.95
+
+
+def _legacy_confidence(message) -> float:
+    """
+    Scores a legacy message by how much of it is printable ASCII. Noise read
+    through the wrong algorithm or seed is mostly unprintable, and usually hits
+    a zero byte within a few hundred characters.
+    """
+    if not message:
+        return 0.0
+    printable = sum(1 for char in message if ' ' <= char <= '~' or char in '\t\r\n') / len(message)
+    if printable < MIN_PRINTABLE:
+        return 0.0
+    return LEGACY_CONFIDENCE * printable * min(1.0, len(message) / LEGACY_FULL_LENGTH)
+
+
+def _framed_algorithm(bit_source):
+    """
+    Returns the algorithm recorded in a frame header read from bit_source,
+    or None when there is no frame.
+    """
+    header = BitReader(bit_source(0, 1)).read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        return None
+    return ALGORITHM_NAMES.get(HEADER.unpack(header)[2])
+
+
+def _evaluate(bit_source, algorithm, channels, bands, framed, candidate):
+    """
+    Decodes one candidate and fills in its confidence and message or error.
+    """
+    try:
+        message = read_payload(bit_source, algorithm, channels, strict=framed, bands=bands)
+    except PayloadError as e:
+        candidate.update(confidence=0.0, error=str(e))
+        return candidate
+    confidence = FRAMED_CONFIDENCE if framed else _legacy_confidence(message)
+    candidate.update(confidence=confidence, framed=framed, message=message)
+    return candidate
+
+
+def detect_payload(image: Image.Image, seeds=(), orderings=ORDERINGS, exhaustive: bool = False) -> list:
+    """
+    Tries every algorithm on an image, ranking the candidates by how likely they
+    are to hold a real message.
+
+    The low bit planes are extracted once and shared: LSB and LSBM read them in
+    row-major order, which the frame header tells apart, and each RLSB seed and
+    ordering reads them through its own permutation. Framed payloads are
+    verified by their checksum; legacy messages are scored on how printable
+    they are. Legacy LSB and LSBM messages cannot be told apart and are
+    reported as LSB.
+
+    Parameters:
+        image (Image.Image): The image to examine.
+        seeds (Iterable[int]): The RLSB seeds to try.
+        orderings (Iterable[str]): The RLSB pixel orderings to try with each seed.
+        exhaustive (bool): Evaluate every candidate instead of stopping at the first
+            framed payload with a valid checksum.
+
+    Returns:
+        list: One dictionary per candidate evaluated, best first, with 'algorithm',
+        'seed', 'ordering' and 'confidence' (0 to 1) keys, plus 'message' and
+        'framed' for candidates that decoded or 'error' for those that did not.
+    """
+    width, height = image.size
+    # Keep only the bits any decoder can read; one pass over the pixels serves every candidate
+    planes = (pixel_array(cover_image(image)) & ((1 << MAX_BITS_PER_CHANNEL) - 1)).astype(np.uint8, copy=False)
+    bands = planes.shape[2]
+    channels = width * height * bands
+
+    candidates = []
+
+    def finish():
+        return sorted(candidates, key=lambda candidate: candidate['confidence'], reverse=True)
+
+    bit_source = partial(iter_lsb_bits, planes)
+    found = _framed_algorithm(bit_source)
+    algorithm = found if found in ('lsb', 'lsbm') else 'lsb'
+    candidate = {'algorithm': algorithm, 'seed': None, 'ordering': None}
+    candidates.append(_evaluate(bit_source, algorithm, channels, bands, found is not None, candidate))
+    if candidate['confidence'] == FRAMED_CONFIDENCE and not exhaustive:
+        return finish()
+
+    for seed in seeds:
+        for ordering in orderings:
+            order = pixel_order(width, height, seed, ordering)
+            bit_source = partial(iter_order_bits, planes, order)
+            candidate = {'algorithm': 'rlsb', 'seed': seed, 'ordering': ordering}
+            framed = _framed_algorithm(bit_source) is not None
+            candidates.append(_evaluate(bit_source, 'rlsb', channels, bands, framed, candidate))
+            if candidate['confidence'] == FRAMED_CONFIDENCE and not exhaustive:
+                return finish()
+
+    return finish()
+
+
+def decode_auto(image: Image.Image, seeds=(), orderings=ORDERINGS):
+    """
+    Decodes a message without knowing which algorithm embedded it.
+
+    Parameters:
+        image (Image.Image): The input image from which the message will be decoded.
+        seeds (Iterable[int]): The RLSB seeds to try.
+        orderings (Iterable[str]): The RLSB pixel orderings to try with each seed.
+
+    Returns:
+        tuple: (message, candidate), where candidate is the best entry from detect_payload.
+
+    Raises:
+        PayloadError: If no candidate decoded to a plausible message.
+    """
+    candidates = detect_payload(image, seeds, orderings)
+    best = candidates[0]
+    if best['confidence'] == 0:
+        raise PayloadError("No algorithm or seed decoded a message")
+    return best['message'], best
@@ -0,0 +1,556 @@
+import itertools
+import numpy as np
+from PIL import Image
+
+from .metrics import stage
+
+DELIMITER = b'\x00'  # Marks the end of the message
+FIRST_CHUNK_PIXELS = 1 << 10  # Pixels in the first chunk read when streaming
+CHUNK_PIXELS = 1 << 16  # Largest chunk read when streaming
+MAX_BITS_PER_CHANNEL = 4
+MAX_IMAGE_PASSES = 16  # Most passes embed_ordered and iter_order_bits make over an image
+DIRECT_PIXEL_COST = 128  # Pixels copied with a band of rows in the time one is accessed on its own
+
+# Modes embedded into as they are, with the type of their channel values. Every
+# band carries payload, so RGBA covers hold a third more than RGB ones.
+NATIVE_MODES = {
+    'RGB': np.uint8, 'RGBA': np.uint8, 'CMYK': np.uint8, 'L': np.uint8, 'LA': np.uint8,
+    'I;16': np.dtype('<u2'), 'I;16L': np.dtype('<u2'), 'I;16B': np.dtype('>u2'),
+}
+
+# Modes that are expanded before embedding. The low bits of palette indices
+# select unrelated colors, so palette images are embedded into their colors,
+# and the output is RGB, or RGBA when the palette has transparency.
+EXPANDED_MODES = {'P': 'RGB', 'PA': 'RGBA', '1': 'L'}
+
+
+def message_to_bits(message: str) -> np.ndarray:
+    """
+    Converts a message into a flat array of bits, followed by the delimiter byte.
+    
+    Parameters:
+        message (str): The message to convert. Each character must fit in one byte.
+    
+    Returns:
+        np.ndarray: A uint8 array holding one bit (0 or 1) per element, most significant bit first.
+    """
+    data = np.frombuffer(message.encode('latin-1') + DELIMITER, dtype=np.uint8)
+    return np.unpackbits(data)
+
+
+def check_bits_per_channel(bits_per_channel: int):
+    """
+    Raises ValueError unless bits_per_channel is between 1 and MAX_BITS_PER_CHANNEL.
+    """
+    if not 1 <= bits_per_channel <= MAX_BITS_PER_CHANNEL:
+        raise ValueError(f"bits_per_channel must be between 1 and {MAX_BITS_PER_CHANNEL}, got {bits_per_channel}")
+
+
+def embed_bits(channels: np.ndarray, bits: np.ndarray, bits_per_channel: int = 1) -> int:
+    """
+    Writes bits into the low bits of a flat channel array, in place.
+    
+    Parameters:
+        channels (np.ndarray): A flat uint8 or uint16 array of channel values to modify.
+        bits (np.ndarray): The bits to embed. Bits that do not fit are dropped.
+        bits_per_channel (int): How many low bits of each channel carry payload,
+            most significant first. A final partial group is padded with zeros.
+    
+    Returns:
+        int: The number of bits embedded.
+    """
+    # The mask has the channels' own type, so 16-bit values keep their high byte
+    mask = np.invert(channels.dtype.type((1 << bits_per_channel) - 1))
+    if bits_per_channel == 1:
+        count = min(bits.size, channels.size)
+        channels[:count] = (channels[:count] & mask) | bits[:count]
+        return count
+
+    count = min(bits.size, channels.size * bits_per_channel)
+    used = -(-count // bits_per_channel)
+    groups = np.zeros(used * bits_per_channel, dtype=np.uint8)
+    groups[:count] = bits[:count]
+    weights = (1 << np.arange(bits_per_channel - 1, -1, -1)).astype(np.uint8)
+    values = groups.reshape(used, bits_per_channel) @ weights
+
+    channels[:used] = (channels[:used] & mask) | values
+    return count
+
+
+def match_bits(channels: np.ndarray, bits: np.ndarray, rng: np.random.Generator) -> int:
+    """
+    Embeds bits with LSB matching, in place: each channel whose LSB differs from
+    its bit is moved up or down by one at random, wrapping around at 0 and the
+    largest value (255, or 65535 for 16-bit channels).
+    
+    Parameters:
+        channels (np.ndarray): A flat uint8 or uint16 array of channel values to modify.
+        bits (np.ndarray): The bits to embed. Bits that do not fit are dropped.
+        rng (np.random.Generator): The generator the +1/-1 steps are drawn from.
+    
+    Returns:
+        int: The number of bits embedded.
+    """
+    count = min(bits.size, channels.size)
+    mismatched = np.flatnonzero((channels[:count] & 0x01) != bits[:count])
+
+    # Draw every step in one batch
+    steps = rng.choice(np.array([-1, 1], dtype=np.int16), size=mismatched.size)
+    maximum = np.iinfo(channels.dtype).max
+    wide = np.int16 if maximum == 0xFF else np.int32
+    channels[mismatched] = (channels[mismatched].astype(wide) + steps) & maximum
+    return count
+
+
+def extract_bits(channels: np.ndarray, bits_per_channel: int = 1) -> np.ndarray:
+    """
+    Reads the low bits of every value in a flat channel array.
+    
+    Parameters:
+        channels (np.ndarray): A flat uint8 or uint16 array of channel values.
+        bits_per_channel (int): How many low bits of each channel to read.
+    
+    Returns:
+        np.ndarray: A uint8 array holding bits_per_channel bits per channel value,
+        most significant first.
+    """
+    if bits_per_channel == 1:
+        bits = channels & 0x01
+    else:
+        shifts = np.arange(bits_per_channel - 1, -1, -1, dtype=np.uint8)
+        bits = ((channels[:, np.newaxis] >> shifts) & 0x01).reshape(-1)
+    return bits if bits.dtype == np.uint8 else bits.astype(np.uint8)
+
+
+def cover_mode(image) -> str:
+    """
+    Returns the mode an image is embedded into: its own mode if it is in
+    NATIVE_MODES, or the mode it is expanded to under EXPANDED_MODES.
+
+    Raises:
+        ValueError: If images of this mode cannot carry a payload.
+    """
+    if image.mode in NATIVE_MODES:
+        return image.mode
+    if image.mode == 'P' and 'transparency' in image.info:
+        return 'RGBA'
+    if image.mode in EXPANDED_MODES:
+        return EXPANDED_MODES[image.mode]
+    raise ValueError(f"Cannot embed in {image.mode} images; convert them to RGB first")
+
+
+def cover_image(image: Image.Image) -> Image.Image:
+    """
+    Returns the image itself if its mode is embedded into natively, or an expanded copy.
+    """
+    mode = cover_mode(image)
+    if mode == image.mode:
+        return image
+    with stage('convert', pixels=image.width * image.height):
+        return image.convert(mode)
+
+
+def pixel_array(image) -> np.ndarray:
+    """
+    Returns a copy of an image's pixels as a (height, width, bands) array of its channel type.
+    
+    Parameters:
+        image (Image.Image): An image whose mode is in NATIVE_MODES.
+    
+    Returns:
+        np.ndarray: The pixel data.
+    """
+    if image.mode not in NATIVE_MODES:
+        raise ValueError(f"Expected an image in one of {', '.join(NATIVE_MODES)}, got mode {image.mode!r}")
+    pixels = np.array(image)
+    return pixels.reshape(pixels.shape[0], pixels.shape[1], -1)
+
+
+def pixel_image(pixels: np.ndarray, mode: str) -> Image.Image:
+    """
+    Returns an image of the given mode holding a (height, width, bands) pixel array.
+    The image shares the array's memory when it is contiguous.
+    """
+    pixels = np.ascontiguousarray(pixels)
+    return Image.frombuffer(mode, (pixels.shape[1], pixels.shape[0]), pixels, 'raw', mode, 0, 1)
+
+
+def pixel_size(pixels) -> tuple:
+    """
+    Returns the (width, height) of an image or of a (height, width, bands) pixel array.
+    """
+    if isinstance(pixels, np.ndarray):
+        return pixels.shape[1], pixels.shape[0]
+    return pixels.size
+
+
+def pixel_bands(pixels) -> int:
+    """
+    Returns how many channels each pixel of an image or of a (height, width, bands) pixel array has.
+    """
+    if isinstance(pixels, np.ndarray):
+        return pixels.shape[2]
+    return len(pixels.getbands())
+
+
+def read_rows(pixels, top: int, bottom: int) -> np.ndarray:
+    """
+    Reads rows top to bottom of an image or pixel array as a (rows, width, bands) array.
+    Arrays, including memory maps, are sliced without copying; images are cropped.
+    """
+    if isinstance(pixels, np.ndarray):
+        return pixels[top:bottom]
+    return pixel_array(pixels.crop((0, top, pixels.width, bottom)))
+
+
+def write_rows(pixels, top: int, rows: np.ndarray):
+    """
+    Writes a (rows, width, bands) array back into an image or pixel array, starting at row top.
+    """
+    if isinstance(pixels, np.ndarray):
+        pixels[top:top + rows.shape[0]] = rows
+    else:
+        pixels.paste(pixel_image(rows, pixels.mode), (0, top))
+
+
+def _chunk_bounds(total: int, first: int, limit: int, start: int = 0):
+    # Chunks start small so short messages stop early, then double up to the limit
+    size = max(1, first)
+    while start < total:
+        yield start, min(start + size, total)
+        start += size
+        size = min(size * 2, max(1, limit))
+
+
+def iter_lsb_bits(pixels, start_pixel: int = 0, bits_per_channel: int = 1, chunk_pixels: int = CHUNK_PIXELS):
+    """
+    Yields the low-bit plane in row-major order, one band of rows at a time.
+    
+    Parameters:
+        pixels (Image.Image | np.ndarray): An image or a (height, width, bands) pixel array.
+        start_pixel (int): The row-major index of the first pixel to read.
+        bits_per_channel (int): How many low bits of each channel to read.
+        chunk_pixels (int): The approximate largest number of pixels per band.
+    
+    Yields:
+        np.ndarray: The bits of each band as a flat uint8 array.
+    """
+    width, height = pixel_size(pixels)
+    width = max(width, 1)
+    bands = pixel_bands(pixels)
+    first_row, skip = divmod(start_pixel, width)
+    for top, bottom in _chunk_bounds(height, FIRST_CHUNK_PIXELS // width, chunk_pixels // width, first_row):
+        channels = read_rows(pixels, top, bottom).reshape(-1)
+        if top == first_row:
+            channels = channels[skip * bands:]
+        yield extract_bits(channels, bits_per_channel)
+
+
+def iter_order_bits(pixels, order, start: int = 0, bits_per_channel: int = 1, chunk_pixels: int = CHUNK_PIXELS):
+    """
+    Yields the low bits of the pixels in the given order, one chunk at a time.
+
+    An image is read without copying its pixels, as embed_ordered writes one:
+    only the pixels of each chunk's positions are read, so reading the first
+    few positions costs the same whatever the image's size.
+    
+    Parameters:
+        pixels (Image.Image | np.ndarray): An image or a (height, width, bands) pixel array.
+        order: A pixel ordering whose take(start, stop) returns row-major pixel indices.
+        start (int): The position in the ordering to start reading at.
+        bits_per_channel (int): How many low bits of each channel to read.
+        chunk_pixels (int): The largest number of pixels per chunk.
+    
+    Yields:
+        np.ndarray: The bits of each chunk as a flat uint8 array.
+    """
+    width, height = pixel_size(pixels)
+    in_image = not isinstance(pixels, np.ndarray)
+    if in_image:
+        chunk_pixels = max(chunk_pixels, -(-width * height // MAX_IMAGE_PASSES))
+        band_rows = max(1, chunk_pixels // max(width, 1))
+    for begin, end in _chunk_bounds(len(order), FIRST_CHUNK_PIXELS, chunk_pixels, start):
+        if in_image:
+            selected = _read_bands(pixels, order.take(begin, end), band_rows)
+        else:
+            rows, columns = np.divmod(order.take(begin, end), width)
+            selected = pixels[rows, columns]
+        yield extract_bits(selected.reshape(-1), bits_per_channel)
+
+
+def embed_rows(pixels, bits: np.ndarray, embed=embed_bits, start_pixel: int = 0, chunk_pixels: int = CHUNK_PIXELS,
+               progress=None) -> int:
+    """
+    Embeds bits in row-major order, in place, one fixed-height band of rows at a time.
+    Only the bands that carry bits are read and written back.
+    
+    Parameters:
+        pixels (Image.Image | np.ndarray): An image or a (height, width, bands) pixel array to modify.
+        bits (np.ndarray): The bits to embed.
+        embed (callable): Embeds bits into a flat channel array and returns how many it took,
+            such as embed_bits or match_bits.
+        start_pixel (int): The row-major index of the first pixel to write.
+        chunk_pixels (int): The approximate number of pixels per band.
+        progress (callable, optional): Called as progress(bits_done, bits_total) after each band.
+            It may raise to abandon the embedding.
+    
+    Returns:
+        int: The number of bits embedded.
+    """
+    width, height = pixel_size(pixels)
+    bands = pixel_bands(pixels)
+    band_rows = max(1, chunk_pixels // max(width, 1))
+    first_row, skip = divmod(start_pixel, max(width, 1))
+    offset = 0
+    with stage('embed') as counts:
+        for top in range(first_row, height, band_rows):
+            if offset >= bits.size:
+                break
+            # Copy the band so strided views such as bottom-up memory maps flatten correctly
+            band = np.array(read_rows(pixels, top, min(top + band_rows, height)))
+            channels = band.reshape(-1)
+            if top == first_row:
+                channels = channels[skip * bands:]
+            offset += embed(channels, bits[offset:])
+            write_rows(pixels, top, band)
+            counts['pixels'] += band.shape[0] * band.shape[1]
+            if progress is not None:
+                progress(offset, bits.size)
+        counts['bytes'] = offset // 8
+    return offset
+
+
+def _position_bands(positions: np.ndarray, width: int, band_rows: int):
+    """
+    Groups row-major positions into bands of band_rows rows. Yields, for each
+    band, the indices into positions of its positions, in their order there,
+    those positions, and the rows from the first to the last of them, as
+    (selected, band_positions, top, bottom).
+    """
+    # A stable sort keeps each band's positions in payload order, so each one
+    # takes the same bits as on the copying path; small keys sort in linear time
+    band_ids = positions // (band_rows * width)
+    if band_ids.max() < (1 << 16):
+        band_ids = band_ids.astype(np.uint16)
+    by_band = np.argsort(band_ids, kind='stable')
+    splits = np.flatnonzero(np.diff(band_ids[by_band])) + 1
+    for selected in np.split(by_band, splits):
+        band_positions = positions[selected]
+        yield selected, band_positions, int(band_positions.min()) // width, int(band_positions.max()) // width + 1
+
+
+def _is_sparse(count: int, top: int, bottom: int, width: int) -> bool:
+    # Whether accessing count pixels one by one is cheaper than copying their rows
+    return count * DIRECT_PIXEL_COST < (bottom - top) * width
+
+
+def _get_pixels(access, positions: np.ndarray, width: int, bands: int, dtype) -> np.ndarray:
+    # The pixels at row-major positions, read one by one, as a (positions, bands) array
+    rows, columns = np.divmod(positions, width)
+    values = [access[x, y] for x, y in zip(columns.tolist(), rows.tolist())]
+    if bands > 1:
+        values = itertools.chain.from_iterable(values)
+    return np.fromiter(values, dtype=dtype, count=positions.size * bands).reshape(positions.size, bands)
+
+
+def _put_pixels(access, positions: np.ndarray, width: int, values: np.ndarray):
+    # Writes a (positions, bands) array to the pixels at row-major positions, one by one
+    rows, columns = np.divmod(positions, width)
+    single = values.shape[1] == 1
+    for x, y, value in zip(columns.tolist(), rows.tolist(), values.tolist()):
+        access[x, y] = value[0] if single else tuple(value)
+
+
+def _read_bands(image: Image.Image, positions: np.ndarray, band_rows: int) -> np.ndarray:
+    """
+    Reads an image's pixels at the given row-major positions as a (positions, bands)
+    array, reading only the bands of rows that hold them, or only the pixels
+    themselves where a band holds few.
+    """
+    width = image.width
+    bands = pixel_bands(image)
+    dtype = NATIVE_MODES[image.mode]
+    access = image.load()
+    values = np.empty((positions.size, bands), dtype=dtype)
+    for selected, band_positions, top, bottom in _position_bands(positions, width, band_rows):
+        if _is_sparse(band_positions.size, top, bottom, width):
+            values[selected] = _get_pixels(access, band_positions, width, bands, dtype)
+        else:
+            values[selected] = read_rows(image, top, bottom).reshape(-1, bands)[band_positions - top * width]
+    return values
+
+
+def _embed_bands(image: Image.Image, positions: np.ndarray, bits: np.ndarray, embed,
+                 bits_per_channel: int, band_rows: int) -> int:
+    """
+    Embeds bits into an image's pixels at the given row-major positions, taken
+    in that order, reading and writing back only the bands of rows that hold
+    them, or only the pixels themselves where a band holds few.
+    embed must not depend on the order it is called in, as bands are visited top to bottom.
+    """
+    width = image.width
+    bands = pixel_bands(image)
+    dtype = NATIVE_MODES[image.mode]
+    access = image.load()
+    bits_per_pixel = bands * bits_per_channel
+    count = min(bits.size, positions.size * bits_per_pixel)
+    padded = np.zeros(positions.size * bits_per_pixel, dtype=np.uint8)
+    padded[:count] = bits[:count]
+    padded = padded.reshape(positions.size, bits_per_pixel)
+
+    for selected, band_positions, top, bottom in _position_bands(positions, width, band_rows):
+        band_bits = padded[selected].reshape(-1)
+        if selected[-1] == positions.size - 1:
+            band_bits = band_bits[:band_bits.size - (padded.size - count)]
+        if _is_sparse(band_positions.size, top, bottom, width):
+            channels = _get_pixels(access, band_positions, width, bands, dtype)
+            embed(channels.reshape(-1), band_bits)
+            _put_pixels(access, band_positions, width, channels)
+            continue
+        band = np.array(read_rows(image, top, bottom))
+        band_positions -= top * width
+        band_pixels = band.reshape(-1, bands)
+        channels = band_pixels[band_positions]
+        embed(channels.reshape(-1), band_bits)
+        band_pixels[band_positions] = channels
+        write_rows(image, top, band)
+    return count
+
+
+def embed_ordered(pixels, order, bits: np.ndarray, embed=embed_bits, start: int = 0,
+                  bits_per_channel: int = 1, chunk_pixels: int = CHUNK_PIXELS, progress=None) -> int:
+    """
+    Embeds bits into the pixels in the given order, in place, one chunk of positions at a time.
+
+    An image is modified without copying its pixels: each chunk's positions are
+    grouped into bands of rows, and only the rows between a band's first and
+    last position are read and written back, or only the pixels at the
+    positions when a band holds too few of them to be worth copying. Chunks are made large enough that
+    an image is passed over at most MAX_IMAGE_PASSES times. The result is the same
+    as for an array of the image's pixels as long as embed does not depend on
+    the order it is called in, as embed_bits does not.
+    
+    Parameters:
+        pixels (Image.Image | np.ndarray): An image or a (height, width, bands) pixel array to modify.
+        order: A pixel ordering whose take(start, stop) returns row-major pixel indices.
+        bits (np.ndarray): The bits to embed.
+        embed (callable): Embeds bits into a flat channel array and returns how many it took.
+        start (int): The position in the ordering to start writing at.
+        bits_per_channel (int): How many bits embed stores per channel.
+        chunk_pixels (int): The largest number of positions per chunk.
+        progress (callable, optional): Called as progress(bits_done, bits_total) after each chunk.
+            It may raise to abandon the embedding.
+    
+    Returns:
+        int: The number of bits embedded.
+    """
+    width, height = pixel_size(pixels)
+    end = min(start + -(-bits.size // (pixel_bands(pixels) * bits_per_channel)), len(order))
+    in_image = not isinstance(pixels, np.ndarray)
+    if in_image:
+        chunk_pixels = max(chunk_pixels, -(-width * height // MAX_IMAGE_PASSES))
+        band_rows = max(1, chunk_pixels // max(width, 1))
+    offset = 0
+    with stage('embed', pixels=max(0, end - start)) as counts:
+        for begin, stop in _chunk_bounds(end, chunk_pixels, chunk_pixels, start):
+            if in_image:
+                offset += _embed_bands(pixels, order.take(begin, stop), bits[offset:], embed, bits_per_channel, band_rows)
+            else:
+                rows, columns = np.divmod(order.take(begin, stop), width)
+                selected = pixels[rows, columns]
+                offset += embed(selected.reshape(-1), bits[offset:])
+                pixels[rows, columns] = selected
+            if progress is not None:
+                progress(offset, bits.size)
+        counts['bytes'] = offset // 8
+    return offset
+
+
+def segment_progress(segments, progress):
+    """
+    Pairs each payload segment with a progress callback that reports against
+    the whole payload, so one progress(bits_done, bits_total) spans all segments.
+    
+    Parameters:
+        segments (list): (start, bits_per_channel, bits) segments, as from payload_segments.
+        progress (callable, optional): The callback for the whole payload.
+    
+    Yields:
+        tuple: Each segment and its callback, or None when progress is None.
+    """
+    total = sum(bits.size for _, _, bits in segments)
+    done = 0
+    for segment in segments:
+        if progress is None:
+            yield segment, None
+        else:
+            yield segment, lambda offset, _, done=done: progress(done + offset, total)
+        done += segment[2].size
+
+
+class BitReader:
+    """
+    Packs a stream of bit chunks into bytes, pulling chunks only as they are needed.
+    """
+
+    def __init__(self, bit_chunks):
+        self._chunks = iter(bit_chunks)
+        self._carry = np.empty(0, dtype=np.uint8)  # Bits left over from the last chunk
+        self._buffer = bytearray()
+        self.bits_read = 0  # Bits pulled from the stream so far
+        self.progress = None  # Called with bits_read after each chunk
+
+    def _fill(self) -> bool:
+        # Pull chunks until at least one whole byte is available
+        for chunk in self._chunks:
+            self.bits_read += chunk.size
+            if self.progress is not None:
+                self.progress(self.bits_read)
+            bits = np.concatenate((self._carry, chunk))
+            usable = bits.size - bits.size % 8
+            self._carry = bits[usable:]
+            if usable:
+                self._buffer += np.packbits(bits[:usable]).tobytes()
+                return True
+        return False
+
+    def read(self, size: int) -> bytes:
+        """
+        Reads up to size bytes. Fewer are returned only when the stream is exhausted.
+        """
+        while len(self._buffer) < size and self._fill():
+            pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_until(self, delimiter: bytes = DELIMITER) -> bytes:
+        """
+        Reads up to the first delimiter, which is consumed but not returned.
+        If the stream ends first, everything that was read is returned.
+        """
+        start = 0
+        while True:
+            index = self._buffer.find(delimiter, start)
+            if index != -1:
+                data = bytes(self._buffer[:index])
+                del self._buffer[:index + len(delimiter)]
+                return data
+            start = max(0, len(self._buffer) - len(delimiter) + 1)
+            if not self._fill():
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                return data
+
+
+def read_message(bit_chunks) -> str:
+    """
+    Decodes a delimiter-terminated message from a stream of bit chunks.
+    
+    Parameters:
+        bit_chunks (Iterable[np.ndarray]): The embedded bits, in embedding order.
+    
+    Returns:
+        str: The decoded message.
+    """
+    return BitReader(bit_chunks).read_until(DELIMITER).decode('latin-1')
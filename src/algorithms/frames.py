@@ -0,0 +1,143 @@
+from functools import partial
+import numpy as np
+from PIL import Image, ImageSequence
+
+from .bitplane import cover_mode, embed_bits, match_bits, embed_rows, embed_ordered, iter_lsb_bits, iter_order_bits
+from .metrics import stage
+from .payload import payload_segments, read_payload
+from .permutation import pixel_order, DEFAULT_ORDERING
+
+# The bit stream runs through the frames in order: each frame's pixels follow
+# the last pixel of the frame before, in row-major order for LSB and LSBM and
+# in the RLSB ordering of one frame for RLSB, which is the same for every frame.
+# The payload header is at the start of the first frame.
+
+
+def frame_count(image: Image.Image) -> int:
+    """
+    Returns how many frames an animation or multi-page image has; 1 for still images.
+    """
+    return getattr(image, 'n_frames', 1)
+
+
+def _frame(frame: Image.Image, mode: str, size: tuple) -> Image.Image:
+    # The current frame in the mode of the first, which every frame is embedded in
+    if frame.size != size:
+        raise ValueError(f"Frame {frame.tell()} is {frame.size[0]}x{frame.size[1]}, not {size[0]}x{size[1]} "
+                         "like the first frame")
+    with stage('load', pixels=frame.width * frame.height):
+        frame.load()
+    if frame.mode == mode:
+        return frame
+    with stage('convert', pixels=frame.width * frame.height):
+        return frame.convert(mode)
+
+
+def _stream(image: Image.Image, algorithm: str, seed: int, ordering: str):
+    if algorithm not in ('lsb', 'lsbm', 'rlsb'):
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    image.seek(0)
+    mode = cover_mode(image)
+    order = pixel_order(image.width, image.height, seed, ordering) if algorithm == 'rlsb' else None
+    return mode, Image.getmodebands(mode), order
+
+
+def encode_frames(image: Image.Image, message, algorithm: str, seed: int = None, ordering: str = DEFAULT_ORDERING,
+                  framed: bool = True, bits_per_channel: int = 1, compression: str = None):
+    """
+    Encodes a message across the frames of an animated GIF or PNG or a multi-page TIFF.
+
+    The payload is checked against the capacity of every frame and packed
+    before this returns. The frames are then read, embedded into and handed
+    on one at a time, so only one decoded frame is in memory, and frames past
+    the end of the payload are passed on unchanged.
+
+    Parameters:
+        image (Image.Image): The cover, opened with Image.open. Every frame is
+            embedded in the mode of the first, as bitplane.cover_mode gives it,
+            and must have its size.
+        message (str | bytes): The message to encode.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed, or the LSBM seed for the +1/-1 choices.
+        ordering (str): The RLSB pixel ordering.
+        framed (bool): Write a framed payload, or the original delimiter-terminated format.
+        bits_per_channel (int): How many low bits of each channel carry the payload (LSB and RLSB).
+        compression (str, optional): 'auto' or a codec name to compress the payload when that makes it smaller.
+
+    Returns:
+        Iterator[Image.Image]: The encoded frames, each valid until the next is
+        taken, with the duration of the cover's frame in info['duration']. Pass
+        them to utils.image_utils.save_frames.
+    """
+    if algorithm == 'lsbm' and bits_per_channel != 1:
+        raise ValueError("LSBM embeds one bit per channel")
+    mode, bands, order = _stream(image, algorithm, seed, ordering)
+    frame_pixels = image.width * image.height
+    frames = frame_count(image)
+    segments = payload_segments(message, algorithm, frames * frame_pixels * bands, framed, bits_per_channel,
+                                compression, bands)
+    rng = np.random.default_rng(seed)
+
+    def encoded():
+        embedded = [0] * len(segments)
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            cover = _frame(frame, mode, image.size)
+            first = index * frame_pixels
+            pending = [i for i, (start, _, bits) in enumerate(segments)
+                       if embedded[i] < bits.size and start < first + frame_pixels]
+            if pending:
+                if cover is frame:
+                    # The file's frame is the base later frames are drawn on, so embed into a copy
+                    cover = frame.copy()
+                for i in pending:
+                    start, segment_bits_per_channel, bits = segments[i]
+                    if algorithm == 'lsbm':
+                        embed = partial(match_bits, rng=rng)
+                    else:
+                        embed = partial(embed_bits, bits_per_channel=segment_bits_per_channel)
+                    # A segment that began in an earlier frame continues at this frame's first pixel
+                    local_start = max(0, start - first)
+                    if order is None:
+                        embedded[i] += embed_rows(cover, bits[embedded[i]:], embed, local_start)
+                    else:
+                        embedded[i] += embed_ordered(cover, order, bits[embedded[i]:], embed, local_start,
+                                                     segment_bits_per_channel)
+            cover.info['duration'] = frame.info.get('duration', 0)
+            yield cover
+
+    return encoded()
+
+
+def decode_frames(image: Image.Image, algorithm: str, seed: int = None, ordering: str = DEFAULT_ORDERING,
+                  strict: bool = False):
+    """
+    Decodes a message encoded with encode_frames, reading the frames one at a
+    time and only as far as the payload goes.
+
+    Parameters:
+        image (Image.Image): The encoded image, opened with Image.open.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed.
+        ordering (str): The RLSB pixel ordering.
+        strict (bool): Raise PayloadError when the image holds no framed payload.
+
+    Returns:
+        str | bytes: The decoded message.
+    """
+    mode, bands, order = _stream(image, algorithm, seed, ordering)
+    size = image.size
+    frame_pixels = image.width * image.height
+    frames = frame_count(image)
+
+    def bit_source(start_pixel, bits_per_channel):
+        first, skip = divmod(start_pixel, frame_pixels)
+        for index in range(first, frames):
+            image.seek(index)
+            frame = _frame(image, mode, size)
+            if order is None:
+                yield from iter_lsb_bits(frame, skip, bits_per_channel)
+            else:
+                yield from iter_order_bits(frame, order, skip, bits_per_channel)
+            skip = 0
+
+    return read_payload(bit_source, algorithm, frames * frame_pixels * bands, strict, bands=bands)
@@ -1,9 +1,75 @@
+from functools import partial
 from PIL import Image
 
-def encode_lsb(image: Image.Image, message: str) -> Image.Image:
+from .bitplane import embed_bits, embed_rows, iter_lsb_bits, segment_progress, cover_image, pixel_bands
+from .payload import payload_segments, read_payload
+
+def encode_lsb(image: Image.Image, message, framed: bool = True, bits_per_channel: int = 1,
+               compression: str = None, progress=None, in_place: bool = False) -> Image.Image:
     """
     Encodes a message into an image using the LSB (Least Significant Bit) technique.
     
+    Parameters:
+        image (Image.Image): The input image in which the message will be encoded. Every
+            band of RGB, RGBA, CMYK, L, LA and 16-bit grayscale images carries payload;
+            palette and 1-bit images are expanded first (see bitplane.EXPANDED_MODES).
+        message (str | bytes): The message to encode in the image.
+        framed (bool): Write a framed payload (header with length and CRC32).
+            When False, the original delimiter-terminated format is written.
+        bits_per_channel (int): How many low bits of each channel carry the payload (1-4).
+            It is recorded in the header, so decoders do not need it.
+        compression (str, optional): 'auto' or a codec name ('zlib', 'lzma', 'bz2') to
+            compress the payload when that makes it smaller. Decoders read the codec from the header.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            embedding. It may raise to abandon the encoding.
+        in_place (bool): Embed into image itself instead of a copy, touching only the
+            pixels that carry the payload. The output is identical; image is returned,
+            and is left partly encoded if progress raises.
+    
+    Returns:
+        Image.Image: The output image with the encoded message.
+    """
+    cover = cover_image(image)
+    width, height = cover.size
+    bands = pixel_bands(cover)
+    segments = payload_segments(message, 'lsb', width * height * bands, framed, bits_per_channel, compression, bands)
+
+    # Channels are laid out band by band for each pixel in row-major order,
+    # which for RGB is the same order the reference loop walks them in. Only
+    # the row bands that carry payload bits are rewritten. An expanded cover
+    # is already a copy.
+    encoded_image = cover if in_place or cover is not image else cover.copy()
+    for (start_pixel, segment_bits_per_channel, bits), report in segment_progress(segments, progress):
+        embed = partial(embed_bits, bits_per_channel=segment_bits_per_channel)
+        embed_rows(encoded_image, bits, embed, start_pixel, progress=report)
+
+    return encoded_image
+
+def decode_lsb(image: Image.Image, strict: bool = False, progress=None):
+    """
+    Decodes a message from an image using the LSB (Least Significant Bit) technique.
+    
+    Parameters:
+        image (Image.Image): The input image from which the message will be decoded.
+        strict (bool): Raise PayloadError when the image holds no framed payload,
+            instead of falling back to the original delimiter-terminated format.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            extracting. It may raise to abandon the decoding.
+    
+    Returns:
+        str | bytes: The decoded message.
+    """
+    # Stream the LSB plane band by band, reading only as far as the payload
+    image = cover_image(image)
+    width, height = image.size
+    bands = pixel_bands(image)
+    return read_payload(partial(iter_lsb_bits, image), 'lsb', width * height * bands, strict, progress, bands)
+
+def encode_lsb_reference(image: Image.Image, message: str) -> Image.Image:
+    """
+    Encodes a message using a pure-Python pixel loop. Kept as a reference for
+    cross-checking the vectorized encode_lsb.
+    
     Parameters:
         image (Image.Image): The input image in which the message will be encoded.
         message (str): The message to encode in the image.
@@ -41,9 +107,10 @@ def encode_lsb(image: Image.Image, message: str) -> Image.Image:
 
     return encoded_image
 
-def decode_lsb(image: Image.Image) -> str:
+def decode_lsb_reference(image: Image.Image) -> str:
     """
-    Decodes a message from an image using the LSB (Least Significant Bit) technique.
+    Decodes a message using a pure-Python pixel loop. Kept as a reference for
+    cross-checking the vectorized decode_lsb.
     
     Parameters:
         image (Image.Image): The input image from which the message will be decoded.
@@ -1,82 +1,67 @@
+from functools import partial
+import numpy as np
 from PIL import Image
-import random
 
-def encode_lsbm(image: Image.Image, message: str) -> Image.Image:
+from .bitplane import match_bits, embed_rows, iter_lsb_bits, segment_progress, cover_image, pixel_bands
+from .payload import payload_segments, read_payload
+
+def encode_lsbm(image: Image.Image, message, seed: int = None, framed: bool = True, compression: str = None,
+                progress=None, in_place: bool = False) -> Image.Image:
     """
     Encodes a message into an image using the LSB Matching technique.
     
     Parameters:
-        image (Image.Image): The input image in which the message will be encoded.
-        message (str): The message to encode in the image.
+        image (Image.Image): The input image in which the message will be encoded,
+            in any mode encode_lsb accepts.
+        message (str | bytes): The message to encode in the image.
+        seed (int, optional): Seed for the +1/-1 choices. Each call uses its own
+            generator, so a fixed seed gives the same output in any thread.
+        framed (bool): Write a framed payload (header with length and CRC32).
+            When False, the original delimiter-terminated format is written.
+        compression (str, optional): 'auto' or a codec name ('zlib', 'lzma', 'bz2') to
+            compress the payload when that makes it smaller. Decoders read the codec from the header.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            embedding. It may raise to abandon the encoding.
+        in_place (bool): Embed into image itself instead of a copy, touching only the
+            pixels that carry the payload. The output is identical; image is returned,
+            and is left partly encoded if progress raises.
     
     Returns:
         Image.Image: The output image with the encoded message.
     """
-    # Convert message to binary
-    binary_message = ''.join([format(ord(char), '08b') for char in message])
-    binary_message += '00000000'  # Delimiter to indicate end of message
-
-    encoded_image = image.copy()
-    pixels = encoded_image.load()
-
-    width, height = image.size
-    idx = 0  # Index to track position in binary message
-
-    for y in range(height):
-        for x in range(width):
-            if idx >= len(binary_message):
-                return encoded_image  # Return encoded image once all message bits are encoded
-
-            r, g, b = pixels[x, y]
-
-            # Modify LSB of each color component using LSB Matching
-            if (r & 0x01) != int(binary_message[idx]):
-                r = (r + random.choice([-1, 1])) & 0xFF
-            if idx + 1 < len(binary_message):
-                if (g & 0x01) != int(binary_message[idx + 1]):
-                    g = (g + random.choice([-1, 1])) & 0xFF
-            if idx + 2 < len(binary_message):
-                if (b & 0x01) != int(binary_message[idx + 2]):
-                    b = (b + random.choice([-1, 1])) & 0xFF
+    cover = cover_image(image)
+    width, height = cover.size
+    bands = pixel_bands(cover)
+    segments = payload_segments(message, 'lsbm', width * height * bands, framed, compression=compression, bands=bands)
 
-            pixels[x, y] = (r, g, b)
-
-            idx += 3  # Move to the next set of bits
+    encoded_image = cover if in_place or cover is not image else cover.copy()
+    embed = partial(match_bits, rng=np.random.default_rng(seed))
+    for (start_pixel, _, bits), report in segment_progress(segments, progress):
+        embed_rows(encoded_image, bits, embed, start_pixel, progress=report)
 
     return encoded_image
 
-def decode_lsbm(image: Image.Image) -> str:
+def decode_lsbm(image: Image.Image, strict: bool = False, progress=None, seed: int = None):
     """
     Decodes a message from an image using the LSB Matching technique.
     
     Parameters:
         image (Image.Image): The input image from which the message will be decoded.
+        strict (bool): Raise PayloadError when the image holds no framed payload,
+            instead of falling back to the original delimiter-terminated format.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            extracting. It may raise to abandon the decoding.
+        seed (int): Ignored; the seed only chooses the +1/-1 steps, which decoding
+            does not need. Accepted so the registry can pass it as for encoding.
     
     Returns:
-        str: The decoded message.
+        str | bytes: The decoded message.
     """
-    pixels = image.load()
+    # Stream the LSB plane band by band, reading only as far as the payload
+    image = cover_image(image)
     width, height = image.size
-
-    binary_message = []
-    for y in range(height):
-        for x in range(width):
-            r, g, b = pixels[x, y]
-
-            # Extract LSB of each color component
-            binary_message.append(r & 0x01)
-            binary_message.append(g & 0x01)
-            binary_message.append(b & 0x01)
-
-    # Group bits into bytes and convert to characters
-    message = ''.join(chr(int(''.join(map(str, binary_message[i:i+8])), 2)) for i in range(0, len(binary_message), 8))
-    
-    # Find the delimiter and trim the message
-    delimiter_index = message.find('\x00')
-    if delimiter_index != -1:
-        message = message[:delimiter_index]
-
-    return message
+    bands = pixel_bands(image)
+    return read_payload(partial(iter_lsb_bits, image), 'lsbm', width * height * bands, strict, progress, bands)
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,117 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# The stages timed by the library, in pipeline order
+STAGES = ('load', 'convert', 'pack', 'embed', 'extract', 'analyze', 'save')
+
+
+class MetricsRegistry:
+    """
+    Collects per-stage timings and counts of the pixels and bytes each stage touched.
+
+    Library users can read snapshot() or register a listener, which is called as
+    listener(stage, seconds, pixels, nbytes) after every recorded stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._listeners = []
+        self.enabled = True
+
+    def record(self, stage: str, seconds: float, pixels: int = 0, nbytes: int = 0):
+        """
+        Adds one run of a stage to the totals and notifies the listeners.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(stage, {'count': 0, 'seconds': 0.0, 'pixels': 0, 'bytes': 0})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['pixels'] += pixels
+            stats['bytes'] += nbytes
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(stage, seconds, pixels, nbytes)
+
+    @contextmanager
+    def stage(self, name: str, pixels: int = 0, nbytes: int = 0):
+        """
+        Times the enclosed block as one run of a stage. The yielded dictionary's
+        'pixels' and 'bytes' entries can be updated once the counts are known.
+        """
+        counts = {'pixels': pixels, 'bytes': nbytes}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(name, time.perf_counter() - start, counts['pixels'], counts['bytes'])
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of the totals, keyed by stage.
+        """
+        with self._lock:
+            return {stage: dict(stats) for stage, stats in self._stats.items()}
+
+    def merge(self, snapshot: dict):
+        """
+        Adds the totals of a snapshot, for example one taken in a worker process.
+        """
+        with self._lock:
+            for stage, other in snapshot.items():
+                stats = self._stats.setdefault(stage, {'count': 0, 'seconds': 0.0, 'pixels': 0, 'bytes': 0})
+                for key in stats:
+                    stats[key] += other[key]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def diff_snapshots(after: dict, before: dict) -> dict:
+    """
+    Returns the totals recorded between two snapshots.
+    """
+    difference = {}
+    for stage, stats in after.items():
+        previous = before.get(stage, {})
+        delta = {key: value - previous.get(key, 0) for key, value in stats.items()}
+        if delta['count']:
+            difference[stage] = delta
+    return difference
+
+
+def format_snapshot(snapshot: dict) -> str:
+    """
+    Formats a snapshot as a table with one row per stage.
+    """
+    total = sum(stats['seconds'] for stats in snapshot.values()) or 1.0
+    ordered = [stage for stage in STAGES if stage in snapshot] + sorted(set(snapshot) - set(STAGES))
+    lines = [f"{'stage':<10}{'calls':>8}{'seconds':>12}{'share':>8}{'pixels':>14}{'MB':>10}"]
+    for stage in ordered:
+        stats = snapshot[stage]
+        lines.append(f"{stage:<10}{stats['count']:>8}{stats['seconds']:>12.4f}{stats['seconds'] / total:>8.1%}"
+                     f"{stats['pixels']:>14}{stats['bytes'] / 1e6:>10.2f}")
+    return '\n'.join(lines)
+
+
+# The registry the library records into
+registry = MetricsRegistry()
+
+
+def stage(name: str, pixels: int = 0, nbytes: int = 0):
+    """
+    Times a block as one run of a stage in the shared registry.
+    """
+    return registry.stage(name, pixels, nbytes)
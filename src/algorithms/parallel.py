@@ -0,0 +1,251 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image
+
+from .bitplane import (BitReader, NATIVE_MODES, embed_bits, extract_bits, iter_lsb_bits, iter_order_bits, cover_image,
+                       pixel_bands, pixel_image)
+from .lsb import encode_lsb, decode_lsb
+from .lsbm import encode_lsbm, decode_lsbm
+from .rlsb import encode_rlsb, decode_rlsb
+from .metrics import stage
+from .payload import HEADER_SIZE, header_pixels, payload_segments, unpack_header, verify_payload, read_payload
+from .permutation import DEFAULT_ORDERING, pixel_order
+
+# Images with fewer pixels than this per worker are not worth splitting
+MIN_STRIPE_PIXELS = 1 << 18
+
+# More stripes than workers, so a slow stripe does not hold up the others
+STRIPES_PER_WORKER = 4
+
+# Stripe boundaries fall on multiples of this many pixels, so every stripe's
+# bits start on a byte boundary whatever the bits per channel
+STRIPE_ALIGN = 8
+
+
+def _parallel(algorithm: str, ordering: str) -> bool:
+    # LSBM draws its +1/-1 choices from one generator in embedding order, and the
+    # shuffle ordering is a full in-memory list, so neither splits into independent stripes
+    return algorithm == 'lsb' or (algorithm == 'rlsb' and ordering == 'feistel')
+
+
+def _stripes(count: int, workers: int):
+    """
+    Splits count positions into aligned (begin, end) stripes.
+    """
+    size = max(MIN_STRIPE_PIXELS, -(-count // (workers * STRIPES_PER_WORKER)))
+    size = -(-size // STRIPE_ALIGN) * STRIPE_ALIGN
+    return [(begin, min(begin + size, count)) for begin in range(0, count, size)]
+
+
+def _share_pixels(image: Image.Image):
+    """
+    Copies the pixels of an image in one of NATIVE_MODES into a new shared memory block.
+    """
+    if image.mode not in NATIVE_MODES:
+        raise ValueError(f"Expected an image in one of {', '.join(NATIVE_MODES)}, got mode {image.mode}")
+    width, height = image.size
+    shape = (height, width, pixel_bands(image))
+    dtype = np.dtype(NATIVE_MODES[image.mode])
+    block = shared_memory.SharedMemory(create=True, size=max(1, width * height * shape[2] * dtype.itemsize))
+    pixels = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    pixels[...] = np.asarray(image).reshape(shape)
+    return block, pixels
+
+
+def _release(block):
+    block.unlink()
+    try:
+        block.close()
+    except BufferError:
+        # A view is still held, for example by a traceback; the mapping goes when it does
+        pass
+
+
+def _stripe_channels(pixels: np.ndarray, seed, begin: int, end: int):
+    """
+    Returns a stripe's channels, and the pixel positions to write them back to
+    when the stripe is not a contiguous run of rows.
+    """
+    height, width, bands = pixels.shape
+    if seed is None:
+        return pixels.reshape(-1)[begin * bands:end * bands], None
+    positions = np.divmod(pixel_order(width, height, seed, 'feistel').take(begin, end), width)
+    return pixels[positions].reshape(-1), positions
+
+
+def _embed_stripe(task):
+    pixels_name, bits_name, shape, dtype, bit_count, seed, begin, end, bits_per_channel, bits_start, bits_stop = task
+    pixels_block = shared_memory.SharedMemory(name=pixels_name)
+    bits_block = shared_memory.SharedMemory(name=bits_name)
+    try:
+        pixels = np.ndarray(shape, dtype=dtype, buffer=pixels_block.buf)
+        bits = np.ndarray((bit_count,), dtype=np.uint8, buffer=bits_block.buf)[bits_start:bits_stop]
+        channels, positions = _stripe_channels(pixels, seed, begin, end)
+        embed_bits(channels, bits, bits_per_channel)
+        if positions is not None:
+            pixels[positions] = channels.reshape(-1, shape[2])
+        # Release the views before the blocks are closed
+        del pixels, bits, channels
+    finally:
+        pixels_block.close()
+        bits_block.close()
+
+
+def _extract_stripe(task):
+    pixels_name, shape, dtype, seed, begin, end, bits_per_channel, bit_count = task
+    pixels_block = shared_memory.SharedMemory(name=pixels_name)
+    try:
+        pixels = np.ndarray(shape, dtype=dtype, buffer=pixels_block.buf)
+        channels, _ = _stripe_channels(pixels, seed, begin, end)
+        data = np.packbits(extract_bits(channels, bits_per_channel)[:bit_count]).tobytes()
+        del pixels, channels
+        return data
+    finally:
+        pixels_block.close()
+
+
+def encode_parallel(image: Image.Image, message, algorithm: str = 'lsb', seed: int = None,
+                    ordering: str = DEFAULT_ORDERING, framed: bool = True, bits_per_channel: int = 1,
+                    compression: str = None, workers: int = None, executor=None) -> Image.Image:
+    """
+    Encodes a message with the pixel buffer split into stripes embedded by a pool of processes.
+
+    The pixels and the bit stream are placed in shared memory once; each worker
+    attaches to them and embeds its own slice of the bits, so no pixel data is
+    pickled. The output is identical to the serial encoder's. LSBM, the
+    'shuffle' ordering and images too small to split use the serial encoder.
+
+    Parameters:
+        image (Image.Image): The input image in which the message will be encoded, in any mode encode_lsb accepts.
+        message (str | bytes): The message to encode in the image.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed, or the LSBM seed for the +1/-1 choices.
+        ordering (str): The RLSB pixel ordering.
+        framed (bool): Write a framed payload, or the original delimiter-terminated format.
+        bits_per_channel (int): How many low bits of each channel carry the payload (LSB and RLSB).
+        compression (str, optional): 'auto' or a codec name to compress the payload when that makes it smaller.
+        workers (int): The number of worker processes. Defaults to the number of cores.
+        executor (concurrent.futures.Executor, optional): A process pool to reuse instead of starting one.
+
+    Returns:
+        Image.Image: The output image with the encoded message.
+    """
+    workers = workers or os.cpu_count() or 1
+    width, height = image.size
+    if not _parallel(algorithm, ordering) or (executor is None and workers == 1) \
+            or width * height < 2 * MIN_STRIPE_PIXELS:
+        if algorithm == 'lsb':
+            return encode_lsb(image, message, framed, bits_per_channel, compression)
+        if algorithm == 'lsbm':
+            if bits_per_channel != 1:
+                raise ValueError("LSBM embeds one bit per channel")
+            return encode_lsbm(image, message, seed, framed, compression)
+        if algorithm == 'rlsb':
+            return encode_rlsb(image, message, seed, ordering, framed, bits_per_channel, compression)
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    image = cover_image(image)
+    bands = pixel_bands(image)
+    segments = payload_segments(message, algorithm, width * height * bands, framed, bits_per_channel, compression, bands)
+    bit_count = sum(bits.size for _, _, bits in segments)
+    stripe_seed = seed if algorithm == 'rlsb' else None
+
+    pixels_block, pixels = _share_pixels(image)
+    bits_block = shared_memory.SharedMemory(create=True, size=max(1, bit_count))
+    try:
+        shared_bits = np.ndarray((bit_count,), dtype=np.uint8, buffer=bits_block.buf)
+        tasks = []
+        offset = 0
+        for start, segment_bits_per_channel, bits in segments:
+            shared_bits[offset:offset + bits.size] = bits
+            bits_per_pixel = bands * segment_bits_per_channel
+            used = min(-(-bits.size // bits_per_pixel), width * height - start)
+            for begin, end in _stripes(used, workers):
+                tasks.append((pixels_block.name, bits_block.name, pixels.shape, pixels.dtype.str, bit_count, stripe_seed,
+                              start + begin, start + end, segment_bits_per_channel,
+                              offset + begin * bits_per_pixel, offset + min(bits.size, end * bits_per_pixel)))
+            offset += bits.size
+        del shared_bits
+
+        with stage('embed', pixels=sum(task[7] - task[6] for task in tasks), nbytes=bit_count // 8):
+            if executor is None:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(_embed_stripe, tasks))
+            else:
+                list(executor.map(_embed_stripe, tasks))
+        encoded_image = pixel_image(pixels.copy(), image.mode)
+        del pixels
+        return encoded_image
+    finally:
+        _release(pixels_block)
+        _release(bits_block)
+
+
+def decode_parallel(image: Image.Image, algorithm: str = 'lsb', seed: int = None,
+                    ordering: str = DEFAULT_ORDERING, strict: bool = False, workers: int = None, executor=None):
+    """
+    Decodes a message with the payload's pixels split into stripes extracted by a pool of processes.
+
+    The header is read first, so only the pixels that carry the payload are
+    handed to the workers. Legacy messages, whose length is unknown, and the
+    cases encode_parallel leaves to the serial encoder use the serial decoder.
+
+    Parameters:
+        image (Image.Image): The input image from which the message will be decoded.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed.
+        ordering (str): The RLSB pixel ordering.
+        strict (bool): Raise PayloadError when the image holds no framed payload.
+        workers (int): The number of worker processes. Defaults to the number of cores.
+        executor (concurrent.futures.Executor, optional): A process pool to reuse instead of starting one.
+
+    Returns:
+        str | bytes: The decoded message.
+    """
+    workers = workers or os.cpu_count() or 1
+    width, height = image.size
+    if not _parallel(algorithm, ordering) or (executor is None and workers == 1) \
+            or width * height < 2 * MIN_STRIPE_PIXELS:
+        if algorithm == 'lsb':
+            return decode_lsb(image, strict)
+        if algorithm == 'lsbm':
+            return decode_lsbm(image, strict)
+        if algorithm == 'rlsb':
+            return decode_rlsb(image, seed, ordering, strict)
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    image = cover_image(image)
+    bands = pixel_bands(image)
+    channels = width * height * bands
+    pixels_block, pixels = _share_pixels(image)
+    try:
+        if algorithm == 'rlsb':
+            bit_source = partial(iter_order_bits, pixels, pixel_order(width, height, seed, ordering))
+        else:
+            bit_source = partial(iter_lsb_bits, pixels)
+        fields = unpack_header(BitReader(bit_source(0, 1)).read(HEADER_SIZE), algorithm, channels, bands)
+        if fields is None:
+            return read_payload(bit_source, algorithm, channels, strict, bands=bands)
+
+        flags, bits_per_channel, length, crc = fields
+        bits_per_pixel = bands * bits_per_channel
+        stripe_seed = seed if algorithm == 'rlsb' else None
+        start = header_pixels(bands)
+        tasks = [(pixels_block.name, pixels.shape, pixels.dtype.str, stripe_seed, start + begin, start + end,
+                  bits_per_channel, length * 8 - begin * bits_per_pixel)
+                 for begin, end in _stripes(-(-length * 8 // bits_per_pixel), workers)]
+
+        with stage('extract', pixels=start + sum(task[5] - task[4] for task in tasks),
+                   nbytes=HEADER_SIZE + length):
+            if executor is None:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    data = b''.join(pool.map(_extract_stripe, tasks))
+            else:
+                data = b''.join(executor.map(_extract_stripe, tasks))
+        return verify_payload(data, flags, length, crc)
+    finally:
+        bit_source = pixels = None
+        _release(pixels_block)
@@ -0,0 +1,292 @@
+import bz2
+import lzma
+import struct
+import zlib
+import numpy as np
+
+from .bitplane import BitReader, DELIMITER, message_to_bits, check_bits_per_channel
+from .metrics import stage
+from .registry import CODECS, COMPRESSION
+
+MAGIC = b'VISR'
+VERSION = 1
+
+# magic, version, algorithm id, flags, payload length, CRC32 of the payload
+HEADER = struct.Struct('>4sBBBII')
+HEADER_SIZE = HEADER.size
+
+# The header is always stored at one bit per channel, in whole pixels, so a
+# decoder can read it before it knows how densely the payload was packed.
+# HEADER_PIXELS is its length in RGB covers; see header_pixels for other modes.
+HEADER_PIXELS = HEADER_SIZE * 8 // 3
+
+ALGORITHM_IDS = {'lsb': 1, 'lsbm': 2, 'rlsb': 3}
+ALGORITHM_NAMES = {value: key for key, value in ALGORITHM_IDS.items()}
+
+FLAG_TEXT = 0x01  # The payload is UTF-8 text and decodes to str
+FLAG_BITS_SHIFT = 1  # Bits 1-2 hold bits_per_channel - 1
+FLAG_BITS_MASK = 0x03 << FLAG_BITS_SHIFT
+FLAG_CODEC_SHIFT = 3  # Bits 3-4 hold the compression codec id
+FLAG_CODEC_MASK = 0x03 << FLAG_CODEC_SHIFT
+
+# Compression codecs and their ids; 0 means the payload is stored as is
+CODEC_IDS = {codec: codec_id for codec_id, codec in enumerate(CODECS, 1)}
+CODEC_NAMES = {value: key for key, value in CODEC_IDS.items()}
+
+_COMPRESSORS = {
+    'zlib': lambda data: zlib.compress(data, 9),
+    'lzma': lzma.compress,
+    'bz2': lambda data: bz2.compress(data, 9),
+}
+
+_DECOMPRESSORS = {
+    'zlib': zlib.decompressobj,
+    'lzma': lzma.LZMADecompressor,
+    'bz2': bz2.BZ2Decompressor,
+}
+
+# Refuse to inflate a payload past this size, so a crafted image cannot exhaust memory
+MAX_DECOMPRESSED_SIZE = 1 << 30
+
+
+class PayloadError(ValueError):
+    """
+    Raised when an image does not carry a valid payload for the requested decoder,
+    or when a payload does not fit in its cover.
+    """
+
+
+def compress_payload(data: bytes, compression: str = 'auto'):
+    """
+    Compresses a payload, keeping the result only if it is smaller.
+    
+    Parameters:
+        data (bytes): The payload.
+        compression (str): A codec name, 'auto' to keep the smallest of all codecs, or 'none'.
+    
+    Returns:
+        tuple: (codec, data), where codec is None when the payload is stored as is.
+    """
+    if compression not in COMPRESSION:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {', '.join(COMPRESSION)}")
+    codecs = CODEC_IDS if compression == 'auto' else () if compression == 'none' else (compression,)
+    best_codec, best = None, data
+    for codec in codecs:
+        compressed = _COMPRESSORS[codec](data)
+        if len(compressed) < len(best):
+            best_codec, best = codec, compressed
+    return best_codec, best
+
+
+def decompress_payload(codec: str, data: bytes) -> bytes:
+    """
+    Reverses compress_payload, refusing output larger than MAX_DECOMPRESSED_SIZE.
+    """
+    decompressor = _DECOMPRESSORS[codec]()
+    try:
+        if codec == 'zlib':
+            result = decompressor.decompress(data, MAX_DECOMPRESSED_SIZE)
+            finished = decompressor.eof and not decompressor.unconsumed_tail
+        else:
+            result = decompressor.decompress(data, max_length=MAX_DECOMPRESSED_SIZE)
+            finished = decompressor.eof
+    except (zlib.error, lzma.LZMAError, OSError, EOFError) as e:
+        raise PayloadError(f"Payload could not be decompressed with {codec}: {e}")
+    if not finished:
+        raise PayloadError(f"Payload is truncated or inflates past {MAX_DECOMPRESSED_SIZE} bytes")
+    return result
+
+
+def pack_payload(message, algorithm: str, bits_per_channel: int = 1, compression: str = None) -> bytes:
+    """
+    Frames a message with a header recording its algorithm, type, packing, codec, length and checksum.
+    
+    Parameters:
+        message (str | bytes): The message. Text is stored as UTF-8, bytes are stored as is.
+        algorithm (str): The name of the embedding algorithm.
+        bits_per_channel (int): How many low bits of each channel carry the payload.
+        compression (str, optional): A codec name or 'auto' to compress the payload when
+            that makes it smaller; see compress_payload. None or 'none' stores it as is.
+    
+    Returns:
+        bytes: The header followed by the payload.
+    """
+    check_bits_per_channel(bits_per_channel)
+    if isinstance(message, str):
+        data, flags = message.encode('utf-8'), FLAG_TEXT
+    else:
+        data, flags = bytes(message), 0
+    flags |= (bits_per_channel - 1) << FLAG_BITS_SHIFT
+    if compression is not None:
+        codec, data = compress_payload(data, compression)
+        if codec is not None:
+            flags |= CODEC_IDS[codec] << FLAG_CODEC_SHIFT
+    header = HEADER.pack(MAGIC, VERSION, ALGORITHM_IDS[algorithm], flags, len(data), zlib.crc32(data))
+    return header + data
+
+
+def header_pixels(bands: int = 3) -> int:
+    """
+    Returns how many pixels the header takes in a cover with this many channels per pixel.
+    """
+    return -(-HEADER_SIZE * 8 // bands)
+
+
+def payload_capacity(channels: int, bits_per_channel: int = 1, bands: int = 3) -> int:
+    """
+    Returns how many payload bytes fit after the header in a cover with the given
+    number of channels, of which each pixel has bands.
+    """
+    return max(0, (channels - header_pixels(bands) * bands) * bits_per_channel // 8)
+
+
+def unpack_header(header: bytes, algorithm: str, channels: int, bands: int = 3):
+    """
+    Validates a frame header without reading the payload.
+    
+    Parameters:
+        header (bytes): The first HEADER_SIZE bytes read from the image.
+        algorithm (str): The algorithm the caller is decoding with.
+        channels (int): The number of channels in the image.
+        bands (int): The number of channels in each pixel.
+    
+    Returns:
+        tuple: (flags, bits_per_channel, length, crc), or None if the bytes do not start with the magic.
+    """
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        return None
+    _, version, algorithm_id, flags, length, crc = HEADER.unpack(header)
+    if version != VERSION:
+        raise PayloadError(f"Unsupported payload version {version}")
+    if algorithm_id != ALGORITHM_IDS[algorithm]:
+        found = ALGORITHM_NAMES.get(algorithm_id, f'id {algorithm_id}')
+        raise PayloadError(f"Payload was embedded with {found}, not {algorithm}")
+    bits_per_channel = ((flags & FLAG_BITS_MASK) >> FLAG_BITS_SHIFT) + 1
+    capacity = payload_capacity(channels, bits_per_channel, bands)
+    if length > capacity:
+        raise PayloadError(f"Header claims {length} bytes but the image holds at most {capacity}")
+    return flags, bits_per_channel, length, crc
+
+
+def payload_segments(message, algorithm: str, channels: int, framed: bool = True, bits_per_channel: int = 1,
+                     compression: str = None, bands: int = 3):
+    """
+    Converts a message into the bit segments to embed.
+    
+    Parameters:
+        message (str | bytes): The message to embed.
+        algorithm (str): The name of the embedding algorithm.
+        channels (int): The number of channels in the cover.
+        framed (bool): Write a framed payload. When False, the original
+            delimiter-terminated format is written and bits that do not fit are dropped.
+        bits_per_channel (int): How many low bits of each channel carry the payload.
+            The header always uses one.
+        compression (str, optional): A codec name or 'auto' to compress the payload
+            when that makes it smaller. Only framed payloads can be compressed.
+        bands (int): The number of channels in each pixel of the cover.
+    
+    Returns:
+        list: (start_pixel, bits_per_channel, bits) tuples, where start_pixel is
+        the position in embedding order of the segment's first pixel.
+    """
+    with stage('pack') as counts:
+        if not framed:
+            if bits_per_channel != 1:
+                raise ValueError("Only framed payloads can use more than one bit per channel")
+            if compression not in (None, 'none'):
+                raise ValueError("Only framed payloads can be compressed")
+            bits = message_to_bits(message)
+            counts['bytes'] = bits.size // 8
+            return [(0, 1, bits)]
+
+        if channels < header_pixels(bands) * bands:
+            raise PayloadError(f"Cover of {channels // bands} pixels is too small for the payload header, "
+                               f"which takes {header_pixels(bands)}")
+        data = pack_payload(message, algorithm, bits_per_channel, compression)
+        capacity = payload_capacity(channels, bits_per_channel, bands)
+        if len(data) - HEADER_SIZE > capacity:
+            raise PayloadError(f"Payload of {len(data) - HEADER_SIZE} bytes does not fit in a cover holding {capacity} bytes")
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        counts['bytes'] = len(data)
+        header_bits = HEADER_SIZE * 8
+        return [(0, 1, bits[:header_bits]), (header_pixels(bands), bits_per_channel, bits[header_bits:])]
+
+
+def verify_payload(data: bytes, flags: int, length: int, crc: int):
+    """
+    Checks a payload read from an image against its header, decompresses it if
+    needed and converts it back to a message.
+    
+    Parameters:
+        data (bytes): The payload bytes that were read.
+        flags (int), length (int), crc (int): The fields from unpack_header.
+    
+    Returns:
+        str | bytes: The message; str for text payloads, bytes otherwise.
+    """
+    if len(data) != length or zlib.crc32(data) != crc:
+        raise PayloadError("Payload checksum mismatch")
+    codec_id = (flags & FLAG_CODEC_MASK) >> FLAG_CODEC_SHIFT
+    if codec_id:
+        data = decompress_payload(CODEC_NAMES[codec_id], data)
+    return data.decode('utf-8') if flags & FLAG_TEXT else data
+
+
+def read_payload(bit_source, algorithm: str, channels: int, strict: bool = False, progress=None, bands: int = 3):
+    """
+    Decodes a message from an image's embedded bits.
+
+    Only the header is read before deciding whether the image carries a payload
+    for this algorithm; after that exactly the payload's length is read.
+    
+    Parameters:
+        bit_source (callable): Called as bit_source(start_pixel, bits_per_channel) to get
+            the embedded bits from that position on, in embedding order, as chunks.
+        algorithm (str): The algorithm the caller is decoding with.
+        channels (int): The number of channels in the image.
+        strict (bool): Raise PayloadError when there is no frame, instead of
+            falling back to the original delimiter-terminated format.
+        progress (callable, optional): Called as progress(bits_done, bits_total) as chunks
+            are read once the header is known; bits_total is 0 for legacy messages, whose
+            length is unknown. It may raise to abandon the decoding.
+        bands (int): The number of channels in each pixel of the image.
+    
+    Returns:
+        str | bytes: The message; str for text payloads and legacy messages, bytes otherwise.
+    """
+    with stage('extract') as counts:
+        reader = BitReader(bit_source(0, 1))
+        header = reader.read(HEADER_SIZE)
+        counts['bytes'] = len(header)
+        counts['pixels'] = reader.bits_read // bands
+        fields = unpack_header(header, algorithm, channels, bands)
+
+        if fields is None:
+            if strict:
+                raise PayloadError(f"No {algorithm} payload found")
+            # Fall back to a delimiter-terminated message from an older version
+            delimiter_index = header.find(DELIMITER)
+            if delimiter_index != -1:
+                return header[:delimiter_index].decode('latin-1')
+            if progress is not None:
+                reader.progress = lambda bits_read: progress(bits_read, 0)
+            message = header + reader.read_until(DELIMITER)
+            counts['bytes'] = len(message)
+            counts['pixels'] = reader.bits_read // bands
+            return message.decode('latin-1')
+
+        flags, bits_per_channel, length, crc = fields
+        if bits_per_channel != 1:
+            reader = BitReader(bit_source(header_pixels(bands), bits_per_channel))
+        if progress is not None:
+            # A reader started at the data segment has not counted the header's bits
+            total = (HEADER_SIZE + length) * 8
+            done = 0 if bits_per_channel == 1 else HEADER_SIZE * 8
+            reader.progress = lambda bits_read: progress(min(done + bits_read, total), total)
+        data = reader.read(length)
+        counts['bytes'] += len(data)
+        if bits_per_channel != 1:
+            counts['pixels'] += reader.bits_read // (bands * bits_per_channel)
+        else:
+            counts['pixels'] = reader.bits_read // bands
+        return verify_payload(data, flags, length, crc)
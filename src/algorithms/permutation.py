@@ -0,0 +1,110 @@
+import hashlib
+import random
+import numpy as np
+
+from .registry import ORDERINGS, DEFAULT_ORDERING
+
+# Multipliers from the 64-bit MurmurHash3 finalizer
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SHIFT = np.uint64(33)
+
+
+class FeistelPermutation:
+    """
+    A keyed bijection over [0, size) whose i-th value is computed on demand.
+
+    A balanced Feistel network permutes the smallest even-bit domain that covers
+    size, and cycle walking maps values that land outside [0, size) back inside.
+    Reading the first N positions costs O(N) time and no per-pixel state.
+    """
+
+    def __init__(self, size: int, seed: int, rounds: int = 4):
+        self.size = size
+        self._half_bits = np.uint64(max(1, ((max(size, 1) - 1).bit_length() + 1) // 2))
+        self._mask = (np.uint64(1) << self._half_bits) - np.uint64(1)
+        digest = hashlib.blake2b(str(seed).encode(), digest_size=8 * rounds, person=b'visor-rlsb').digest()
+        self._keys = np.frombuffer(digest, dtype='<u8')
+
+    def __len__(self):
+        return self.size
+
+    def _round(self, right: np.ndarray, key: np.uint64) -> np.ndarray:
+        mixed = right ^ key
+        mixed ^= mixed >> _SHIFT
+        mixed *= _MIX_1
+        mixed ^= mixed >> _SHIFT
+        mixed *= _MIX_2
+        mixed ^= mixed >> _SHIFT
+        return mixed & self._mask
+
+    def _encrypt(self, values: np.ndarray) -> np.ndarray:
+        left = values >> self._half_bits
+        right = values & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self._half_bits) | right
+
+    def take(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the permuted positions for indices start to stop as an int64 array.
+        """
+        stop = min(stop, self.size)
+        positions = self._encrypt(np.arange(start, max(start, stop), dtype=np.uint64))
+        outside = np.flatnonzero(positions >= self.size)
+        while outside.size:
+            positions[outside] = self._encrypt(positions[outside])
+            outside = outside[positions[outside] >= self.size]
+        return positions.astype(np.int64)
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError('permutation index out of range')
+        return int(self.take(index, index + 1)[0])
+
+
+class ShuffledOrder:
+    """
+    The original RLSB ordering: every pixel index shuffled with random.shuffle.
+
+    Kept so images encoded before the Feistel ordering still decode. It builds
+    the whole permutation up front.
+    """
+
+    def __init__(self, size: int, seed: int):
+        self.size = size
+        # Shuffling indices draws the same swaps as shuffling (x, y) tuples.
+        # A private generator seeded like the global one gives the same order
+        # without disturbing other threads.
+        order = list(range(size))
+        random.Random(seed).shuffle(order)
+        self._order = np.array(order, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def take(self, start: int, stop: int) -> np.ndarray:
+        return self._order[start:stop]
+
+    def __getitem__(self, index: int) -> int:
+        return int(self._order[index])
+
+
+def pixel_order(width: int, height: int, seed: int, ordering: str = DEFAULT_ORDERING):
+    """
+    Builds the RLSB pixel ordering for an image.
+    
+    Parameters:
+        width (int): The image width.
+        height (int): The image height.
+        seed (int): The seed shared by the encoder and decoder.
+        ordering (str): 'feistel' for the lazy keyed permutation, or 'shuffle' for the original ordering.
+    
+    Returns:
+        An ordering whose take(start, stop) returns row-major pixel indices.
+    """
+    if ordering == 'feistel':
+        return FeistelPermutation(width * height, seed)
+    if ordering == 'shuffle':
+        return ShuffledOrder(width * height, seed)
+    raise ValueError(f"Unknown RLSB ordering {ordering!r}, expected one of {', '.join(ORDERINGS)}")
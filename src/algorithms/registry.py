@@ -0,0 +1,222 @@
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# This module only describes the algorithms; it must not import numpy or Pillow,
+# so that building the command line and printing --help stay fast.
+
+# RLSB pixel orderings: 'feistel' computes positions on demand, 'shuffle' is the original list
+ORDERINGS = ('feistel', 'shuffle')
+DEFAULT_ORDERING = 'feistel'
+
+# Compression codecs, in the order of their ids in the payload header
+CODECS = ('zlib', 'lzma', 'bz2')
+
+# Accepted compression settings: 'auto' keeps whichever codec gives the smallest payload
+COMPRESSION = ('none', 'auto') + CODECS
+
+# Options an algorithm may take, besides the image and message
+OPTIONS = ('seed', 'ordering', 'bits')
+
+# Entry point group through which installed packages add algorithms
+PLUGIN_GROUP = 'visor.algorithms'
+
+
+def _resolve(path: str):
+    """
+    Imports 'module:attribute' and returns the attribute. Modules starting with
+    a dot are relative to this package.
+    """
+    module, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module, __package__), attribute)
+
+
+class Algorithm:
+    """
+    Describes a steganography algorithm: its name, the options it takes and
+    where its encoder and decoder live.
+
+    The encoder and decoder are 'module:function' paths imported on first use,
+    so listing the algorithms costs nothing. The encoder is called as
+    encoder(image, message, compression=..., progress=..., **options) and the
+    decoder as decoder(image, strict=..., progress=..., **options), with seed,
+    ordering and bits_per_channel passed only when declared in options.
+    """
+
+    def __init__(self, name: str, encoder: str, decoder: str, description: str = '', options=(),
+                 tiled: bool = False, striped: bool = False):
+        """
+        Parameters:
+            name (str): The name used on the command line and in manifests and requests.
+            encoder (str): The encoder's 'module:function' path.
+            decoder (str): The decoder's 'module:function' path.
+            description (str): One line for --help.
+            options (Iterable[str]): Which of 'seed', 'ordering' and 'bits' the algorithm takes.
+            tiled (bool): Whether algorithms.tiled can process the algorithm in row bands.
+            striped (bool): Whether algorithms.parallel can split the algorithm across processes.
+        """
+        unknown = set(options) - set(OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown options for {name}: {', '.join(sorted(unknown))}")
+        self.name = name.lower()
+        self.label = name.upper()
+        self.description = description
+        self.options = tuple(options)
+        self.tiled = tiled
+        self.striped = striped
+        self._paths = {'encoder': encoder, 'decoder': decoder}
+        self._callables = {}
+
+    def __repr__(self):
+        return f"Algorithm({self.name!r})"
+
+    def _load(self, role: str):
+        if role not in self._callables:
+            self._callables[role] = _resolve(self._paths[role])
+        return self._callables[role]
+
+    def _options(self, seed, ordering, bits):
+        options = {}
+        if 'seed' in self.options:
+            options['seed'] = seed
+        if 'ordering' in self.options:
+            options['ordering'] = ordering or DEFAULT_ORDERING
+        if 'bits' in self.options:
+            options['bits_per_channel'] = bits
+        elif bits != 1:
+            raise ValueError(f"{self.label} embeds one bit per channel")
+        return options
+
+    def encode(self, image, message, seed: int = None, ordering: str = None, bits: int = 1,
+               compression: str = None, progress=None, in_place: bool = False):
+        """
+        Encodes a message, passing on only the options the algorithm takes.
+
+        Parameters:
+            image (Image.Image): The cover image.
+            message (str | bytes): The message to encode.
+            seed (int): The seed, for algorithms that take one.
+            ordering (str): The pixel ordering, for algorithms that take one.
+            bits (int): Payload bits per channel; must be 1 unless the algorithm takes 'bits'.
+            compression (str, optional): 'auto' or a codec name.
+            progress (callable, optional): Called as progress(bits_done, bits_total).
+            in_place (bool): Let the encoder modify image instead of a copy. Only
+                passed on when True, for encoders that always copy.
+
+        Returns:
+            Image.Image: The encoded image.
+        """
+        options = self._options(seed, ordering, bits)
+        if in_place:
+            options['in_place'] = True
+        return self._load('encoder')(image, message, compression=compression, progress=progress, **options)
+
+    def decode(self, image, seed: int = None, ordering: str = None, strict: bool = False, progress=None):
+        """
+        Decodes a message, passing on only the options the algorithm takes.
+
+        Parameters:
+            image (Image.Image): The encoded image.
+            seed (int): The seed, for algorithms that take one.
+            ordering (str): The pixel ordering, for algorithms that take one.
+            strict (bool): Raise PayloadError when the image holds no framed payload.
+            progress (callable, optional): Called as progress(bits_done, bits_total).
+
+        Returns:
+            str | bytes: The decoded message.
+        """
+        options = self._options(seed, ordering, 1)
+        options.pop('bits_per_channel', None)
+        return self._load('decoder')(image, strict=strict, progress=progress, **options)
+
+    def describe(self, seed: int = None) -> str:
+        """
+        Returns how a message was encoded or decoded, for messages to the user.
+        """
+        if 'seed' in self.options:
+            return f"using {self.label} with seed {seed}"
+        return f"using {self.label}"
+
+
+_ALGORITHMS = {}
+_plugins_loaded = False
+
+
+def register_algorithm(algorithm: Algorithm) -> Algorithm:
+    """
+    Adds an algorithm to the registry.
+
+    Raises:
+        ValueError: If an algorithm with the same name is already registered.
+    """
+    if algorithm.name == 'auto':
+        raise ValueError("'auto' is reserved for detecting the algorithm")
+    if algorithm.name in _ALGORITHMS:
+        raise ValueError(f"Algorithm already registered: {algorithm.name}")
+    _ALGORITHMS[algorithm.name] = algorithm
+    return algorithm
+
+
+def _load_plugins():
+    """
+    Registers the algorithms installed packages declare under the PLUGIN_GROUP
+    entry point group. An entry point names an Algorithm or a list of them; the
+    module it names should hold only the descriptions, so that discovery does
+    not import the implementations.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=PLUGIN_GROUP):
+        try:
+            found = entry_point.load()
+            for algorithm in found if isinstance(found, (list, tuple)) else [found]:
+                register_algorithm(algorithm)
+        except Exception as e:
+            logger.warning("Skipping algorithm plugin %s: %s", entry_point.name, e)
+
+
+def algorithms() -> list:
+    """
+    Returns every registered algorithm, built-in ones first.
+    """
+    _load_plugins()
+    return list(_ALGORITHMS.values())
+
+
+def algorithm_names(feature: str = None) -> list:
+    """
+    Returns the names of the registered algorithms, optionally only those that
+    take an option ('seed', 'ordering', 'bits') or support a mode ('tiled', 'striped').
+    """
+    return [algorithm.name for algorithm in algorithms()
+            if feature is None or feature in algorithm.options or getattr(algorithm, feature, False)]
+
+
+def get_algorithm(name: str) -> Algorithm:
+    """
+    Returns the registered algorithm with this name.
+
+    Raises:
+        ValueError: If no algorithm has this name.
+    """
+    algorithm = _ALGORITHMS.get(name.lower())
+    if algorithm is None:
+        _load_plugins()
+        algorithm = _ALGORITHMS.get(name.lower())
+    if algorithm is None:
+        raise ValueError(f"Unknown algorithm: {name}")
+    return algorithm
+
+
+register_algorithm(Algorithm('lsb', '.lsb:encode_lsb', '.lsb:decode_lsb',
+                             'Sequential least significant bits', options=('bits',), tiled=True, striped=True))
+register_algorithm(Algorithm('lsbm', '.lsbm:encode_lsbm', '.lsbm:decode_lsbm',
+                             'LSB matching: random +1/-1 changes instead of bit overwrites', options=('seed',),
+                             tiled=True))
+register_algorithm(Algorithm('rlsb', '.rlsb:encode_rlsb', '.rlsb:decode_rlsb',
+                             'Least significant bits of pixels in a seeded random order',
+                             options=('seed', 'ordering', 'bits'), tiled=True, striped=True))
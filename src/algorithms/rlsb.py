@@ -1,88 +1,81 @@
+from functools import partial
 from PIL import Image
-import random
 
-def encode_rlsb(image: Image.Image, message: str, seed: int) -> Image.Image:
+from .bitplane import embed_bits, embed_ordered, pixel_bands, iter_order_bits, segment_progress, cover_image
+from .payload import payload_segments, read_payload
+from .permutation import pixel_order, DEFAULT_ORDERING
+
+def encode_rlsb(image: Image.Image, message, seed: int, ordering: str = DEFAULT_ORDERING, framed: bool = True,
+                bits_per_channel: int = 1, compression: str = None, progress=None,
+                in_place: bool = False) -> Image.Image:
     """
     Encodes a message into an image using the Randomized LSB technique with a consistent seed.
     
     Parameters:
-        image (Image.Image): The input image in which the message will be encoded.
-        message (str): The message to encode in the image.
+        image (Image.Image): The input image in which the message will be encoded,
+            in any mode encode_lsb accepts.
+        message (str | bytes): The message to encode in the image.
         seed (int): The seed for the random number generator to ensure consistency.
+        ordering (str): 'feistel' for the lazy keyed pixel permutation, or 'shuffle'
+            for the original random.shuffle ordering.
+        framed (bool): Write a framed payload (header with length and CRC32).
+            When False, the original delimiter-terminated format is written.
+        bits_per_channel (int): How many low bits of each channel carry the payload (1-4).
+            It is recorded in the header, so decoders do not need it.
+        compression (str, optional): 'auto' or a codec name ('zlib', 'lzma', 'bz2') to
+            compress the payload when that makes it smaller. Decoders read the codec from the header.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            embedding. It may raise to abandon the encoding.
+        in_place (bool): Embed into image itself instead of a copy, touching only the
+            pixels that carry the payload. The output is identical; image is returned,
+            and is left partly encoded if progress raises.
     
     Returns:
         Image.Image: The output image with the encoded message.
     """
-    # Convert message to binary
-    binary_message = ''.join([format(ord(char), '08b') for char in message])
-    binary_message += '00000000'  # Delimiter to indicate end of message
-
-    encoded_image = image.copy()
-    pixels = encoded_image.load()
-
-    width, height = image.size
-    idx = 0  # Index to track position in binary message
-
-    # Generate random pixel positions with the given seed
-    random.seed(seed)
-    pixel_positions = [(x, y) for y in range(height) for x in range(width)]
-    random.shuffle(pixel_positions)
-
-    for x, y in pixel_positions:
-        if idx >= len(binary_message):
-            break  # Exit loop if all message bits are encoded
-
-        r, g, b = pixels[x, y]
-
-        # Modify LSB of each color component
-        r = (r & 0xFE) | int(binary_message[idx]) if idx < len(binary_message) else r
-        idx += 1
-        g = (g & 0xFE) | int(binary_message[idx]) if idx < len(binary_message) else g
-        idx += 1
-        b = (b & 0xFE) | int(binary_message[idx]) if idx < len(binary_message) else b
-        idx += 1
-
-        pixels[x, y] = (r, g, b)
-
-    return encoded_image
-
-def decode_rlsb(image: Image.Image, seed: int) -> str:
+    cover = cover_image(image)
+    width, height = cover.size
+    bands = pixel_bands(cover)
+    segments = payload_segments(message, 'rlsb', width * height * bands, framed, bits_per_channel, compression, bands)
+
+    order = pixel_order(width, height, seed, ordering)
+
+    # Only the pixels that carry message bits are looked up in the ordering, and
+    # only they or their rows are read and written back. An expanded cover is
+    # already a copy, so it is embedded into directly.
+    if not in_place and cover is image:
+        cover = cover.copy()
+    for (start, segment_bits_per_channel, bits), report in segment_progress(segments, progress):
+        embed = partial(embed_bits, bits_per_channel=segment_bits_per_channel)
+        embed_ordered(cover, order, bits, embed, start, segment_bits_per_channel, progress=report)
+
+    return cover
+
+def decode_rlsb(image: Image.Image, seed: int, ordering: str = DEFAULT_ORDERING, strict: bool = False,
+                progress=None):
     """
     Decodes a message from an image using the Randomized LSB technique with a consistent seed.
     
     Parameters:
         image (Image.Image): The input image from which the message will be decoded.
         seed (int): The seed for the random number generator to ensure consistency.
+        ordering (str): The pixel ordering the message was encoded with.
+        strict (bool): Raise PayloadError when the image holds no framed payload,
+            instead of falling back to the original delimiter-terminated format.
+        progress (callable, optional): Called as progress(bits_done, bits_total) while
+            extracting. It may raise to abandon the decoding.
     
     Returns:
-        str: The decoded message.
+        str | bytes: The decoded message.
     """
-    pixels = image.load()
     width, height = image.size
+    order = pixel_order(width, height, seed, ordering)
 
-    binary_message = []
-    # Generate random pixel positions with the given seed
-    random.seed(seed)
-    pixel_positions = [(x, y) for y in range(height) for x in range(width)]
-    random.shuffle(pixel_positions)
-
-    for x, y in pixel_positions:
-        r, g, b = pixels[x, y]
-
-        # Extract LSB of each color component
-        binary_message.append(r & 0x01)
-        binary_message.append(g & 0x01)
-        binary_message.append(b & 0x01)
-
-    # Group bits into bytes and convert to characters
-    message = ''.join(chr(int(''.join(map(str, binary_message[i:i+8])), 2)) for i in range(0, len(binary_message), 8))
-    
-    # Find the delimiter and trim the message
-    delimiter_index = message.find('\x00')
-    if delimiter_index != -1:
-        message = message[:delimiter_index]
-
-    return message
+    # Read the pixels in permuted order, straight from the image. A wrong seed
+    # scrambles the header, so it is rejected after the first few pixels.
+    cover = cover_image(image)
+    bands = pixel_bands(cover)
+    return read_payload(partial(iter_order_bits, cover, order), 'rlsb', width * height * bands, strict, progress, bands)
 
 if __name__ == "__main__":
     # Example usage
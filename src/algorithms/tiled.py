@@ -0,0 +1,187 @@
+import os
+import shutil
+from functools import partial
+import numpy as np
+from PIL import Image
+
+from .bitplane import CHUNK_PIXELS, embed_bits, match_bits, embed_rows, embed_ordered, iter_lsb_bits, iter_order_bits
+from .payload import payload_segments, read_payload
+from .permutation import pixel_order, DEFAULT_ORDERING
+from .lsb import encode_lsb, decode_lsb
+from .lsbm import encode_lsbm, decode_lsbm
+from .rlsb import encode_rlsb, decode_rlsb
+
+try:
+    from ..utils.image_utils import save_image
+except ImportError:
+    from utils.image_utils import save_image
+
+# Channel order of the raw modes that can be mapped, as a slice giving R, G, B
+_RAW_CHANNELS = {'RGB': slice(None), 'BGR': slice(None, None, -1)}
+
+
+def _raw_layout(tile_args):
+    # Raw tile arguments are rawmode, or (rawmode, stride, orientation)
+    if isinstance(tile_args, str):
+        tile_args = (tile_args,)
+    rawmode, stride, orientation = (tuple(tile_args) + (0, 1))[:3]
+    return rawmode, stride, orientation
+
+
+def _map_raw(path: str, writable: bool = False):
+    with Image.open(path) as image:
+        if image.mode != 'RGB' or getattr(image, 'n_frames', 1) != 1:
+            return None
+        width, height = image.size
+        tiles = list(image.tile)
+
+    if not tiles or any(tile[0] != 'raw' for tile in tiles):
+        return None
+    layouts = {_raw_layout(tile[3]) for tile in tiles}
+    if len(layouts) != 1:
+        return None
+    rawmode, stride, orientation = layouts.pop()
+    if rawmode not in _RAW_CHANNELS or orientation not in (1, -1):
+        return None
+    stride = stride or width * 3
+    offset = tiles[0][2]
+
+    # Every strip must span the full width and follow the previous one directly
+    for tile in tiles:
+        left, top, right, bottom = tile[1]
+        if left != 0 or right != width or (len(tiles) > 1 and (orientation != 1 or tile[2] != offset + top * stride)):
+            return None
+    if offset + height * stride > os.path.getsize(path):
+        return None
+
+    mapped = np.memmap(path, dtype=np.uint8, mode='r+' if writable else 'r', offset=offset, shape=(height, stride))
+    pixels = mapped[:, :width * 3].reshape(height, width, 3)
+    if orientation == -1:
+        pixels = pixels[::-1]  # Bottom-up rows, as in BMP
+    return mapped, pixels[:, :, _RAW_CHANNELS[rawmode]]
+
+
+def map_pixels(path: str, writable: bool = False):
+    """
+    Memory-maps the pixels of an uncompressed RGB image, such as BMP, PPM/PNM or
+    an uncompressed TIFF, without decoding it.
+    
+    Parameters:
+        path (str): The path to the image file.
+        writable (bool): Map the file for writing. Changes go straight to the file.
+    
+    Returns:
+        np.ndarray: A (height, width, 3) view in RGB order, or None if the file's
+        pixels are not stored raw.
+    """
+    mapping = _map_raw(path, writable)
+    return None if mapping is None else mapping[1]
+
+
+def _embed(pixels, message, algorithm, seed, ordering, framed, bits_per_channel, chunk_pixels, compression):
+    height, width, bands = pixels.shape
+    if algorithm not in ('lsb', 'lsbm', 'rlsb'):
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if algorithm == 'lsbm' and bits_per_channel != 1:
+        raise ValueError("LSBM embeds one bit per channel")
+
+    rng = np.random.default_rng(seed)
+    order = pixel_order(width, height, seed, ordering) if algorithm == 'rlsb' else None
+    segments = payload_segments(message, algorithm, width * height * bands, framed, bits_per_channel, compression, bands)
+    for start, segment_bits_per_channel, bits in segments:
+        if algorithm == 'lsbm':
+            embed = partial(match_bits, rng=rng)
+        else:
+            embed = partial(embed_bits, bits_per_channel=segment_bits_per_channel)
+        if order is None:
+            embed_rows(pixels, bits, embed, start, chunk_pixels)
+        else:
+            embed_ordered(pixels, order, bits, embed, start, segment_bits_per_channel, chunk_pixels)
+
+
+def encode_file(input_path: str, output_path: str, message, algorithm: str, seed: int = None,
+                ordering: str = DEFAULT_ORDERING, framed: bool = True, bits_per_channel: int = 1,
+                chunk_pixels: int = CHUNK_PIXELS, compression: str = None, save_profile: str = 'default') -> bool:
+    """
+    Encodes a message from one image file into another, one band of rows at a time.
+
+    When both files have the same uncompressed format, the input is copied and
+    the copy is modified through a memory map, so peak memory depends on the
+    band size rather than the image size. Other formats are decoded and saved
+    with utils.image_utils.save_image.
+    
+    Parameters:
+        input_path (str): The path to the cover image.
+        output_path (str): The path to write the encoded image to.
+        message (str | bytes): The message to encode.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed, or the LSBM seed for the +1/-1 choices.
+        ordering (str): The RLSB pixel ordering.
+        framed (bool): Write a framed payload, or the original delimiter-terminated format.
+        bits_per_channel (int): How many low bits of each channel carry the payload (LSB and RLSB).
+        chunk_pixels (int): The approximate number of pixels per band.
+        compression (str, optional): 'auto' or a codec name to compress the payload when that makes it smaller.
+        save_profile (str): The save_image profile when the output is not memory-mapped.
+    
+    Returns:
+        bool: True if the file was encoded through a memory map.
+    """
+    same_format = os.path.splitext(input_path)[1].lower() == os.path.splitext(output_path)[1].lower()
+    if same_format and map_pixels(input_path) is not None:
+        shutil.copyfile(input_path, output_path)
+        mapped, pixels = _map_raw(output_path, writable=True)
+        _embed(pixels, message, algorithm, seed, ordering, framed, bits_per_channel, chunk_pixels, compression)
+        mapped.flush()
+        return True
+
+    with Image.open(input_path) as image:
+        if algorithm == 'lsb':
+            encoded_image = encode_lsb(image, message, framed, bits_per_channel, compression)
+        elif algorithm == 'lsbm':
+            if bits_per_channel != 1:
+                raise ValueError("LSBM embeds one bit per channel")
+            encoded_image = encode_lsbm(image, message, seed, framed, compression)
+        elif algorithm == 'rlsb':
+            encoded_image = encode_rlsb(image, message, seed, ordering, framed, bits_per_channel, compression)
+        else:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+    save_image(encoded_image, output_path, save_profile)
+    return False
+
+
+def decode_file(path: str, algorithm: str, seed: int = None, ordering: str = DEFAULT_ORDERING,
+                strict: bool = False, chunk_pixels: int = CHUNK_PIXELS):
+    """
+    Decodes a message from an image file, reading uncompressed formats through a
+    read-only memory map one band at a time.
+    
+    Parameters:
+        path (str): The path to the encoded image.
+        algorithm (str): 'lsb', 'lsbm' or 'rlsb'.
+        seed (int): The RLSB seed.
+        ordering (str): The RLSB pixel ordering.
+        strict (bool): Raise PayloadError when the image holds no framed payload.
+        chunk_pixels (int): The approximate largest number of pixels per band.
+    
+    Returns:
+        str | bytes: The decoded message.
+    """
+    pixels = map_pixels(path)
+    if pixels is None:
+        with Image.open(path) as image:
+            if algorithm == 'lsb':
+                return decode_lsb(image, strict)
+            if algorithm == 'lsbm':
+                return decode_lsbm(image, strict)
+            if algorithm == 'rlsb':
+                return decode_rlsb(image, seed, ordering, strict)
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    height, width, bands = pixels.shape
+    if algorithm in ('lsb', 'lsbm'):
+        bit_source = partial(iter_lsb_bits, pixels, chunk_pixels=chunk_pixels)
+    elif algorithm == 'rlsb':
+        bit_source = partial(iter_order_bits, pixels, pixel_order(width, height, seed, ordering), chunk_pixels=chunk_pixels)
+    else:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    return read_payload(bit_source, algorithm, width * height * bands, strict, bands=bands)
@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.image_utils import load_image, LOSSY_FORMATS
+from algorithms.analysis import DEFAULT_THRESHOLD, analyze_image
+from algorithms.metrics import registry, diff_snapshots
+
+# Report formats, by extension
+REPORT_FORMATS = ('.csv', '.json')
+
+# Columns of CSV reports, in order
+REPORT_COLUMNS = ('input', 'status', 'width', 'height', 'chi_square', 'rs', 'sample_pairs', 'score', 'flagged',
+                  'seconds', 'error')
+
+def check_report_path(report_path):
+    """
+    Check that a report can be written to this path, before doing the work.
+
+    Raises:
+    ValueError: If the extension is not one of REPORT_FORMATS.
+    """
+    if os.path.splitext(report_path)[1].lower() not in REPORT_FORMATS:
+        raise ValueError(f"Reports are written as {' or '.join(REPORT_FORMATS)}, not {report_path}")
+
+def find_images(paths):
+    """
+    Expand a list of files and directories into the images to analyze.
+
+    Directories are searched recursively for files Pillow reads in a lossless
+    format; lossy ones such as JPEG cannot hold an LSB payload. Files named
+    directly are always kept.
+
+    Parameters:
+    paths (list): Image files and directories.
+
+    Returns:
+    list: The image paths, each directory's in sorted order.
+    """
+    Image.init()
+    extensions = {extension for extension, format in Image.registered_extensions().items()
+                  if format not in LOSSY_FORMATS}
+    images = []
+    for path in paths:
+        if not os.path.isdir(path):
+            images.append(path)
+            continue
+        found = []
+        for directory, _, files in os.walk(path):
+            found.extend(os.path.join(directory, name) for name in files
+                         if os.path.splitext(name)[1].lower() in extensions)
+        images.extend(sorted(found))
+    return images
+
+def analyze_file(job):
+    """
+    Analyze one image. Runs in a worker process; errors are reported in the result, not raised.
+
+    Parameters:
+    job (dict): The image's 'input' path and the 'threshold' to flag it at.
+
+    Returns:
+    dict: The image's input, status ('ok' or 'error'), size, the scores of
+    algorithms.analysis.analyze_image, whether it is flagged, elapsed seconds
+    and per-stage metrics, or the error text.
+    """
+    result = {'input': job['input'], 'status': 'ok'}
+    before = registry.snapshot()
+    start = time.perf_counter()
+    try:
+        image = load_image(job['input'])
+        result['width'], result['height'] = image.size
+        result.update(analyze_image(image))
+        result['flagged'] = result['score'] >= job['threshold']
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['metrics'] = diff_snapshots(registry.snapshot(), before)
+    return result
+
+def analyze_images(paths, workers=None, threshold=DEFAULT_THRESHOLD, report=None):
+    """
+    Screen images for LSB payloads across a process pool.
+
+    Parameters:
+    paths (list): Image files and directories, expanded by find_images.
+    workers (int): The number of worker processes. Defaults to the number of cores.
+    threshold (float): Images scoring at least this are flagged.
+    report (callable): Called with each result as it completes, in path order.
+
+    The workers' per-stage metrics are merged into the shared metrics registry.
+
+    Returns:
+    tuple: (results, summary). The summary counts the images, successes,
+    failures and flagged images, and gives the elapsed seconds, images per
+    second and megapixels per second.
+    """
+    jobs = [{'input': path, 'threshold': threshold} for path in find_images(paths)]
+    workers = workers or os.cpu_count() or 1
+    # Hand out jobs in chunks so per-job IPC stays small next to the work
+    chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+
+    results = []
+    pixels = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(analyze_file, jobs, chunksize=chunksize):
+            registry.merge(result.pop('metrics', {}))
+            if result['status'] == 'ok':
+                pixels += result['width'] * result['height']
+            results.append(result)
+            if report is not None:
+                report(result)
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(result['status'] == 'ok' for result in results)
+    summary = {
+        'images': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'flagged': sum(bool(result.get('flagged')) for result in results),
+        'threshold': threshold,
+        'seconds': elapsed,
+        'images_per_second': len(results) / elapsed if elapsed else 0.0,
+        'megapixels_per_second': pixels / 1e6 / elapsed if elapsed else 0.0,
+    }
+    return results, summary
+
+def write_report(report_path, results, summary):
+    """
+    Write per-image results to a CSV file, one row per image, or to a JSON
+    document holding the results under 'images' and the summary under 'summary'.
+
+    Raises:
+    ValueError: If the extension is not one of REPORT_FORMATS.
+    """
+    check_report_path(report_path)
+    with open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+        if report_path.lower().endswith('.csv'):
+            writer = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            json.dump({'images': results, 'summary': summary}, report_file, indent=2)
@@ -0,0 +1,197 @@
+import base64
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.image_utils import load_image, save_image, check_lossless
+from algorithms.registry import DEFAULT_ORDERING, get_algorithm
+from algorithms.bitplane import cover_mode
+from algorithms.metrics import registry, diff_snapshots
+
+DEFAULT_SEED = 12345
+
+def load_manifest(manifest_path):
+    """
+    Load batch jobs from a CSV or JSON-lines manifest.
+
+    Each row has the columns input, output, algorithm, message or message_file,
+    and optionally seed, bits (payload bits per channel), compression ('none',
+    'auto', 'zlib', 'lzma' or 'bz2'), ordering (the RLSB pixel ordering),
+    save_profile ('default', 'fast' or 'small') and action ('encode' or
+    'decode', default 'encode').
+    Relative paths are resolved against the manifest's directory.
+
+    Parameters:
+    manifest_path (str): The path to a .csv or .jsonl manifest.
+
+    Returns:
+    list: The jobs as dictionaries.
+    """
+    with open(manifest_path, newline='', encoding='utf-8') as manifest:
+        if manifest_path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(manifest))
+        else:
+            rows = [json.loads(line) for line in manifest if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for row in rows:
+        job = {key: value for key, value in row.items() if value not in (None, '')}
+        for key in ('input', 'output', 'message_file'):
+            if key in job:
+                job[key] = os.path.join(base_dir, job[key])
+        jobs.append(job)
+    return jobs
+
+def output_path(input_path, output_dir):
+    """
+    Return where an encoded copy of an image goes: under its own name in
+    output_dir, or as PNG if its format is lossy.
+    """
+    output_name = os.path.basename(input_path)
+    try:
+        check_lossless(output_name)
+    except ValueError:
+        output_name = os.path.splitext(output_name)[0] + '.png'
+    return os.path.join(output_dir, output_name)
+
+def glob_jobs(pattern, output_dir, algorithm, action='encode', message=None, message_file=None, seed=DEFAULT_SEED, bits=1,
+              compression='none', save_profile='default'):
+    """
+    Build one job per file matching a glob pattern, all sharing the same settings.
+
+    Parameters:
+    pattern (str): The glob pattern selecting the input images.
+    output_dir (str): The directory encoded images are written to, under their input
+        names. Inputs in lossy formats such as JPEG are written as PNG.
+    algorithm (str): The algorithm for every job.
+    action (str): 'encode' or 'decode'.
+    message (str): The message to encode.
+    message_file (str): A file whose raw bytes are encoded, instead of message.
+    seed (int): The RLSB seed.
+    bits (int): Payload bits per channel for LSB and RLSB.
+    compression (str): Payload compression: 'none', 'auto' or a codec name.
+    save_profile (str): How hard to compress the encoded images: 'default', 'fast' or 'small'.
+
+    Returns:
+    list: The jobs as dictionaries.
+    """
+    jobs = []
+    for input_path in sorted(glob.glob(pattern, recursive=True)):
+        job = {'input': input_path, 'algorithm': algorithm, 'action': action, 'seed': seed, 'bits': bits,
+               'compression': compression}
+        if action == 'encode':
+            job['output'] = output_path(input_path, output_dir)
+            job['save_profile'] = save_profile
+            if message_file is not None:
+                job['message_file'] = message_file
+            else:
+                job['message'] = message
+        jobs.append(job)
+    return jobs
+
+def add_message(result, message):
+    """
+    Store a decoded message in a JSON-serializable result, as text or base64.
+    """
+    if isinstance(message, bytes):
+        result['payload_base64'] = base64.b64encode(message).decode('ascii')
+    else:
+        result['message'] = message
+
+def run_job(job):
+    """
+    Run a single encode or decode job. Errors are reported in the result, not raised.
+
+    Parameters:
+    job (dict): The job, as produced by load_manifest or glob_jobs.
+
+    Returns:
+    dict: The job's input, status ('ok' or 'error'), elapsed seconds, input
+    size in bytes and per-stage metrics, plus the decoded message
+    (payload_base64 for binary payloads) or the error text.
+    """
+    result = {'input': job.get('input'), 'status': 'ok', 'bytes': 0}
+    before = registry.snapshot()
+    start = time.perf_counter()
+    try:
+        action = job.get('action', 'encode')
+        algorithm = get_algorithm(job['algorithm'])
+        seed = int(job.get('seed', DEFAULT_SEED))
+        bits = int(job.get('bits', 1))
+        compression = job.get('compression', 'none')
+        ordering = job.get('ordering', DEFAULT_ORDERING)
+
+        result['bytes'] = os.path.getsize(job['input'])
+        if action == 'encode':
+            # A lossy output would destroy the message, so fail before doing the work
+            check_lossless(job['output'])
+        # Decode jobs often revisit one image with several algorithms or seeds
+        image = load_image(job['input'], cache=action == 'decode')
+
+        if action == 'encode':
+            # The cover may be in a mode the output format cannot store
+            check_lossless(job['output'], cover_mode(image))
+            if 'message_file' in job:
+                # Read as bytes, as encode --message-file does, so any file round-trips
+                with open(job['message_file'], 'rb') as message_file:
+                    message = message_file.read()
+            else:
+                message = job['message']
+            encoded_image = algorithm.encode(image, message, seed, ordering, bits, compression, in_place=True)
+            save_image(encoded_image, job['output'], job.get('save_profile', 'default'))
+            result['output'] = job['output']
+        elif action == 'decode':
+            add_message(result, algorithm.decode(image, seed, ordering))
+        else:
+            raise ValueError(f"Unknown action: {action}")
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['metrics'] = diff_snapshots(registry.snapshot(), before)
+    return result
+
+def run_batch(jobs, workers=None, report=None):
+    """
+    Run jobs across a process pool and summarize the throughput.
+
+    Parameters:
+    jobs (list): The jobs to run.
+    workers (int): The number of worker processes. Defaults to the number of cores.
+    report (callable): Called with each result as it completes, in job order.
+
+    The workers' per-stage metrics are merged into the shared metrics registry.
+
+    Returns:
+    dict: The summary: counts of images, successes and failures, elapsed
+    seconds, images per second and megabytes per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Hand out jobs in chunks so per-job IPC stays small next to the work
+    chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+
+    succeeded = failed = total_bytes = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(run_job, jobs, chunksize=chunksize):
+            registry.merge(result.pop('metrics', {}))
+            if result['status'] == 'ok':
+                succeeded += 1
+            else:
+                failed += 1
+            total_bytes += result['bytes']
+            if report is not None:
+                report(result)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'images': len(jobs),
+        'succeeded': succeeded,
+        'failed': failed,
+        'seconds': elapsed,
+        'images_per_second': len(jobs) / elapsed if elapsed else 0.0,
+        'megabytes_per_second': total_bytes / 1e6 / elapsed if elapsed else 0.0,
+    }
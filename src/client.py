@@ -0,0 +1,154 @@
+import argparse
+import base64
+import json
+import os
+import socket
+import sys
+
+# Socket used when neither --socket nor VISOR_SOCKET is given
+DEFAULT_SOCKET = '/tmp/visor.sock'
+
+class StegoClient:
+    """
+    Sends requests to a server started with 'main.py serve --socket PATH'.
+    Uses only the standard library, so it starts far faster than main.py.
+    """
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or os.environ.get('VISOR_SOCKET', DEFAULT_SOCKET)
+        self._socket = None
+        self._file = None
+        self._next_id = 0
+
+    def connect(self):
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(self.socket_path)
+            self._file = self._socket.makefile('rb')
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = self._file = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, action, **fields):
+        """
+        Send one request and wait for its response.
+
+        Parameters:
+        action (str): 'encode', 'decode', 'ping' or 'shutdown'.
+        fields: The other request fields, as described in server.handle_request.
+
+        Returns:
+        dict: The response.
+        """
+        self.connect()
+        self._next_id += 1
+        request = dict(fields, action=action, id=self._next_id)
+        self._socket.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        return json.loads(line)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Steganography Tool client; takes the same encode and decode arguments as main.py")
+    parser.add_argument('--socket', type=str, help=f'Server socket (default: $VISOR_SOCKET or {DEFAULT_SOCKET})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode_parser = subparsers.add_parser('encode', help='Encode a message into an image')
+    encode_parser.add_argument('algorithm', choices=['lsb', 'lsbm', 'rlsb'], help='Encoding algorithm')
+    encode_parser.add_argument('input_image', type=str, help='Path to the input image')
+    encode_parser.add_argument('output_image', type=str, help='Path to the output image')
+    encode_parser.add_argument('message', type=str, nargs='?', help='Message to encode')
+    encode_parser.add_argument('--message-file', type=str, help='Encode the raw bytes of this file instead of a message')
+    encode_parser.add_argument('--seed', type=int, default=12345, help='Seed for RLSB encoding (only used with RLSB)')
+    encode_parser.add_argument('--ordering', type=str, help='RLSB pixel ordering (only used with RLSB)')
+    encode_parser.add_argument('--bits', type=int, choices=range(1, 5), default=1, help='Payload bits per color channel (LSB and RLSB only)')
+    encode_parser.add_argument('--compress', type=str, default='none', help='Payload compression')
+    encode_parser.add_argument('--save-profile', type=str, help='Output compression: "fast" or "small" (default: the server\'s)')
+
+    decode_parser = subparsers.add_parser('decode', help='Decode a message from an image')
+    decode_parser.add_argument('algorithm', choices=['lsb', 'lsbm', 'rlsb'], help='Decoding algorithm')
+    decode_parser.add_argument('input_image', type=str, help='Path to the input image')
+    decode_parser.add_argument('--seed', type=int, default=12345, help='Seed for RLSB decoding (only used with RLSB)')
+    decode_parser.add_argument('--ordering', type=str, help='RLSB pixel ordering (only used with RLSB)')
+    decode_parser.add_argument('--output-file', type=str, help='Write the decoded payload to this file')
+
+    subparsers.add_parser('ping', help='Check that the server is running')
+    subparsers.add_parser('shutdown', help='Stop the server once its requests in flight are answered')
+
+    args = parser.parse_args()
+    if args.command == 'encode':
+        if (args.message is None) == (args.message_file is None):
+            parser.error('give either a message or --message-file')
+    return args
+
+def build_request(args):
+    """
+    Turn encode or decode arguments into request fields. Paths are made
+    absolute, as the server may run in another directory.
+    """
+    fields = {'algorithm': args.algorithm, 'input': os.path.abspath(args.input_image), 'seed': args.seed}
+    if args.ordering:
+        fields['ordering'] = args.ordering
+    if args.command == 'encode':
+        fields.update(output=os.path.abspath(args.output_image), bits=args.bits, compression=args.compress)
+        if args.save_profile:
+            fields['save_profile'] = args.save_profile
+        if args.message_file is not None:
+            with open(args.message_file, 'rb') as message_file:
+                fields['message_base64'] = base64.b64encode(message_file.read()).decode('ascii')
+        else:
+            fields['message'] = args.message
+    return fields
+
+def describe(algorithm, seed):
+    description = f"using {algorithm.upper()}"
+    if algorithm == 'rlsb':
+        description += f" with seed {seed}"
+    return description
+
+def main():
+    args = parse_args()
+    with StegoClient(args.socket) as client:
+        if args.command in ('ping', 'shutdown'):
+            response = client.request(args.command)
+        else:
+            response = client.request(args.command, **build_request(args))
+
+    if response['status'] != 'ok':
+        print(f"Error: {response['error']}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'ping':
+        print(f"Server worker {response['pid']} answered in {response['total_seconds']:.3f}s")
+    elif args.command == 'shutdown':
+        print("Server stopping")
+    elif args.command == 'encode':
+        print(f"Message encoded {describe(args.algorithm, args.seed)} and saved to {args.output_image}")
+    elif args.command == 'decode':
+        description = describe(args.algorithm, args.seed)
+        if 'payload_base64' in response:
+            payload = base64.b64decode(response['payload_base64'])
+        else:
+            payload = response['message']
+        if args.output_file:
+            with open(args.output_file, 'wb') as payload_file:
+                payload_file.write(payload.encode('utf-8') if isinstance(payload, str) else payload)
+            print(f"Decoded payload {description} and saved to {args.output_file}")
+        elif isinstance(payload, bytes):
+            print(f"Decoded {len(payload)} bytes of binary data {description}; use --output-file to save them")
+        else:
+            print(f"Decoded message {description}: {payload}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import hashlib
+import os
+import sqlite3
+import time
+from algorithms.registry import algorithms, get_algorithm
+from algorithms.metrics import stage
+
+# Pillow and numpy are imported by the functions that scan, so pick_cover
+# answers without loading them.
+
+# Bump when the tables change; older databases are rebuilt on the next scan
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    mode TEXT,
+    frames INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS capacities (
+    path TEXT NOT NULL REFERENCES covers (path) ON DELETE CASCADE,
+    algorithm TEXT NOT NULL,
+    bits INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    frame_bytes INTEGER,
+    PRIMARY KEY (path, algorithm, bits)
+);
+CREATE INDEX IF NOT EXISTS capacities_by_bytes ON capacities (algorithm, bits, bytes);
+CREATE INDEX IF NOT EXISTS capacities_by_frame_bytes ON capacities (algorithm, bits, frame_bytes);
+"""
+
+# How much of a file is hashed at a time
+CHUNK_BYTES = 1024 * 1024
+
+def open_index(database_path):
+    """
+    Open a cover index, creating its tables if needed.
+
+    Parameters:
+    database_path (str): The SQLite database file.
+
+    Returns:
+    sqlite3.Connection: The connection, with rows readable by column name.
+    """
+    connection = sqlite3.connect(database_path)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA foreign_keys = ON')
+    if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        with connection:
+            connection.execute('DROP TABLE IF EXISTS capacities')
+            connection.execute('DROP TABLE IF EXISTS covers')
+            connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    connection.executescript(SCHEMA)
+    return connection
+
+def file_digest(path):
+    """
+    Return the hex SHA-256 of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cover_capacities(width, height, mode, frames=1):
+    """
+    Return how many payload bytes each registered algorithm can embed in a cover.
+
+    Parameters:
+    width (int), height (int): The cover's size.
+    mode (str): The mode the cover is embedded in, as bitplane.cover_mode gives it.
+    frames (int): The number of frames or pages.
+
+    Returns:
+    list: (algorithm, bits, bytes, frame_bytes) tuples, one per algorithm and
+    payload bits per channel it takes. bytes is the capacity of the first
+    frame, as encode uses it; frame_bytes is that of every frame, as
+    encode --frames uses it, or None for algorithms --frames does not support.
+    """
+    from PIL import Image
+    from algorithms.payload import payload_capacity
+    from algorithms.bitplane import MAX_BITS_PER_CHANNEL
+    bands = Image.getmodebands(mode)
+    channels = width * height * bands
+    capacities = []
+    for algorithm in algorithms():
+        for bits in range(1, MAX_BITS_PER_CHANNEL + 1 if 'bits' in algorithm.options else 2):
+            frame_bytes = payload_capacity(channels * frames, bits, bands) if algorithm.tiled else None
+            capacities.append((algorithm.name, bits, payload_capacity(channels, bits, bands), frame_bytes))
+    return capacities
+
+def _read_header(path):
+    # The image's fields and capacities, from its header; no pixels are decoded
+    from PIL import Image
+    from algorithms.bitplane import cover_mode
+    with Image.open(path) as image:
+        fields = {'format': image.format, 'width': image.width, 'height': image.height, 'mode': image.mode,
+                  'frames': getattr(image, 'n_frames', 1)}
+        return fields, cover_capacities(image.width, image.height, cover_mode(image), fields['frames'])
+
+def _image_files(directory):
+    from PIL import Image
+    Image.init()
+    extensions = set(Image.registered_extensions())
+    for parent, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(parent, name)
+
+def scan_covers(database_path, directories, report=None):
+    """
+    Index the images under some directories, or bring their index up to date.
+
+    Files are identified by path, and only files whose size or modification
+    time changed since the last scan are read again: each is hashed and its
+    header read with Image.open, without decoding the pixels. Entries for
+    files that no longer exist under the directories are removed. Files that
+    cannot be opened, or whose mode cannot carry a payload, are recorded with
+    the error, so they are not read again until they change.
+
+    Parameters:
+    database_path (str): The SQLite database file, created if missing.
+    directories (list): The directories to scan, recursively.
+    report (callable): Called with each added or updated cover's path, status
+        ('added', 'updated' or 'error') and the error text.
+
+    Returns:
+    dict: The summary: counts of covers added, updated, removed, unchanged and
+    failed, and elapsed seconds.
+    """
+    summary = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'failed': 0}
+    start = time.perf_counter()
+    connection = open_index(database_path)
+    try:
+        with connection:
+            for directory in directories:
+                directory = os.path.abspath(directory)
+                prefix = os.path.join(directory, '')
+                indexed = {row['path']: (row['size'], row['mtime_ns']) for row in connection.execute(
+                    'SELECT path, size, mtime_ns FROM covers WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))}
+
+                for path in sorted(_image_files(directory)):
+                    stat = os.stat(path)
+                    known = indexed.pop(path, None)
+                    if known == (stat.st_size, stat.st_mtime_ns):
+                        summary['unchanged'] += 1
+                        continue
+                    result = {'path': path, 'status': 'updated' if known else 'added'}
+                    row = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'format': None,
+                           'width': None, 'height': None, 'mode': None, 'frames': None, 'error': None}
+                    capacities = []
+                    with stage('load', nbytes=stat.st_size) as counts:
+                        row['sha256'] = file_digest(path)
+                        try:
+                            fields, capacities = _read_header(path)
+                            row.update(fields)
+                            counts['pixels'] = row['width'] * row['height']
+                        except Exception as e:
+                            row['error'] = result['error'] = f"{type(e).__name__}: {e}"
+                            result['status'] = 'error'
+
+                    # Replacing the row drops the file's old capacities with it
+                    connection.execute('DELETE FROM covers WHERE path = ?', (path,))
+                    connection.execute('INSERT INTO covers (path, size, mtime_ns, sha256, format, width, height, mode, '
+                                       'frames, error) VALUES (:path, :size, :mtime_ns, :sha256, :format, :width, '
+                                       ':height, :mode, :frames, :error)', row)
+                    connection.executemany(
+                        'INSERT INTO capacities (path, algorithm, bits, bytes, frame_bytes) VALUES (?, ?, ?, ?, ?)',
+                        [(path,) + capacity for capacity in capacities])
+                    summary['failed' if row['error'] else result['status']] += 1
+                    if report is not None:
+                        report(result)
+
+                connection.executemany('DELETE FROM covers WHERE path = ?', [(path,) for path in indexed])
+                summary['removed'] += len(indexed)
+    finally:
+        connection.close()
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+def pick_cover(database_path, payload_bytes, algorithm='lsb', bits=1, frames=False):
+    """
+    Find the smallest indexed cover that holds a payload.
+
+    Candidates are taken in order of capacity from the index, and the first
+    whose file is unchanged since it was indexed is returned, so a stale entry
+    is never picked.
+
+    Parameters:
+    database_path (str): The SQLite database written by scan_covers.
+    payload_bytes (int): The payload size in bytes, after any compression.
+    algorithm (str): The algorithm the payload will be embedded with.
+    bits (int): Payload bits per channel.
+    frames (bool): Count the capacity of every frame, as encode --frames uses it.
+
+    Returns:
+    dict: The cover's path, size, mtime_ns, sha256, format, width, height,
+    mode, frames and capacity in bytes, or None if no indexed cover holds the
+    payload.
+
+    Raises:
+    FileNotFoundError: If the database does not exist.
+    """
+    algorithm = get_algorithm(algorithm)
+    if not os.path.exists(database_path):
+        raise FileNotFoundError(f"No cover index at {database_path}; create it with scan_covers")
+    column = 'frame_bytes' if frames else 'bytes'
+    connection = open_index(database_path)
+    try:
+        rows = connection.execute(
+            f'SELECT covers.*, capacities.{column} AS capacity FROM capacities '
+            f'JOIN covers ON covers.path = capacities.path '
+            f'WHERE capacities.algorithm = ? AND capacities.bits = ? AND capacities.{column} >= ? '
+            f'ORDER BY capacities.{column}, covers.path',
+            (algorithm.name, bits, payload_bytes))
+        for row in rows:
+            try:
+                stat = os.stat(row['path'])
+            except OSError:
+                continue
+            if (stat.st_size, stat.st_mtime_ns) == (row['size'], row['mtime_ns']):
+                cover = dict(row)
+                cover.pop('error')
+                return cover
+        return None
+    finally:
+        connection.close()
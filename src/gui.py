@@ -1,19 +1,92 @@
+import os
 import sys
+import threading
+from functools import lru_cache
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QFileDialog, QComboBox, QMessageBox, QPlainTextEdit, QGridLayout
+    QPushButton, QFileDialog, QComboBox, QMessageBox, QPlainTextEdit, QGridLayout, QSpinBox,
+    QProgressBar
 )
-from PyQt5.QtGui import QIcon, QPixmap
-from PyQt5.QtCore import Qt
-from PIL import Image
-from utils.image_utils import load_image, save_image
-from algorithms.lsb import encode_lsb, decode_lsb
-from algorithms.lsbm import encode_lsbm, decode_lsbm
-from algorithms.rlsb import encode_rlsb, decode_rlsb
+from PyQt5.QtGui import QIcon, QImage, QPixmap
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from algorithms.registry import algorithms, algorithm_names, get_algorithm
+
+# Pillow, numpy and the algorithm implementations load on first use, so the
+# window opens without waiting for them.
+
+DEFAULT_SEED = 12345
+
+PREVIEW_SIZE = (200, 200)
+
+@lru_cache(maxsize=32)
+def cached_thumbnail(path, mtime, size=PREVIEW_SIZE):
+    """
+    Returns a preview of an image file. The modification time is part of the
+    key, so a file that changes on disk gets a fresh preview. The file is
+    decoded into the shared image cache, so the job run on it later does not
+    decode it again.
+    """
+    from utils.image_utils import create_thumbnail, shared_image
+    return create_thumbnail(shared_image(path), size)
+
+def preview_pixmap(thumbnail):
+    """
+    Converts an RGBA Pillow preview to a QPixmap. Must run on the GUI thread.
+    """
+    data = thumbnail.tobytes()
+    qimage = QImage(data, thumbnail.width, thumbnail.height, thumbnail.width * 4, QImage.Format_RGBA8888)
+    return QPixmap.fromImage(qimage.copy())
+
+class OperationCancelled(Exception):
+    """
+    Raised inside a worker's progress callback to stop an encode or decode.
+    """
+
+class WorkerSignals(QObject):
+    # Bits done and bits in total; a total of 0 means the length is not known yet
+    progress = pyqtSignal('qint64', 'qint64')
+    # The text to report and the output preview, if any
+    finished = pyqtSignal(str, object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+class Worker(QRunnable):
+    """
+    Runs an encode or decode task off the GUI thread. The task is called with a
+    progress keyword argument and returns the text to report when it is done
+    and a preview of the output image, or None.
+    """
+
+    def __init__(self, task, *args):
+        super().__init__()
+        self.task = task
+        self.args = args
+        self.signals = WorkerSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def report_progress(self, done, total):
+        if self._cancel.is_set():
+            raise OperationCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            text, preview = self.task(*self.args, progress=self.report_progress)
+        except OperationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(text, preview)
 
 class SteganographyApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.worker = None
+        self.thread_pool = QThreadPool()
         self.initUI()
 
     def initUI(self):
@@ -35,12 +108,20 @@ class SteganographyApp(QWidget):
         # Algorithm selection
         algorithm_label = QLabel('Algorithm:')
         self.algorithm_combo = QComboBox()
-        self.algorithm_combo.addItem('LSB')
-        self.algorithm_combo.addItem('LSBM')
-        self.algorithm_combo.addItem('RLSB')
+        for algorithm in algorithms():
+            self.algorithm_combo.addItem(algorithm.label, algorithm.name)
+            self.algorithm_combo.setItemData(self.algorithm_combo.count() - 1, algorithm.description, Qt.ToolTipRole)
+        self.algorithm_combo.currentIndexChanged.connect(self.update_ui)
         layout.addWidget(algorithm_label, 1, 0)
         layout.addWidget(self.algorithm_combo, 1, 1)
 
+        # Payload bits per channel (LSB and RLSB encoding; decoders read it from the image)
+        self.bits_spin = QSpinBox()
+        self.bits_spin.setRange(1, 4)
+        self.bits_spin.setPrefix('Bits/channel: ')
+        self.bits_spin.setToolTip('Payload bits stored in each color channel')
+        layout.addWidget(self.bits_spin, 1, 2)
+
         # Input image
         input_image_label = QLabel('Input Image:')
         self.input_image_edit = QLineEdit()
@@ -65,10 +146,21 @@ class SteganographyApp(QWidget):
         layout.addWidget(self.message_label, 4, 0)
         layout.addWidget(self.message_edit, 4, 1, 1, 2)
 
-        # Process button
+        # Process and cancel buttons
         self.process_button = QPushButton('Process')
         self.process_button.clicked.connect(self.process)
-        layout.addWidget(self.process_button, 5, 0, 1, 3)
+        layout.addWidget(self.process_button, 5, 0, 1, 2)
+
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button, 5, 2)
+
+        # Progress of the running job
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar, 6, 0, 1, 3)
 
         # Image preview
         self.input_image_preview = QLabel()
@@ -85,14 +177,20 @@ class SteganographyApp(QWidget):
 
     def browse_input_image(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getOpenFileName(self, "Select Input Image", "", "Images (*.png *.jpg *.bmp)", options=options)
+        file_name, _ = QFileDialog.getOpenFileName(self, "Select Input Image", "", "Images (*.png *.jpg *.bmp *.tif *.tiff)", options=options)
         if file_name:
             self.input_image_edit.setText(file_name)
-            self.input_image_preview.setPixmap(QPixmap(file_name).scaled(200, 200, Qt.KeepAspectRatio))
+            try:
+                thumbnail = cached_thumbnail(file_name, os.path.getmtime(file_name))
+            except Exception:
+                self.input_image_preview.setPixmap(QPixmap())
+            else:
+                self.input_image_preview.setPixmap(preview_pixmap(thumbnail))
 
     def browse_output_image(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getSaveFileName(self, "Select Output Image", "", "Images (*.png *.jpg *.bmp)", options=options)
+        # Only lossless formats: a JPEG would destroy the message
+        file_name, _ = QFileDialog.getSaveFileName(self, "Select Output Image", "", "Images (*.png *.bmp *.tif *.tiff *.ppm *.webp)", options=options)
         if file_name:
             self.output_image_edit.setText(file_name)
 
@@ -108,12 +206,15 @@ class SteganographyApp(QWidget):
             self.output_image_label.setVisible(False)
             self.output_image_edit.setVisible(False)
             self.output_image_button.setVisible(False)
-            self.message_label.setText('Seed (for RLSB):')
+            seed_labels = ', '.join(name.upper() for name in algorithm_names('seed'))
+            self.message_label.setText(f'Seed (for {seed_labels}):')
             self.message_edit.setReadOnly(True)
+        algorithm = get_algorithm(self.algorithm_combo.currentData())
+        self.bits_spin.setEnabled(action == 'Encode' and 'bits' in algorithm.options)
 
     def process(self):
         action = self.action_combo.currentText().lower()
-        algorithm = self.algorithm_combo.currentText().lower()
+        algorithm = get_algorithm(self.algorithm_combo.currentData())
         input_image_path = self.input_image_edit.text()
         output_image_path = self.output_image_edit.text()
         message_or_seed = self.message_edit.toPlainText()
@@ -122,74 +223,105 @@ class SteganographyApp(QWidget):
             QMessageBox.warning(self, 'Warning', 'Please fill in the input image field.')
             return
 
-        try:
-            if action == 'encode':
-                if not message_or_seed:
-                    QMessageBox.warning(self, 'Warning', 'Please enter a message to encode.')
-                    return
-                message = message_or_seed
-                if not output_image_path:
-                    QMessageBox.warning(self, 'Warning', 'Please enter an output image path.')
-                    return
-                if algorithm == 'lsb':
-                    self.encode_lsb_mode(input_image_path, output_image_path, message)
-                elif algorithm == 'lsbm':
-                    self.encode_lsbm_mode(input_image_path, output_image_path, message)
-                elif algorithm == 'rlsb':
-                    seed = int(message_or_seed) if message_or_seed.isdigit() else 12345
-                    self.encode_rlsb_mode(input_image_path, output_image_path, message, seed)
-                else:
-                    QMessageBox.warning(self, 'Warning', f'Unknown algorithm: {algorithm}')
-                    return
-            elif action == 'decode':
-                seed = int(message_or_seed) if algorithm == 'rlsb' and message_or_seed.isdigit() else 12345
-                if algorithm == 'lsb':
-                    self.decode_lsb_mode(input_image_path)
-                elif algorithm == 'lsbm':
-                    self.decode_lsbm_mode(input_image_path)
-                elif algorithm == 'rlsb':
-                    self.decode_rlsb_mode(input_image_path, seed)
-                else:
-                    QMessageBox.warning(self, 'Warning', f'Unknown algorithm: {algorithm}')
-                    return
-
-            self.output_image_preview.setPixmap(QPixmap(output_image_path).scaled(200, 200, Qt.KeepAspectRatio) if output_image_path else QPixmap())
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', str(e))
-            return
+        if action == 'encode':
+            if not message_or_seed:
+                QMessageBox.warning(self, 'Warning', 'Please enter a message to encode.')
+                return
+            message = message_or_seed
+            if not output_image_path:
+                QMessageBox.warning(self, 'Warning', 'Please enter an output image path.')
+                return
+            from utils.image_utils import check_lossless
+            try:
+                check_lossless(output_image_path)
+            except ValueError as e:
+                QMessageBox.warning(self, 'Warning', str(e))
+                return
+            bits = self.bits_spin.value() if 'bits' in algorithm.options else 1
+            seed = int(message_or_seed) if message_or_seed.isdigit() else DEFAULT_SEED
+            worker = Worker(self.encode_mode, algorithm, input_image_path, output_image_path, message, seed, bits)
+        elif action == 'decode':
+            seed = int(message_or_seed) if message_or_seed.isdigit() else DEFAULT_SEED
+            worker = Worker(self.decode_mode, algorithm, input_image_path, seed)
+
+        worker.signals.progress.connect(self.show_progress)
+        worker.signals.finished.connect(self.job_finished)
+        worker.signals.failed.connect(self.job_failed)
+        worker.signals.cancelled.connect(self.job_cancelled)
+        self.start_worker(worker)
+
+    def start_worker(self, worker):
+        self.worker = worker
+        self.process_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.thread_pool.start(worker)
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def show_progress(self, done, total):
+        if total:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(1000 * done / total))
+        else:
+            # The payload length is not known yet, so show a busy indicator
+            self.progress_bar.setRange(0, 0)
+
+    def finish_worker(self):
+        self.worker = None
+        self.process_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setRange(0, 1000)
+
+    def job_finished(self, text, preview):
+        self.finish_worker()
+        self.progress_bar.setValue(1000)
+        self.output_image_preview.setPixmap(preview_pixmap(preview) if preview is not None else QPixmap())
+        QMessageBox.information(self, 'Success', text)
+
+    def job_failed(self, error):
+        self.finish_worker()
+        self.progress_bar.setValue(0)
+        QMessageBox.critical(self, 'Error', error)
+
+    def job_cancelled(self):
+        self.finish_worker()
+        self.progress_bar.setValue(0)
+
+    def load_input(self, input_image_path):
+        """
+        Returns the decoded input image. It comes from the shared image cache,
+        so repeated jobs on an unchanged file decode it once.
+        """
+        from utils.image_utils import load_image
+        return load_image(input_image_path, cache=True)
+
+    def save_output(self, image, output_image_path):
+        """
+        Saves an encoded image and returns its preview, built from memory.
+        """
+        from utils.image_utils import save_image, create_thumbnail
+        save_image(image, output_image_path)
+        return create_thumbnail(image, PREVIEW_SIZE)
+
+    # The encode and decode helpers run on a worker thread: they must not touch widgets,
+    # and they return the text to show once the job is done and the output preview.
+
+    def encode_mode(self, algorithm, input_image_path, output_image_path, message, seed, bits=1, progress=None):
+        input_image = self.load_input(input_image_path)
+        # load_input hands out a copy of the cached image, so it can be modified in place
+        encoded_image = algorithm.encode(input_image, message, seed, bits=bits, progress=progress, in_place=True)
+        preview = self.save_output(encoded_image, output_image_path)
+        return f'Message encoded {algorithm.describe(seed)} and saved to {output_image_path}', preview
 
-    def encode_lsb_mode(self, input_image_path, output_image_path, message):
-        input_image = load_image(input_image_path)
-        encoded_image = encode_lsb(input_image, message)
-        save_image(encoded_image, output_image_path)
-        QMessageBox.information(self, 'Success', f'Message encoded using LSB and saved to {output_image_path}')
-
-    def decode_lsb_mode(self, input_image_path):
-        input_image = load_image(input_image_path)
-        message = decode_lsb(input_image)
-        QMessageBox.information(self, 'Success', f'Decoded message using LSB: {message}')
-
-    def encode_lsbm_mode(self, input_image_path, output_image_path, message):
-        input_image = load_image(input_image_path)
-        encoded_image = encode_lsbm(input_image, message)
-        save_image(encoded_image, output_image_path)
-        QMessageBox.information(self, 'Success', f'Message encoded using LSBM and saved to {output_image_path}')
-
-    def decode_lsbm_mode(self, input_image_path):
-        input_image = load_image(input_image_path)
-        message = decode_lsbm(input_image)
-        QMessageBox.information(self, 'Success', f'Decoded message using LSBM: {message}')
-
-    def encode_rlsb_mode(self, input_image_path, output_image_path, message, seed):
-        input_image = load_image(input_image_path)
-        encoded_image = encode_rlsb(input_image, message, seed)
-        save_image(encoded_image, output_image_path)
-        QMessageBox.information(self, 'Success', f'Message encoded using RLSB with seed {seed} and saved to {output_image_path}')
-
-    def decode_rlsb_mode(self, input_image_path, seed):
-        input_image = load_image(input_image_path)
-        message = decode_rlsb(input_image, seed)
-        QMessageBox.information(self, 'Success', f'Decoded message using RLSB with seed {seed}: {message}')
+    def decode_mode(self, algorithm, input_image_path, seed, progress=None):
+        input_image = self.load_input(input_image_path)
+        message = algorithm.decode(input_image, seed, progress=progress)
+        return f'Decoded message {algorithm.describe(seed)}: {message}', None
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
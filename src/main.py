@@ -1,78 +1,446 @@
 import argparse
-from PIL import Image
-from utils.image_utils import load_image, save_image
-from algorithms.lsb import encode_lsb, decode_lsb
-from algorithms.lsbm import encode_lsbm, decode_lsbm
-from algorithms.rlsb import encode_rlsb, decode_rlsb
+import base64
+import json
+import logging
+import os
+import sys
+from algorithms.registry import ORDERINGS, DEFAULT_ORDERING, COMPRESSION, algorithms, algorithm_names, get_algorithm
+from algorithms.metrics import registry, format_snapshot
+
+# numpy, Pillow and the algorithm implementations are imported by the command
+# that needs them, so --help and argument errors return without loading them.
+
+# The profiles in utils.image_utils.SAVE_PROFILES, listed here so --help needs no Pillow
+SAVE_PROFILES = ('default', 'fast', 'small')
+
+def describe_algorithms(names):
+    return '; '.join(f"{algorithm.name}: {algorithm.description}" for algorithm in algorithms() if algorithm.name in names)
+
+def join_labels(names):
+    labels = [name.upper() for name in names]
+    return ' and '.join(labels) if len(labels) < 3 else ', '.join(labels[:-1]) + ' and ' + labels[-1]
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Steganography Tool")
+    names = algorithm_names()
+    bit_names = join_labels(algorithm_names('bits'))
+    seed_names = join_labels(algorithm_names('seed'))
+    striped_names = join_labels(algorithm_names('striped'))
     subparsers = parser.add_subparsers(dest='command', required=True)
 
-    encode_parser = subparsers.add_parser('encode', help='Encode a message into an image')
-    encode_parser.add_argument('algorithm', choices=['lsb', 'lsbm', 'rlsb'], help='Encoding algorithm')
+    # Options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-v', '--verbose', action='store_true', help='Log each load, save and conversion')
+    common.add_argument('--profile', action='store_true', help='Print the time, pixels and bytes of each stage when done')
+    common.add_argument('--cprofile', type=str, metavar='PATH', help='With --profile, also run under cProfile and write the stats to PATH')
+
+    encode_parser = subparsers.add_parser('encode', parents=[common], help='Encode a message into an image')
+    encode_parser.add_argument('algorithm', choices=names, help=f'Encoding algorithm ({describe_algorithms(names)})')
     encode_parser.add_argument('input_image', type=str, help='Path to the input image')
     encode_parser.add_argument('output_image', type=str, help='Path to the output image')
-    encode_parser.add_argument('message', type=str, help='Message to encode')
-    encode_parser.add_argument('--seed', type=int, default=12345, help='Seed for RLSB encoding (only used with RLSB)')
+    encode_parser.add_argument('message', type=str, nargs='?', help='Message to encode')
+    encode_parser.add_argument('--message-file', type=str, help='Encode the raw bytes of this file instead of a message')
+    encode_parser.add_argument('--seed', type=int, default=12345, help=f'Seed for {seed_names} encoding')
+    encode_parser.add_argument('--ordering', choices=ORDERINGS, default=DEFAULT_ORDERING, help='RLSB pixel ordering; "shuffle" is the original ordering (only used with RLSB)')
+    encode_parser.add_argument('--bits', type=int, choices=range(1, 5), default=1, help=f'Payload bits per color channel ({bit_names} only)')
+    encode_parser.add_argument('--tiled', action='store_true', help='Process the image in row bands, memory-mapping uncompressed BMP/PPM/TIFF files')
+    encode_parser.add_argument('--frames', action='store_true', help='Spread the message across every frame of an animated GIF/PNG or multi-page TIFF, one frame at a time; the output must be PNG (APNG) or TIFF')
+    encode_parser.add_argument('--compress', choices=COMPRESSION, default='none', help='Compress the payload before embedding when that makes it smaller; "auto" keeps the smallest codec')
+    encode_parser.add_argument('--save-profile', choices=SAVE_PROFILES, default='default', help='Output compression: "fast" spends the least time compressing, "small" makes the smallest files')
+    encode_parser.add_argument('--workers', type=int, default=1, help=f'Split the image into stripes across this many processes ({striped_names}; 0 for one per core)')
 
-    decode_parser = subparsers.add_parser('decode', help='Decode a message from an image')
-    decode_parser.add_argument('algorithm', choices=['lsb', 'lsbm', 'rlsb'], help='Decoding algorithm')
+    decode_parser = subparsers.add_parser('decode', parents=[common], help='Decode a message from an image')
+    decode_parser.add_argument('algorithm', choices=names + ['auto'], help='Decoding algorithm; "auto" tries them all')
     decode_parser.add_argument('input_image', type=str, help='Path to the input image')
-    decode_parser.add_argument('--seed', type=int, default=12345, help='Seed for RLSB decoding (only used with RLSB)')
+    decode_parser.add_argument('--seed', type=int, default=12345, help=f'Seed for {seed_names} decoding')
+    decode_parser.add_argument('--seeds', type=int, nargs='+', help='RLSB seeds to try with "auto" (default: --seed)')
+    decode_parser.add_argument('--output-file', type=str, help='Write the decoded payload to this file')
+    decode_parser.add_argument('--ordering', choices=ORDERINGS, default=DEFAULT_ORDERING, help='RLSB pixel ordering; "shuffle" decodes images from older versions (only used with RLSB)')
+    decode_parser.add_argument('--tiled', action='store_true', help='Process the image in row bands, memory-mapping uncompressed BMP/PPM/TIFF files')
+    decode_parser.add_argument('--frames', action='store_true', help='Read a message encoded with --frames, one frame at a time')
+    decode_parser.add_argument('--workers', type=int, default=1, help=f'Split the image into stripes across this many processes ({striped_names}; 0 for one per core)')
+
+    batch_parser = subparsers.add_parser('batch', parents=[common], help='Encode or decode many images with a pool of worker processes')
+    source = batch_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--manifest', type=str, help='CSV or JSONL manifest with input, output, algorithm, message or message_file, seed and action columns')
+    source.add_argument('--glob', type=str, help='Glob pattern selecting the input images')
+    batch_parser.add_argument('--action', choices=['encode', 'decode'], default='encode', help='Action for --glob jobs')
+    batch_parser.add_argument('--algorithm', choices=names, default='lsb', help='Algorithm for --glob jobs')
+    batch_parser.add_argument('--output-dir', type=str, help='Directory for encoded --glob images')
+    batch_parser.add_argument('--message', type=str, help='Message to encode for --glob jobs')
+    batch_parser.add_argument('--message-file', type=str, help='Encode the raw bytes of this file for --glob jobs')
+    batch_parser.add_argument('--seed', type=int, default=12345, help=f'Seed for {seed_names} --glob jobs')
+    batch_parser.add_argument('--bits', type=int, choices=range(1, 5), default=1, help=f'Payload bits per color channel for {bit_names} --glob jobs')
+    batch_parser.add_argument('--compress', choices=COMPRESSION, default='none', help='Payload compression for --glob encode jobs')
+    batch_parser.add_argument('--save-profile', choices=SAVE_PROFILES, default='default', help='Output compression for encode jobs that do not set save_profile: "fast" or "small"')
+    batch_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of cores)')
+    batch_parser.add_argument('--report', type=str, help='Write per-image results and the summary to this JSONL file')
+
+    split_parser = subparsers.add_parser('split', parents=[common], help='Cut a file into checksummed shards and embed them across the fewest covers that hold it')
+    split_parser.add_argument('algorithm', choices=names, help=f'Encoding algorithm ({describe_algorithms(names)})')
+    split_parser.add_argument('payload_file', type=str, help='The file to split')
+    split_parser.add_argument('output_dir', type=str, help='Directory for the encoded covers, written under their input names')
+    split_parser.add_argument('covers', type=str, nargs='+', help='Candidate cover images; only as many as needed are used')
+    split_parser.add_argument('--seed', type=int, default=12345, help=f'Seed for {seed_names} encoding')
+    split_parser.add_argument('--ordering', choices=ORDERINGS, default=DEFAULT_ORDERING, help='RLSB pixel ordering (only used with RLSB)')
+    split_parser.add_argument('--bits', type=int, choices=range(1, 5), default=1, help=f'Payload bits per color channel ({bit_names} only)')
+    split_parser.add_argument('--compress', choices=COMPRESSION, default='none', help='Compress each shard before embedding when that makes it smaller')
+    split_parser.add_argument('--save-profile', choices=SAVE_PROFILES, default='default', help='Output compression: "fast" or "small"')
+    split_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of cores)')
+
+    join_parser = subparsers.add_parser('join', parents=[common], help='Reassemble a file from covers encoded with split, given in any order')
+    join_parser.add_argument('algorithm', choices=names, help='Decoding algorithm')
+    join_parser.add_argument('output_file', type=str, help='The file to write the joined payload to')
+    join_parser.add_argument('covers', type=str, nargs='+', help='Encoded covers; images without a shard are skipped')
+    join_parser.add_argument('--seed', type=int, default=12345, help=f'Seed for {seed_names} decoding')
+    join_parser.add_argument('--ordering', choices=ORDERINGS, default=DEFAULT_ORDERING, help='RLSB pixel ordering (only used with RLSB)')
+    join_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of cores)')
+
+    analyze_parser = subparsers.add_parser('analyze', parents=[common], help='Screen images for LSB payloads with chi-square, RS and sample pair analysis')
+    analyze_parser.add_argument('paths', type=str, nargs='+', help='Images, and directories searched recursively for lossless images')
+    analyze_parser.add_argument('--threshold', type=float, default=0.1, help='Flag images whose estimated embedding rate is at least this (default: 0.1)')
+    analyze_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of cores)')
+    analyze_parser.add_argument('--report', type=str, help='Write per-image scores to this .csv file, or with the summary to this .json file')
+
+    index_parser = subparsers.add_parser('index', parents=[common], help='Record the size, mode, frame count, capacity and hash of the images under cover directories in a SQLite database')
+    index_parser.add_argument('database', type=str, help='The SQLite database, created if missing')
+    index_parser.add_argument('directories', type=str, nargs='+', help='Directories scanned recursively; later scans only read files that changed')
 
-    return parser.parse_args()
+    pick_parser = subparsers.add_parser('pick', parents=[common], help='Print the path of the smallest indexed cover that holds a payload')
+    pick_parser.add_argument('database', type=str, help='The SQLite database written by index')
+    payload_size = pick_parser.add_mutually_exclusive_group(required=True)
+    payload_size.add_argument('--bytes', type=int, help='The payload size in bytes')
+    payload_size.add_argument('--payload-file', type=str, help='Pick a cover for the contents of this file')
+    pick_parser.add_argument('--algorithm', choices=names, default='lsb', help='The algorithm the payload will be embedded with')
+    pick_parser.add_argument('--bits', type=int, choices=range(1, 5), default=1, help=f'Payload bits per color channel ({bit_names} only)')
+    pick_parser.add_argument('--frames', action='store_true', help='Count every frame of animated and multi-page covers, for encode --frames')
+
+    serve_parser = subparsers.add_parser('serve', parents=[common], help='Answer JSON-lines encode and decode requests from a warm pool of worker processes')
+    serve_parser.add_argument('--socket', type=str, help='Listen on this Unix domain socket (default: read requests from stdin and answer on stdout)')
+    serve_parser.add_argument('--save-profile', choices=SAVE_PROFILES, default='default', help='Output compression for requests that do not set save_profile: "fast" or "small"')
+    serve_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of cores)')
+
+    args = parser.parse_args()
+    algorithm = get_algorithm(args.algorithm) if getattr(args, 'algorithm', 'auto') != 'auto' else None
+    if args.command in ('encode', 'batch', 'split', 'pick') and args.bits != 1 and 'bits' not in algorithm.options:
+        parser.error(f'{algorithm.label} embeds one bit per channel; --bits only applies to {bit_names}')
+    if args.command == 'encode':
+        if (args.message is None) == (args.message_file is None):
+            parser.error('give either a message or --message-file')
+        if args.message_file is not None:
+            with open(args.message_file, 'rb') as message_file:
+                args.message = message_file.read()
+        # Refuse lossy outputs before spending time on the encode
+        from utils.image_utils import check_lossless, image_format, FRAME_FORMATS
+        try:
+            check_lossless(args.output_image)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.frames and image_format(args.output_image) not in FRAME_FORMATS:
+            parser.error('--frames writes PNG (APNG) or TIFF outputs')
+    if args.command in ('encode', 'decode') and args.tiled and (algorithm is None or not algorithm.tiled):
+        parser.error(f'--tiled does not support "{args.algorithm}"')
+    if args.command in ('encode', 'decode') and args.frames:
+        if algorithm is None or not algorithm.tiled:
+            parser.error(f'--frames does not support "{args.algorithm}"')
+        if args.tiled or args.workers != 1:
+            parser.error('--frames cannot be combined with --tiled or --workers')
+    if args.command in ('encode', 'decode') and args.workers != 1:
+        if args.workers < 0:
+            parser.error('--workers must be 0 or more')
+        if args.tiled or algorithm is None or not algorithm.striped:
+            parser.error(f'--workers applies to {striped_names} without --tiled')
+    if args.cprofile and not args.profile:
+        parser.error('--cprofile requires --profile')
+    if args.command == 'batch' and args.glob and args.action == 'encode':
+        if not args.output_dir:
+            parser.error('--output-dir is required when encoding with --glob')
+        if args.message is None and args.message_file is None:
+            parser.error('--message or --message-file is required when encoding with --glob')
+    if args.command == 'pick' and args.frames and not algorithm.tiled:
+        parser.error(f'--frames does not support "{args.algorithm}"')
+    if args.command == 'analyze' and args.report:
+        from analyze import check_report_path
+        try:
+            check_report_path(args.report)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
 
 def main():
     args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s')
 
-    if args.command == 'encode':
-        if args.algorithm == 'lsb':
-            encode_lsb_mode(args.input_image, args.output_image, args.message)
-        elif args.algorithm == 'lsbm':
-            encode_lsbm_mode(args.input_image, args.output_image, args.message)
-        elif args.algorithm == 'rlsb':
-            encode_rlsb_mode(args.input_image, args.output_image, args.message, args.seed)
-    elif args.command == 'decode':
-        if args.algorithm == 'lsb':
-            decode_lsb_mode(args.input_image)
-        elif args.algorithm == 'lsbm':
-            decode_lsbm_mode(args.input_image)
-        elif args.algorithm == 'rlsb':
-            decode_rlsb_mode(args.input_image, args.seed)
-
-def encode_lsb_mode(input_image_path, output_image_path, message):
-    input_image = load_image(input_image_path)
-    encoded_image = encode_lsb(input_image, message)
-    save_image(encoded_image, output_image_path)
-    print(f"Message encoded using LSB and saved to {output_image_path}")
+    if not args.profile:
+        run_command(args)
+        return
 
-def decode_lsb_mode(input_image_path):
-    input_image = load_image(input_image_path)
-    message = decode_lsb(input_image)
-    print(f"Decoded message using LSB: {message}")
+    registry.reset()
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        if profiler:
+            profiler.runcall(run_command, args)
+        else:
+            run_command(args)
+    finally:
+        print(format_snapshot(registry.snapshot()), file=sys.stderr)
+        if profiler:
+            import pstats
+            profiler.dump_stats(args.cprofile)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
 
-def encode_lsbm_mode(input_image_path, output_image_path, message):
-    input_image = load_image(input_image_path)
-    encoded_image = encode_lsbm(input_image, message)
-    save_image(encoded_image, output_image_path)
-    print(f"Message encoded using LSBM and saved to {output_image_path}")
+def run_command(args):
+    COMMANDS[args.command](args)
 
-def decode_lsbm_mode(input_image_path):
-    input_image = load_image(input_image_path)
-    message = decode_lsbm(input_image)
-    print(f"Decoded message using LSBM: {message}")
+def report_decoded(message, description, output_file=None):
+    if output_file:
+        with open(output_file, 'wb') as payload_file:
+            payload_file.write(message.encode('utf-8') if isinstance(message, str) else message)
+        print(f"Decoded payload {description} and saved to {output_file}")
+    elif isinstance(message, bytes):
+        print(f"Decoded {len(message)} bytes of binary data {description}; use --output-file to save them")
+    else:
+        print(f"Decoded message {description}: {message}")
 
-def encode_rlsb_mode(input_image_path, output_image_path, message, seed):
-    input_image = load_image(input_image_path)
-    encoded_image = encode_rlsb(input_image, message, seed)
-    save_image(encoded_image, output_image_path)
-    print(f"Message encoded using RLSB with seed {seed} and saved to {output_image_path}")
+def encode_mode(args):
+    algorithm = get_algorithm(args.algorithm)
+    if args.frames:
+        from PIL import Image
+        from algorithms.frames import encode_frames, frame_count
+        from utils.image_utils import save_frames
+        with Image.open(args.input_image) as cover:
+            count = frame_count(cover)
+            frames = encode_frames(cover, args.message, algorithm.name, args.seed, args.ordering,
+                                   bits_per_channel=args.bits, compression=args.compress)
+            save_frames(frames, args.output_image, count, args.save_profile, cover.info.get('loop', 0))
+        method = f" across {count} frames"
+    elif args.tiled:
+        from PIL import Image
+        from algorithms.bitplane import cover_mode
+        from algorithms.tiled import encode_file
+        from utils.image_utils import check_lossless
+        # The parser checked the format for RGB; the cover may keep alpha or 16-bit channels
+        with Image.open(args.input_image) as cover:
+            check_lossless(args.output_image, cover_mode(cover))
+        mapped = encode_file(args.input_image, args.output_image, args.message, algorithm.name, args.seed, args.ordering,
+                             bits_per_channel=args.bits, compression=args.compress,
+                             save_profile=args.save_profile)
+        method = " (memory-mapped row bands)" if mapped else " (row bands)"
+    else:
+        from algorithms.bitplane import cover_mode
+        from utils.image_utils import check_lossless, load_image, save_image
+        input_image = load_image(args.input_image)
+        # The parser checked the format for RGB; the cover may be in a mode it cannot store
+        try:
+            check_lossless(args.output_image, cover_mode(input_image))
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.workers != 1:
+            from algorithms.parallel import encode_parallel
+            encoded_image = encode_parallel(input_image, args.message, algorithm.name, args.seed, args.ordering,
+                                            bits_per_channel=args.bits, compression=args.compress, workers=args.workers or None)
+            method = " (striped across processes)"
+        else:
+            # The loaded image is not needed afterwards, so embed into it rather than a copy
+            encoded_image = algorithm.encode(input_image, args.message, args.seed, args.ordering, args.bits, args.compress,
+                                             in_place=True)
+            method = ""
+        save_image(encoded_image, args.output_image, args.save_profile)
+    print(f"Message encoded {algorithm.describe(args.seed)}{method} and saved to {args.output_image}")
+
+def decode_mode(args):
+    if args.algorithm == 'auto':
+        decode_auto_mode(args.input_image, args.seeds or [args.seed], args.output_file)
+        return
+    algorithm = get_algorithm(args.algorithm)
+    if args.frames:
+        from PIL import Image
+        from algorithms.frames import decode_frames
+        with Image.open(args.input_image) as input_image:
+            message = decode_frames(input_image, algorithm.name, args.seed, args.ordering)
+    elif args.tiled:
+        from algorithms.tiled import decode_file
+        message = decode_file(args.input_image, algorithm.name, args.seed, args.ordering)
+    else:
+        from utils.image_utils import load_image
+        input_image = load_image(args.input_image)
+        if args.workers != 1:
+            from algorithms.parallel import decode_parallel
+            message = decode_parallel(input_image, algorithm.name, args.seed, args.ordering, workers=args.workers or None)
+        else:
+            message = algorithm.decode(input_image, args.seed, args.ordering)
+    report_decoded(message, algorithm.describe(args.seed), args.output_file)
 
-def decode_rlsb_mode(input_image_path, seed):
+def decode_auto_mode(input_image_path, seeds, output_file=None):
+    from utils.image_utils import load_image
+    from algorithms.auto import detect_payload
     input_image = load_image(input_image_path)
-    message = decode_rlsb(input_image, seed)
-    print(f"Decoded message using RLSB with seed {seed}: {message}")
+    candidates = detect_payload(input_image, seeds)
+    for candidate in candidates:
+        name = candidate['algorithm'].upper()
+        if candidate['seed'] is not None:
+            name += f" (seed {candidate['seed']}, {candidate['ordering']})"
+        if 'error' in candidate:
+            outcome = candidate['error']
+        elif candidate['framed']:
+            outcome = 'framed payload'
+        else:
+            outcome = 'legacy message' if candidate['confidence'] else 'noise'
+        print(f"{candidate['confidence']:.2f}  {name}: {outcome}")
+    best = candidates[0]
+    if best['confidence'] == 0:
+        print("No algorithm or seed decoded a message")
+        sys.exit(1)
+    report_decoded(best['message'], get_algorithm(best['algorithm']).describe(best['seed']), output_file)
+
+def batch_mode(args):
+    from batch import load_manifest, glob_jobs, run_batch
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+        for job in jobs:
+            job.setdefault('save_profile', args.save_profile)
+    else:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        jobs = glob_jobs(args.glob, args.output_dir, args.algorithm, args.action, args.message, args.message_file, args.seed, args.bits, args.compress, args.save_profile)
+
+    report_file = open(args.report, 'w', encoding='utf-8') if args.report else None
+
+    def report(result):
+        if result['status'] == 'ok':
+            if 'message' in result:
+                detail = f"decoded: {result['message']}"
+            elif 'payload_base64' in result:
+                detail = f"decoded {len(base64.b64decode(result['payload_base64']))} bytes of binary data"
+            else:
+                detail = f"saved to {result['output']}"
+            print(f"[ok] {result['input']} ({result['seconds']:.3f}s) {detail}")
+        else:
+            print(f"[error] {result['input']}: {result['error']}")
+        if report_file:
+            report_file.write(json.dumps(result) + '\n')
+
+    try:
+        summary = run_batch(jobs, args.workers, report)
+        if report_file:
+            report_file.write(json.dumps({'summary': summary}) + '\n')
+    finally:
+        if report_file:
+            report_file.close()
+
+    print(f"Processed {summary['images']} images ({summary['succeeded']} succeeded, {summary['failed']} failed) "
+          f"in {summary['seconds']:.2f}s: {summary['images_per_second']:.1f} images/s, "
+          f"{summary['megabytes_per_second']:.2f} MB/s")
+    if summary['failed']:
+        sys.exit(1)
+
+def split_mode(args):
+    from shards import split_payload
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def report(result):
+        if result['status'] == 'ok':
+            print(f"[ok] shard {result['index']}: {result['bytes']} bytes in {result['output']} ({result['seconds']:.3f}s)")
+        else:
+            print(f"[error] shard {result['index']} in {result['input']}: {result['error']}")
+
+    try:
+        results = split_payload(args.payload_file, args.covers, args.output_dir, args.algorithm, args.seed, args.ordering,
+                                args.bits, args.compress, args.save_profile, args.workers, report)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    failed = sum(result['status'] != 'ok' for result in results)
+    print(f"Split {args.payload_file} into {len(results)} shards {get_algorithm(args.algorithm).describe(args.seed)} "
+          f"({len(results) - failed} succeeded, {failed} failed)")
+    if failed:
+        sys.exit(1)
+
+def join_mode(args):
+    from shards import join_payload
+
+    def report(result):
+        if result['status'] == 'ok':
+            print(f"[ok] {result['input']}: shard {result['index']} of {result['count']}, {result['bytes']} bytes ({result['seconds']:.3f}s)")
+        else:
+            print(f"[skipped] {result['input']}: {result['error']}")
+
+    try:
+        summary = join_payload(args.output_file, args.covers, args.algorithm, args.seed, args.ordering, args.workers, report)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Joined {summary['shards']} shards {get_algorithm(args.algorithm).describe(args.seed)} into {args.output_file} "
+          f"({summary['bytes']} bytes in {summary['seconds']:.2f}s)")
+
+def analyze_mode(args):
+    from analyze import analyze_images, write_report
+
+    def report(result):
+        if result['status'] == 'ok':
+            label = 'flagged' if result['flagged'] else 'clean'
+            print(f"[{label}] {result['input']}: score {result['score']:.3f} (chi-square {result['chi_square']:.3f}, "
+                  f"RS {result['rs']:.3f}, sample pairs {result['sample_pairs']:.3f}; {result['seconds']:.3f}s)")
+        else:
+            print(f"[error] {result['input']}: {result['error']}")
+
+    results, summary = analyze_images(args.paths, args.workers, args.threshold, report)
+    if args.report:
+        write_report(args.report, results, summary)
+    print(f"Analyzed {summary['images']} images ({summary['flagged']} flagged, {summary['failed']} failed) "
+          f"in {summary['seconds']:.2f}s: {summary['images_per_second']:.1f} images/s, "
+          f"{summary['megapixels_per_second']:.1f} megapixels/s")
+    if summary['flagged'] or summary['failed']:
+        sys.exit(1)
+
+def index_mode(args):
+    from cover_index import scan_covers
+
+    def report(result):
+        if result['status'] == 'error':
+            print(f"[error] {result['path']}: {result['error']}")
+        else:
+            print(f"[{result['status']}] {result['path']}")
+
+    summary = scan_covers(args.database, args.directories, report)
+    print(f"Indexed covers in {args.database} ({summary['added']} added, {summary['updated']} updated, "
+          f"{summary['removed']} removed, {summary['unchanged']} unchanged, {summary['failed']} failed) "
+          f"in {summary['seconds']:.2f}s")
+
+def pick_mode(args):
+    from cover_index import pick_cover
+    payload_bytes = args.bytes if args.bytes is not None else os.path.getsize(args.payload_file)
+    try:
+        cover = pick_cover(args.database, payload_bytes, args.algorithm, args.bits, args.frames)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if cover is None:
+        print(f"Error: no indexed cover holds {payload_bytes} bytes {get_algorithm(args.algorithm).describe()}",
+              file=sys.stderr)
+        sys.exit(1)
+    # Only the path goes to stdout, so scripts can use it directly
+    print(cover['path'])
+
+def serve_mode(args):
+    from server import serve
+    serve(args.socket, args.workers, args.save_profile)
+
+COMMANDS = {
+    'encode': encode_mode,
+    'decode': decode_mode,
+    'batch': batch_mode,
+    'split': split_mode,
+    'join': join_mode,
+    'analyze': analyze_mode,
+    'index': index_mode,
+    'pick': pick_mode,
+    'serve': serve_mode,
+}
 
 if __name__ == "__main__":
     main()
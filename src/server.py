@@ -0,0 +1,267 @@
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.image_utils import load_image, save_image, check_lossless, save_options
+from algorithms.metrics import registry, diff_snapshots
+from algorithms.registry import DEFAULT_ORDERING, get_algorithm
+from algorithms.bitplane import cover_mode
+from batch import DEFAULT_SEED, add_message
+
+logger = logging.getLogger(__name__)
+
+# Longest request line accepted, which bounds inline images
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+
+def _request_image(request, cache):
+    """
+    Load the image a request names by path, or decode the one it carries inline.
+    """
+    if 'input' in request:
+        return load_image(request['input'], cache=cache)
+    image = Image.open(io.BytesIO(base64.b64decode(request['input_base64'])))
+    image.load()
+    return image
+
+def _request_message(request):
+    if 'message_base64' in request:
+        return base64.b64decode(request['message_base64'])
+    return request['message']
+
+def handle_request(request):
+    """
+    Run one request in a worker process. Errors are reported in the response, not raised.
+
+    Parameters:
+    request (dict): The request. 'action' is 'encode', 'decode' or 'ping'. The
+        image is given as an 'input' path or as 'input_base64' file contents.
+        Encode requests carry 'message' or 'message_base64' and write to an
+        'output' path, or return the image as 'image_base64' in 'format'
+        (default PNG). 'algorithm', 'seed', 'bits', 'compression', 'ordering'
+        and 'save_profile' work as in batch manifests.
+
+    Returns:
+    dict: The request's id, status ('ok' or 'error'), seconds spent in the
+    worker and per-stage metrics, plus the output path or image, the decoded
+    message (payload_base64 for binary payloads) or the error text.
+    """
+    response = {'id': request.get('id'), 'status': 'ok'}
+    before = registry.snapshot()
+    start = time.perf_counter()
+    try:
+        action = request.get('action', 'encode')
+        if action == 'ping':
+            response['pid'] = os.getpid()
+        elif action in ('encode', 'decode'):
+            algorithm = get_algorithm(request['algorithm'])
+            seed = int(request.get('seed', DEFAULT_SEED))
+            ordering = request.get('ordering', DEFAULT_ORDERING)
+            target = request.get('output', request.get('format', 'PNG'))
+            if action == 'encode':
+                # A lossy output would destroy the message, so fail before doing the work
+                check_lossless(target)
+            # Warm workers keep decoded covers, so repeated decodes skip decompression
+            image = _request_image(request, cache=action == 'decode')
+
+            if action == 'encode':
+                # The cover may be in a mode the output format cannot store
+                check_lossless(target, cover_mode(image))
+                bits = int(request.get('bits', 1))
+                compression = request.get('compression', 'none')
+                profile = request.get('save_profile', 'default')
+                encoded_image = algorithm.encode(image, _request_message(request), seed, ordering, bits, compression,
+                                                 in_place=True)
+                if 'output' in request:
+                    save_image(encoded_image, request['output'], profile)
+                    response['output'] = request['output']
+                else:
+                    buffer = io.BytesIO()
+                    format = request.get('format', 'PNG').upper()
+                    encoded_image.save(buffer, format=format, **save_options(format, profile))
+                    response['image_base64'] = base64.b64encode(buffer.getvalue()).decode('ascii')
+            else:
+                add_message(response, algorithm.decode(image, seed, ordering))
+        else:
+            raise ValueError(f"Unknown action: {action}")
+    except Exception as e:
+        response['status'] = 'error'
+        response['error'] = f"{type(e).__name__}: {e}"
+    response['seconds'] = time.perf_counter() - start
+    response['metrics'] = diff_snapshots(registry.snapshot(), before)
+    return response
+
+class _StdinReader:
+    # stdin may be a file or a terminal, which asyncio pipes do not accept, so lines
+    # are read on a daemon thread that cannot keep the process alive after a shutdown
+    def __init__(self):
+        self._lines = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read, args=(loop,), daemon=True).start()
+
+    def _read(self, loop):
+        while True:
+            line = sys.stdin.buffer.readline()
+            loop.call_soon_threadsafe(self._lines.put_nowait, line)
+            if not line:
+                break
+
+    async def readline(self):
+        return await self._lines.get()
+
+class _StdoutWriter:
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+
+    async def drain(self):
+        sys.stdout.buffer.flush()
+
+class StegoServer:
+    """
+    Answers JSON-lines requests from a warm pool of worker processes, over a
+    Unix domain socket or stdin/stdout. Each connection may send requests
+    without waiting; responses are written as they complete and carry the
+    request's id.
+    """
+
+    def __init__(self, workers=None, save_profile='default'):
+        self.workers = workers or os.cpu_count() or 1
+        self.save_profile = save_profile
+        self.executor = None
+        self._stopped = None
+        self._connections = set()
+
+    async def _start(self):
+        self._stopped = asyncio.Event()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Start every worker now, so the first requests do not pay for the imports
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, handle_request, {'action': 'ping'})
+                               for _ in range(self.workers)))
+
+    def _shutdown_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def stop(self):
+        """
+        Stop serving. Safe to call from any thread while the server runs.
+        """
+        if self._stopped is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def respond(self, line):
+        """
+        Answer one request line.
+        """
+        received = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            return {'id': None, 'status': 'error', 'error': f"Invalid request: {e}"}
+
+        if request.get('action') == 'shutdown':
+            self._stopped.set()
+            return {'id': request.get('id'), 'status': 'ok'}
+        request.setdefault('save_profile', self.save_profile)
+        response = await asyncio.get_running_loop().run_in_executor(self.executor, handle_request, request)
+        registry.merge(response.pop('metrics', {}))
+        response['total_seconds'] = time.perf_counter() - received
+        return response
+
+    async def handle_stream(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(line):
+            response = await self.respond(line)
+            async with lock:
+                writer.write((json.dumps(response) + '\n').encode('utf-8'))
+                await writer.drain()
+
+        stopped = asyncio.create_task(self._stopped.wait())
+        try:
+            while True:
+                read = asyncio.create_task(reader.readline())
+                await asyncio.wait((read, stopped), return_when=asyncio.FIRST_COMPLETED)
+                if not read.done():
+                    read.cancel()
+                    break
+                line = read.result()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            stopped.cancel()
+
+    async def _client_connected(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            await self.handle_stream(reader, writer)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            logger.error("Connection closed: %s", e)
+        finally:
+            writer.close()
+            self._connections.discard(connection)
+
+    async def run_unix(self, path):
+        """
+        Serve on a Unix domain socket until stopped by a 'shutdown' request or stop().
+        """
+        self._loop = asyncio.get_running_loop()
+        await self._start()
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self._client_connected, path=path, limit=MAX_REQUEST_BYTES)
+        os.chmod(path, 0o600)
+        logger.info("Serving on %s with %d workers", path, self.workers)
+        try:
+            async with server:
+                await self._stopped.wait()
+                # Let every connection finish the requests it has in flight
+                await asyncio.gather(*self._connections, return_exceptions=True)
+        finally:
+            self._shutdown_executor()
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def run_stdio(self):
+        """
+        Serve requests read from stdin, writing responses to stdout, until stdin
+        closes or a 'shutdown' request arrives.
+        """
+        self._loop = asyncio.get_running_loop()
+        await self._start()
+        try:
+            await self.handle_stream(_StdinReader(), _StdoutWriter())
+        finally:
+            self._shutdown_executor()
+
+def serve(socket_path=None, workers=None, save_profile='default'):
+    """
+    Run the server on a Unix domain socket, or on stdin/stdout when no path is given.
+
+    Parameters:
+    socket_path (str): The socket to listen on.
+    workers (int): The number of worker processes. Defaults to the number of cores.
+    save_profile (str): The save profile for requests that do not set one.
+    """
+    server = StegoServer(workers, save_profile)
+    if socket_path:
+        asyncio.run(server.run_unix(socket_path))
+    else:
+        asyncio.run(server.run_stdio())
@@ -0,0 +1,296 @@
+import hashlib
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+from utils.image_utils import load_image, save_image
+from algorithms.registry import DEFAULT_ORDERING, get_algorithm
+from algorithms.metrics import registry, diff_snapshots
+from algorithms.payload import PayloadError, payload_capacity
+from algorithms.bitplane import cover_mode
+from batch import DEFAULT_SEED, output_path
+
+SHARD_MAGIC = b'VSHD'
+SHARD_VERSION = 1
+
+# magic, version, payload digest, shard index, shard count, offset and length of
+# the whole payload, CRC32 of the shard data. Every shard repeats the digest, the
+# first 16 bytes of the payload's SHA-256, so shards of one payload can be told
+# apart from another's and the joined payload can be checked.
+SHARD_HEADER = struct.Struct('>4sB16sIIQQI')
+SHARD_HEADER_SIZE = SHARD_HEADER.size
+DIGEST_SIZE = 16
+
+# How much of the payload is hashed or copied at a time
+CHUNK_BYTES = 1024 * 1024
+
+def payload_digest(path):
+    """
+    Return the digest shards record for the payload in this file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as payload_file:
+        for chunk in iter(lambda: payload_file.read(CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.digest()[:DIGEST_SIZE]
+
+def pack_shard(data, digest, index, count, offset, total):
+    """
+    Prefix a slice of the payload with its shard header.
+    """
+    return SHARD_HEADER.pack(SHARD_MAGIC, SHARD_VERSION, digest, index, count, offset, total, zlib.crc32(data)) + data
+
+def unpack_shard(blob):
+    """
+    Check a shard read from a cover and split it into its header fields and data.
+
+    Returns:
+    tuple: (fields, data), where fields is a dict with digest, index, count,
+    offset and total.
+
+    Raises:
+    PayloadError: If the blob is not a shard or its data does not match its checksum.
+    """
+    if not isinstance(blob, bytes) or len(blob) < SHARD_HEADER_SIZE:
+        raise PayloadError("The cover does not hold a shard")
+    magic, version, digest, index, count, offset, total, crc = SHARD_HEADER.unpack_from(blob)
+    if magic != SHARD_MAGIC:
+        raise PayloadError("The cover does not hold a shard")
+    if version != SHARD_VERSION:
+        raise PayloadError(f"Unsupported shard version {version}")
+    data = blob[SHARD_HEADER_SIZE:]
+    if zlib.crc32(data) != crc or index >= count or offset + len(data) > total:
+        raise PayloadError("Shard checksum mismatch")
+    return {'digest': digest, 'index': index, 'count': count, 'offset': offset, 'total': total}, data
+
+def shard_capacity(width, height, bits=1, bands=3):
+    """
+    Return how many payload bytes one shard in a cover of this size can carry.
+    """
+    return max(0, payload_capacity(width * height * bands, bits, bands) - SHARD_HEADER_SIZE)
+
+def plan_shards(capacities, total):
+    """
+    Choose the fewest covers that hold a payload and how much of it each carries.
+
+    The largest covers are used first. The payload is spread across the chosen
+    covers in proportion to their capacity, so each is filled to about the
+    same ratio and the encodes take about as long.
+
+    Parameters:
+    capacities (list): The shard capacity of each cover in bytes.
+    total (int): The payload size in bytes.
+
+    Returns:
+    list: (cover index, shard length) pairs in shard order.
+
+    Raises:
+    ValueError: If the covers together cannot hold the payload.
+    """
+    by_size = sorted(range(len(capacities)), key=lambda i: -capacities[i])
+    chosen, room = [], 0
+    for cover in by_size:
+        if room >= total and chosen:
+            break
+        chosen.append(cover)
+        room += capacities[cover]
+    if room < total or not chosen:
+        raise ValueError(f"Payload of {total} bytes does not fit in {len(capacities)} covers holding {room} bytes")
+
+    lengths = [total * capacities[cover] // room for cover in chosen]
+    # Rounding down leaves fewer bytes than covers; give them to covers with room to spare
+    for i, cover in enumerate(chosen):
+        if sum(lengths) == total:
+            break
+        if lengths[i] < capacities[cover]:
+            lengths[i] += 1
+    return list(zip(chosen, lengths))
+
+def _encode_shard(job):
+    """
+    Embed one shard in its cover. Runs in a worker process; errors are reported
+    in the result, not raised.
+    """
+    result = {'index': job['index'], 'input': job['input'], 'output': job['output'], 'bytes': job['length'],
+              'status': 'ok'}
+    before = registry.snapshot()
+    start = time.perf_counter()
+    try:
+        with open(job['payload'], 'rb') as payload_file:
+            payload_file.seek(job['offset'])
+            data = payload_file.read(job['length'])
+        if len(data) != job['length']:
+            raise ValueError(f"{job['payload']} changed while it was being split")
+        blob = pack_shard(data, job['digest'], job['index'], job['count'], job['offset'], job['total'])
+        algorithm = get_algorithm(job['algorithm'])
+        image = load_image(job['input'])
+        encoded_image = algorithm.encode(image, blob, job['seed'], job['ordering'], job['bits'], job['compression'],
+                                         in_place=True)
+        save_image(encoded_image, job['output'], job['save_profile'])
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['metrics'] = diff_snapshots(registry.snapshot(), before)
+    return result
+
+def _decode_shard(job):
+    """
+    Read the shard a cover holds. Runs in a worker process; errors are reported
+    in the result, not raised.
+    """
+    result = {'input': job['input'], 'status': 'ok'}
+    before = registry.snapshot()
+    start = time.perf_counter()
+    try:
+        algorithm = get_algorithm(job['algorithm'])
+        blob = algorithm.decode(load_image(job['input']), job['seed'], job['ordering'], strict=True)
+        result['shard'], result['data'] = unpack_shard(blob)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['metrics'] = diff_snapshots(registry.snapshot(), before)
+    return result
+
+def split_payload(payload_path, covers, output_dir, algorithm, seed=DEFAULT_SEED, ordering=DEFAULT_ORDERING, bits=1,
+                  compression='none', save_profile='default', workers=None, report=None):
+    """
+    Cut a file into indexed, checksummed shards and embed them across the fewest
+    covers that hold it, one cover per worker process.
+
+    Each worker reads only its own slice of the file, so the payload is never
+    held in memory whole. Shards are compressed one by one, so with compression
+    they may use fewer pixels than planned, but never more covers.
+
+    Parameters:
+    payload_path (str): The file to split.
+    covers (list): Paths of the candidate covers. Only the ones needed are used.
+    output_dir (str): The directory encoded covers are written to, under their
+        input names. Covers in lossy formats such as JPEG are written as PNG.
+    algorithm (str): The algorithm for every shard.
+    seed (int): The seed, for algorithms that take one.
+    ordering (str): The pixel ordering, for algorithms that take one.
+    bits (int): Payload bits per channel.
+    compression (str): Payload compression for each shard: 'none', 'auto' or a codec name.
+    save_profile (str): How hard to compress the encoded covers: 'default', 'fast' or 'small'.
+    workers (int): The number of worker processes. Defaults to the number of cores.
+    report (callable): Called with each shard's result as it completes.
+
+    Returns:
+    list: The shards' results in shard order: index, input and output paths,
+    payload bytes carried, status ('ok' or 'error'), seconds and the error text.
+
+    Raises:
+    ValueError: If the covers cannot hold the payload or two covers would be
+        written to the same output.
+    """
+    algorithm = get_algorithm(algorithm)
+    if bits != 1 and 'bits' not in algorithm.options:
+        raise ValueError(f"{algorithm.label} embeds one bit per channel")
+    capacities = []
+    for cover in covers:
+        with Image.open(cover) as image:
+            bands = Image.getmodebands(cover_mode(image))
+            capacities.append(shard_capacity(image.width, image.height, bits, bands))
+    total = os.path.getsize(payload_path)
+    plan = plan_shards(capacities, total)
+
+    outputs = [output_path(covers[cover], output_dir) for cover, _ in plan]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("Covers with the same file name would overwrite each other in the output directory")
+
+    digest = payload_digest(payload_path)
+    jobs, offset = [], 0
+    for index, ((cover, length), output) in enumerate(zip(plan, outputs)):
+        jobs.append({'payload': payload_path, 'input': covers[cover], 'output': output, 'index': index,
+                     'count': len(plan), 'offset': offset, 'length': length, 'total': total, 'digest': digest,
+                     'algorithm': algorithm.name, 'seed': seed, 'ordering': ordering, 'bits': bits,
+                     'compression': compression, 'save_profile': save_profile})
+        offset += length
+
+    results = [None] * len(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(_encode_shard, job) for job in jobs]):
+            result = future.result()
+            registry.merge(result.pop('metrics', {}))
+            results[result['index']] = result
+            if report is not None:
+                report(result)
+    return results
+
+def join_payload(output_file, covers, algorithm, seed=DEFAULT_SEED, ordering=DEFAULT_ORDERING, workers=None,
+                 report=None):
+    """
+    Reassemble a payload split by split_payload, reading the covers in parallel
+    and in any order.
+
+    Each shard is written to its place in the output file as soon as its cover
+    is decoded, so the payload is never held in memory whole. Covers that hold
+    no shard are skipped. The joined file is checked against the digest every
+    shard records, and removed if any shard is missing or the check fails.
+
+    Parameters:
+    output_file (str): The file to write the payload to.
+    covers (list): Paths of the encoded covers, in any order.
+    algorithm (str): The algorithm the shards were embedded with.
+    seed (int): The seed, for algorithms that take one.
+    ordering (str): The pixel ordering, for algorithms that take one.
+    workers (int): The number of worker processes. Defaults to the number of cores.
+    report (callable): Called with each cover's result as it completes: its
+        input path, status ('ok' or 'error'), seconds, and the shard's index,
+        count and length or the error text.
+
+    Returns:
+    dict: The summary: shards joined, payload bytes, skipped covers and elapsed seconds.
+
+    Raises:
+    PayloadError: If no cover holds a shard, shards of different payloads are
+        mixed, shards are missing or the joined payload fails its check.
+    """
+    algorithm = get_algorithm(algorithm)
+    jobs = [{'input': cover, 'algorithm': algorithm.name, 'seed': seed, 'ordering': ordering} for cover in covers]
+    expected = None
+    found = set()
+    skipped = 0
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, max(1, len(jobs)))
+    try:
+        with open(output_file, 'wb') as output, ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(_decode_shard, job) for job in jobs]):
+                result = future.result()
+                registry.merge(result.pop('metrics', {}))
+                if result['status'] == 'ok':
+                    shard, data = result.pop('shard'), result.pop('data')
+                    if expected is None:
+                        expected = shard
+                        output.truncate(shard['total'])
+                    elif (shard['digest'], shard['count'], shard['total']) != \
+                            (expected['digest'], expected['count'], expected['total']):
+                        raise PayloadError(f"{result['input']} holds a shard of another payload")
+                    if shard['index'] not in found:
+                        found.add(shard['index'])
+                        output.seek(shard['offset'])
+                        output.write(data)
+                    result.update(index=shard['index'], count=shard['count'], bytes=len(data))
+                else:
+                    skipped += 1
+                if report is not None:
+                    report(result)
+
+        if expected is None:
+            raise PayloadError(f"None of the {len(covers)} covers holds a {algorithm.label} shard")
+        missing = sorted(set(range(expected['count'])) - found)
+        if missing:
+            raise PayloadError(f"Missing {len(missing)} of {expected['count']} shards: {', '.join(map(str, missing))}")
+        if payload_digest(output_file) != expected['digest']:
+            raise PayloadError("Joined payload does not match its digest")
+    except BaseException:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        raise
+    return {'shards': expected['count'], 'bytes': expected['total'], 'skipped': skipped,
+            'seconds': time.perf_counter() - start}
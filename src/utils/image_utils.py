@@ -1,36 +1,358 @@
-from PIL import Image
+import io
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
 
-def load_image(image_path):
+from PIL import Image, TiffImagePlugin
+
+try:
+    from ..algorithms.metrics import registry, stage
+except ImportError:
+    from algorithms.metrics import registry, stage
+
+logger = logging.getLogger(__name__)
+
+# Bytes per pixel of the modes whose bands are wider than one byte
+_MODE_BYTES = {'I;16': 2, 'I;16B': 2, 'I;16L': 2, 'I': 4, 'F': 4}
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# Formats whose encoders discard low bits, so they would destroy a hidden payload
+LOSSY_FORMATS = {'JPEG', 'JPEG2000', 'MPO', 'AVIF', 'HEIF'}
+
+# Formats that store a palette; other modes are quantized on save
+PALETTE_FORMATS = {'GIF'}
+
+# The modes lossless formats store as they are; the rest are converted on save,
+# dropping alpha or changing the band layout a payload was embedded in, or
+# cannot be written at all. TIFF stores every mode the algorithms embed into;
+# PNG stores all but CMYK, writing big-endian 16-bit images as I;16.
+FORMAT_MODES = {
+    'PNG': {'RGB', 'RGBA', 'L', 'LA', 'I;16', 'I;16B', 'P', '1'},
+    'BMP': {'RGB', 'L', 'P', '1'},
+    'PPM': {'RGB', 'L', '1'},
+    'TGA': {'RGB', 'RGBA', 'L', 'LA', 'P'},
+    'QOI': {'RGB', 'RGBA'},
+    'WEBP': {'RGB', 'RGBA'},
+}
+
+# Save options for each speed-vs-size profile, by format. BMP and PPM are always
+# written uncompressed, which is the fastest option whatever the profile.
+SAVE_PROFILES = {
+    'default': {},
+    'fast': {
+        'PNG': {'compress_level': 1},
+        'TIFF': {'compression': 'raw'},
+        'WEBP': {'method': 0},
+    },
+    'small': {
+        'PNG': {'compress_level': 9, 'optimize': True},
+        'TIFF': {'compression': 'tiff_adobe_deflate'},
+        'WEBP': {'method': 6, 'quality': 100},
+    },
+}
+
+# Options every profile needs to keep the pixels exact
+_LOSSLESS_OPTIONS = {'WEBP': {'lossless': True, 'exact': True}}
+
+# Formats save_frames writes one frame at a time: PNG as APNG, TIFF as one page per frame
+FRAME_FORMATS = ('PNG', 'TIFF')
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+class ImageCache:
+    """
+    An LRU cache of decoded images, keyed by path, file size and modification time,
+    that evicts the least recently used images to stay within a byte budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._images = OrderedDict()  # key -> (image, nbytes)
+        self._bytes = 0
+
+    @staticmethod
+    def key(image_path, mode=None):
+        stat = os.stat(image_path)
+        return (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, mode)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._images.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, image):
+        nbytes = image.width * image.height * _MODE_BYTES.get(image.mode, len(image.getbands()))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._bytes -= self._images.pop(key)[1]
+            self._images[key] = (image, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._images.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, image_path=None):
+        """
+        Drop the cached images of a file, or of every file when no path is given.
+        """
+        with self._lock:
+            if image_path is None:
+                self._images.clear()
+                self._bytes = 0
+                return
+            path = os.path.abspath(image_path)
+            for key in [key for key in self._images if key[0] == path]:
+                self._bytes -= self._images.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'images': len(self._images), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+# The cache load_image uses when called with cache=True
+image_cache = ImageCache()
+
+def load_image(image_path, mode=None, cache=False):
     """
     Load an image from the given file path.
     
     Parameters:
     image_path (str): The path to the image file.
+    mode (str): Convert the image to this mode, such as 'RGB'. Defaults to the file's own mode.
+    cache (bool): Keep the decoded image in image_cache, so loading the same
+        unchanged file again skips decompression.
     
     Returns:
-    Image: The loaded image object.
+    Image: The loaded image object. Cached images are returned as copies, so
+    callers may modify them.
     """
+    if cache:
+        return shared_image(image_path, mode).copy()
     try:
-        image = Image.open(image_path)
-        print(f"Image loaded successfully from {image_path}")
+        return _read_image(image_path, mode)
+    except Exception as e:
+        logger.error("Error loading image: %s", e)
+        raise
+
+def shared_image(image_path, mode=None):
+    """
+    Return image_cache's own decoded image of a file, loading it on a miss.
+
+    Unlike load_image, no copy is made, so callers that only read the pixels,
+    such as previews, share the decode with later jobs. It must not be modified.
+    """
+    try:
+        key = ImageCache.key(image_path, mode)
+        image = image_cache.get(key)
+        if image is not None:
+            logger.info("Image loaded from cache for %s", image_path)
+            return image
+        image = _read_image(image_path, mode)
+        image_cache.put(key, image)
         return image
     except Exception as e:
-        print(f"Error loading image: {e}")
+        logger.error("Error loading image: %s", e)
         raise
 
-def save_image(image, save_path):
+def _read_image(image_path, mode):
+    image = Image.open(image_path)
+    with stage('load', pixels=image.width * image.height, nbytes=os.path.getsize(image_path)):
+        image.load()
+    if mode is not None and image.mode != mode:
+        image = convert_image(image, mode)
+    logger.info("Image loaded successfully from %s", image_path)
+    return image
+
+def image_format(save_path):
+    """
+    Return the Pillow format name for a file path, from its extension.
+
+    Raises:
+    ValueError: If Pillow cannot write files with this extension.
+    """
+    extension = os.path.splitext(save_path)[1].lower()
+    format = Image.registered_extensions().get(extension)
+    if format is None or format not in Image.SAVE:
+        raise ValueError(f"Cannot save images as '{extension or save_path}'")
+    return format
+
+def check_lossless(format, mode='RGB'):
+    """
+    Check that saving in a format keeps every pixel exact, so a payload survives.
+
+    Parameters:
+    format (str): A Pillow format name, or a file path to take it from.
+    mode (str): The mode of the image to be saved.
+
+    Raises:
+    ValueError: If the format is lossy, or would quantize or convert an image of this mode.
+    """
+    Image.init()
+    if format.upper() not in Image.SAVE:
+        format = image_format(format)
+    format = format.upper()
+    if format in LOSSY_FORMATS:
+        raise ValueError(f"{format} is lossy and would destroy the hidden message; save as PNG, BMP, TIFF or PPM")
+    if format in PALETTE_FORMATS and mode not in ('P', 'L', '1'):
+        raise ValueError(f"{format} reduces {mode} images to a palette and would destroy the hidden message; "
+                         "save as PNG, BMP, TIFF or PPM")
+    if format in FORMAT_MODES and mode not in FORMAT_MODES[format]:
+        alternatives = 'PNG or TIFF' if mode in FORMAT_MODES['PNG'] else 'TIFF'
+        raise ValueError(f"{format} cannot store {mode} images as they are and would destroy the hidden message; "
+                         f"save as {alternatives}")
+
+def save_options(format, profile='default'):
+    """
+    Return the Pillow save options for a format under a speed-vs-size profile.
+
+    Parameters:
+    format (str): The Pillow format name.
+    profile (str): 'default' for Pillow's defaults, 'fast' for the least
+        compression work or 'small' for the smallest files.
+
+    Returns:
+    dict: Keyword arguments for Image.save.
+    """
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown save profile: {profile}")
+    format = format.upper()
+    return {**SAVE_PROFILES[profile].get(format, {}), **_LOSSLESS_OPTIONS.get(format, {})}
+
+def save_image(image, save_path, profile='default'):
     """
     Save the given image to the specified file path.
     
     Parameters:
     image (Image): The image object to save.
     save_path (str): The path to save the image file.
+    profile (str): 'default', 'fast' or 'small'; see save_options.
+
+    Raises:
+    ValueError: If the format is lossy and would destroy a hidden message.
     """
     try:
-        image.save(save_path)
-        print(f"Image saved successfully to {save_path}")
+        format = image_format(save_path)
+        check_lossless(format, image.mode)
+        with stage('save', pixels=image.width * image.height) as counts:
+            image.save(save_path, format=format, **save_options(format, profile))
+            counts['bytes'] = os.path.getsize(save_path)
+        image_cache.invalidate(save_path)
+        logger.info("Image saved successfully to %s", save_path)
     except Exception as e:
-        print(f"Error saving image: {e}")
+        logger.error("Error saving image: %s", e)
+        raise
+
+def _png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+def _png_chunks(png):
+    # (type, data) of each chunk of a PNG file
+    offset = len(_PNG_SIGNATURE)
+    while offset < len(png):
+        length, chunk_type = struct.unpack_from('>I4s', png, offset)
+        yield chunk_type, png[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+def _write_apng(frames, output, count, loop, options):
+    # Each frame is compressed as a PNG of its own and its image data copied
+    # into the animation, so only one frame is held at a time. Every frame
+    # covers the whole canvas and replaces the last, so they decode exactly.
+    sequence = 0
+    header = None
+    written = 0
+    for frame in frames:
+        buffer = io.BytesIO()
+        frame.save(buffer, format='PNG', **options)
+        chunks = list(_png_chunks(buffer.getvalue()))
+        frame_header = next(data for chunk_type, data in chunks if chunk_type == b'IHDR')
+        if header is None:
+            header = frame_header
+            output.write(_PNG_SIGNATURE + _png_chunk(b'IHDR', header) + _png_chunk(b'acTL', struct.pack('>II', count, loop)))
+        elif frame_header != header:
+            raise ValueError(f"Frame {written} has a different size or mode from the first frame")
+        delay = min(0xFFFF, max(0, round(frame.info.get('duration') or 0)))
+        control = struct.pack('>IIIIIHHBB', sequence, frame.width, frame.height, 0, 0, delay, 1000, 0, 0)
+        output.write(_png_chunk(b'fcTL', control))
+        sequence += 1
+        for chunk_type, data in chunks:
+            if chunk_type != b'IDAT':
+                continue
+            if written == 0:
+                output.write(_png_chunk(b'IDAT', data))
+            else:
+                output.write(_png_chunk(b'fdAT', struct.pack('>I', sequence) + data))
+                sequence += 1
+        written += 1
+    if written != count:
+        raise ValueError(f"Expected {count} frames, got {written}")
+    output.write(_png_chunk(b'IEND', b''))
+
+def save_frames(frames, save_path, count, profile='default', loop=0):
+    """
+    Save the frames of an animation or multi-page image as they arrive, so only
+    one frame is in memory at a time.
+
+    Parameters:
+    frames (Iterable[Image]): The frames, all of one size and mode. Each frame's
+        info['duration'] gives its display time in milliseconds.
+    save_path (str): The path to save to: a PNG, written as an APNG, or a
+        TIFF, written with one page per frame.
+    count (int): The number of frames. APNG records it before the first frame.
+    profile (str): 'default', 'fast' or 'small'; see save_options.
+    loop (int): How many times an APNG plays, 0 for forever.
+
+    Raises:
+    ValueError: If the format cannot store several frames losslessly, or a
+        frame's mode or size differs from the first's.
+    """
+    format = image_format(save_path)
+    if format not in FRAME_FORMATS:
+        raise ValueError(f"Cannot save frames as {format}; save as PNG (APNG) or TIFF")
+    options = save_options(format, profile)
+    counts = {'seconds': 0.0, 'pixels': 0}
+
+    def timed(frames):
+        # Only the time spent saving each frame counts; making the next one is the caller's
+        for frame in frames:
+            check_lossless(format, frame.mode)
+            start = time.perf_counter()
+            yield frame
+            counts['seconds'] += time.perf_counter() - start
+            counts['pixels'] += frame.width * frame.height
+
+    try:
+        with open(save_path, 'w+b') as output:
+            if format == 'PNG':
+                _write_apng(timed(frames), output, count, loop, options)
+            else:
+                with TiffImagePlugin.AppendingTiffWriter(output, True) as tiff:
+                    for frame in timed(frames):
+                        frame.save(tiff, format='TIFF', **options)
+                        tiff.newFrame()
+        registry.record('save', counts['seconds'], counts['pixels'], os.path.getsize(save_path))
+        image_cache.invalidate(save_path)
+        logger.info("%d frames saved successfully to %s", count, save_path)
+    except Exception as e:
+        logger.error("Error saving frames: %s", e)
+        if os.path.exists(save_path):
+            os.remove(save_path)
         raise
 
 def resize_image(image, size):
@@ -46,10 +368,10 @@ def resize_image(image, size):
     """
     try:
         resized_image = image.resize(size)
-        print(f"Image resized to {size}")
+        logger.info("Image resized to %s", size)
         return resized_image
     except Exception as e:
-        print(f"Error resizing image: {e}")
+        logger.error("Error resizing image: %s", e)
         raise
 
 def convert_image_to_grayscale(image):
@@ -63,11 +385,12 @@ def convert_image_to_grayscale(image):
     Image: The converted grayscale image object.
     """
     try:
-        grayscale_image = image.convert('L')
-        print("Image converted to grayscale")
+        with stage('convert', pixels=image.width * image.height):
+            grayscale_image = image.convert('L')
+        logger.info("Image converted to grayscale")
         return grayscale_image
     except Exception as e:
-        print(f"Error converting image to grayscale: {e}")
+        logger.error("Error converting image to grayscale: %s", e)
         raise
 
 def show_image(image):
@@ -79,9 +402,9 @@ def show_image(image):
     """
     try:
         image.show()
-        print("Image displayed successfully")
+        logger.info("Image displayed successfully")
     except Exception as e:
-        print(f"Error displaying image: {e}")
+        logger.error("Error displaying image: %s", e)
         raise
 
 def get_image_size(image):
@@ -96,10 +419,30 @@ def get_image_size(image):
     """
     try:
         size = image.size
-        print(f"Image size: {size}")
+        logger.info("Image size: %s", size)
         return size
     except Exception as e:
-        print(f"Error getting image size: {e}")
+        logger.error("Error getting image size: %s", e)
+        raise
+
+def convert_image(image, mode):
+    """
+    Convert the given image to the specified mode.
+    
+    Parameters:
+    image (Image): The image object to convert.
+    mode (str): The mode to convert to, such as 'RGB' or 'L'.
+    
+    Returns:
+    Image: The converted image object.
+    """
+    try:
+        with stage('convert', pixels=image.width * image.height):
+            converted_image = image.convert(mode)
+        logger.info("Image converted to %s", mode)
+        return converted_image
+    except Exception as e:
+        logger.error("Error converting image to %s: %s", mode, e)
         raise
 
 def convert_image_to_rgb(image):
@@ -113,9 +456,45 @@ def convert_image_to_rgb(image):
     Image: The converted RGB image object.
     """
     try:
-        rgb_image = image.convert('RGB')
-        print("Image converted to RGB")
+        with stage('convert', pixels=image.width * image.height):
+            rgb_image = image.convert('RGB')
+        logger.info("Image converted to RGB")
         return rgb_image
     except Exception as e:
-        print(f"Error converting image to RGB: {e}")
+        logger.error("Error converting image to RGB: %s", e)
+        raise
+
+def create_thumbnail(source, size):
+    """
+    Create a small preview of an image without keeping a full-size copy.
+
+    Files are opened lazily, so formats that support it (such as JPEG) are
+    decoded at a reduced scale with draft() before being shrunk.
+    
+    Parameters:
+    source (str | Image): The path to the image file, or an image object.
+    size (tuple): The largest preview size as a tuple (width, height).
+    
+    Returns:
+    Image: An RGBA preview no larger than size, keeping the aspect ratio.
+    """
+    try:
+        if isinstance(source, Image.Image):
+            # Box-reduce by a whole factor first rather than copying the full image
+            factor = min(source.width // size[0], source.height // size[1])
+            if factor > 1 and source.mode not in ('1', 'P'):
+                thumbnail = source.reduce(factor)
+            else:
+                thumbnail = source.copy()
+            thumbnail.thumbnail(size)
+            thumbnail = thumbnail.convert('RGBA')
+        else:
+            with Image.open(source) as image:
+                # thumbnail() drafts and reduces before resampling
+                image.thumbnail(size)
+                thumbnail = image.convert('RGBA')
+        logger.info("Thumbnail created at %s", thumbnail.size)
+        return thumbnail
+    except Exception as e:
+        logger.error("Error creating thumbnail: %s", e)
         raise
@@ -0,0 +1,72 @@
+import pytest
+import unittest
+import math
+import numpy as np
+from PIL import Image
+from src.algorithms.analysis import ChannelPlanes, analyze_image, analyze_pixels, rs_analysis, sample_pairs, _gamma_survival
+from src.algorithms.lsb import encode_lsb
+from src.algorithms.payload import payload_capacity
+
+def smooth_cover(height=200, width=240, bands=3, seed=0):
+    # Gradients with mild noise, like a photograph; uniform noise would defeat every test
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = (np.sin(x / 37.0) * 60 + np.cos(y / 23.0) * 50 + 128)[..., np.newaxis] + np.arange(bands) * 5
+    return np.clip(base + rng.normal(0, 3, (height, width, bands)), 0, 255).astype(np.uint8)
+
+def replace_lsbs(pixels, rate, seed=1):
+    # Overwrite the LSBs of a random fraction of the channel values with random bits
+    rng = np.random.default_rng(seed)
+    channels = pixels.copy().reshape(-1)
+    chosen = rng.permutation(channels.size)[:int(rate * channels.size)]
+    channels[chosen] = (channels[chosen] & 0xFE) | rng.integers(0, 2, chosen.size, dtype=np.uint8)
+    return channels.reshape(pixels.shape)
+
+class TestAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.cover = smooth_cover()
+
+    def test_clean_cover(self):
+        scores = analyze_pixels(self.cover)
+        self.assertLess(scores['rs'], 0.05)
+        self.assertLess(scores['sample_pairs'], 0.05)
+        self.assertEqual(scores['score'], max(scores['rs'], scores['sample_pairs']))
+
+    def test_estimates_embedding_rate(self):
+        for rate in (0.25, 0.5):
+            planes = ChannelPlanes(replace_lsbs(self.cover, rate))
+            self.assertAlmostEqual(rs_analysis(planes), rate, delta=0.07)
+            self.assertAlmostEqual(sample_pairs(planes), rate, delta=0.07)
+
+    def test_full_lsb_payload(self):
+        image = Image.fromarray(self.cover)
+        room = payload_capacity(self.cover.shape[0] * self.cover.shape[1] * 3)
+        encoded_image = encode_lsb(image, np.random.default_rng(2).bytes(room))
+        scores = analyze_image(encoded_image)
+        self.assertGreater(scores['chi_square'], 0.9)
+        self.assertGreater(scores['rs'], 0.8)
+        self.assertGreater(scores['sample_pairs'], 0.8)
+
+    def test_rs_sampling(self):
+        planes = ChannelPlanes(replace_lsbs(self.cover, 0.3))
+        self.assertAlmostEqual(rs_analysis(planes, max_groups=4000), rs_analysis(planes), delta=0.05)
+
+    def test_modes(self):
+        gray = Image.fromarray(replace_lsbs(smooth_cover(bands=1), 1.0)[:, :, 0], 'L')
+        self.assertGreater(analyze_image(gray)['score'], 0.8)
+        # Palette images are analyzed in their colors
+        self.assertLess(analyze_image(Image.fromarray(self.cover).convert('P'))['score'], 1.0)
+        with self.assertRaises(ValueError):
+            analyze_image(Image.new('I;16', (20, 20)))
+        with self.assertRaises(ValueError):
+            analyze_pixels(np.zeros((20, 3, 3), dtype=np.uint8))
+
+    def test_gamma_survival(self):
+        self.assertAlmostEqual(_gamma_survival(1, 1), math.exp(-1), places=12)
+        self.assertAlmostEqual(_gamma_survival(1, 0.3), math.exp(-0.3), places=12)
+        self.assertAlmostEqual(_gamma_survival(0.5, 2), math.erfc(math.sqrt(2)), places=12)
+        self.assertEqual(_gamma_survival(3, 0), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import pytest
+import unittest
+import csv
+import json
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# analyze.py imports its siblings the way main.py does, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analyze import find_images, analyze_file, analyze_images, write_report, REPORT_COLUMNS
+from tests.test_analysis import smooth_cover, replace_lsbs
+
+class TestAnalyze(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        os.makedirs(self.path('incoming', 'nested'))
+        cover = smooth_cover(120, 160)
+        Image.fromarray(cover).save(self.path('incoming', 'clean.png'))
+        Image.fromarray(replace_lsbs(cover, 1.0)).save(self.path('incoming', 'nested', 'stego.bmp'))
+        Image.fromarray(cover).save(self.path('incoming', 'photo.jpg'))
+        with open(self.path('incoming', 'notes.txt'), 'w') as notes:
+            notes.write('not an image')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.dir, *names)
+
+    def test_find_images(self):
+        # Lossy and non-image files are skipped in directories, but kept when named
+        images = find_images([self.path('incoming'), self.path('incoming', 'notes.txt')])
+        self.assertEqual(images, [self.path('incoming', 'clean.png'), self.path('incoming', 'nested', 'stego.bmp'),
+                                  self.path('incoming', 'notes.txt')])
+
+    def test_analyze_images(self):
+        reported = []
+        paths = [self.path('incoming'), self.path('incoming', 'notes.txt')]
+        results, summary = analyze_images(paths, workers=2, report=reported.append)
+        self.assertEqual(reported, results)
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok', 'error'])
+        self.assertEqual([result.get('flagged') for result in results], [False, True, None])
+        self.assertEqual((results[0]['width'], results[0]['height']), (160, 120))
+        self.assertEqual((summary['images'], summary['succeeded'], summary['failed'], summary['flagged']), (3, 2, 1, 1))
+        self.assertGreater(summary['megapixels_per_second'], 0)
+
+    def test_threshold(self):
+        result = analyze_file({'input': self.path('incoming', 'clean.png'), 'threshold': 0.0})
+        self.assertTrue(result['flagged'])
+        self.assertIn('analyze', result['metrics'])
+
+    def test_reports(self):
+        results, summary = analyze_images([self.path('incoming')], workers=1)
+        write_report(self.path('scores.csv'), results, summary)
+        with open(self.path('scores.csv'), newline='') as report:
+            rows = list(csv.DictReader(report))
+        self.assertEqual(tuple(rows[0]), REPORT_COLUMNS)
+        self.assertEqual([row['flagged'] for row in rows], ['False', 'True'])
+
+        write_report(self.path('scores.json'), results, summary)
+        with open(self.path('scores.json')) as report:
+            document = json.load(report)
+        self.assertEqual(document['images'], results)
+        self.assertEqual(document['summary']['flagged'], 1)
+
+        with self.assertRaises(ValueError):
+            write_report(self.path('scores.txt'), results, summary)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import pytest
+import unittest
+import os
+from PIL import Image
+from src.algorithms.auto import detect_payload, decode_auto
+from src.algorithms.lsb import encode_lsb
+from src.algorithms.lsbm import encode_lsbm
+from src.algorithms.rlsb import encode_rlsb
+from src.algorithms.payload import PayloadError
+
+class TestAuto(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.frombytes('RGB', (60, 40), os.urandom(60 * 40 * 3))
+        self.message = "Hello, auto!"
+
+    def test_detects_each_algorithm(self):
+        self.assertEqual(decode_auto(encode_lsb(self.image, self.message))[1]['algorithm'], 'lsb')
+        self.assertEqual(decode_auto(encode_lsbm(self.image, self.message, seed=1))[1]['algorithm'], 'lsbm')
+
+        message, best = decode_auto(encode_rlsb(self.image, self.message, 99), seeds=[1, 99, 3])
+        self.assertEqual(message, self.message)
+        self.assertEqual((best['algorithm'], best['seed'], best['ordering']), ('rlsb', 99, 'feistel'))
+
+    def test_shuffle_ordering_and_bits(self):
+        encoded_image = encode_rlsb(self.image, b"\x00\x01binary", 5, ordering='shuffle', bits_per_channel=3)
+        message, best = decode_auto(encoded_image, seeds=[5])
+        self.assertEqual(message, b"\x00\x01binary")
+        self.assertEqual(best['ordering'], 'shuffle')
+
+    def test_stops_at_first_framed_payload(self):
+        encoded_image = encode_lsb(self.image, self.message)
+        self.assertEqual(len(detect_payload(encoded_image, seeds=[1, 2])), 1)
+        candidates = detect_payload(encoded_image, seeds=[1, 2], exhaustive=True)
+        self.assertEqual(len(candidates), 5)
+        self.assertEqual(candidates[0]['confidence'], 1.0)
+        self.assertTrue(all(candidate['confidence'] < 1.0 for candidate in candidates[1:]))
+
+    def test_legacy_message(self):
+        encoded_image = encode_lsb(self.image, "an older message", framed=False)
+        message, best = decode_auto(encoded_image, seeds=[1])
+        self.assertEqual(message, "an older message")
+        self.assertFalse(best['framed'])
+        self.assertLess(best['confidence'], 1.0)
+
+    def test_no_message(self):
+        with self.assertRaises(PayloadError):
+            decode_auto(Image.new('RGB', (60, 40), color = 'white'), seeds=[1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
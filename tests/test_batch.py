@@ -0,0 +1,84 @@
+import pytest
+import unittest
+import json
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# batch.py imports its siblings the way main.py does, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from batch import load_manifest, glob_jobs, run_job, run_batch
+from algorithms.rlsb import decode_rlsb
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        for i in range(3):
+            Image.new('RGB', (20, 20), color = 'white').save(os.path.join(self.dir, f'cover{i}.png'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_load_csv_manifest(self):
+        with open(self.path('jobs.csv'), 'w') as manifest:
+            manifest.write('input,output,algorithm,message,seed\n')
+            manifest.write('cover0.png,out0.png,rlsb,Hello,7\n')
+        jobs = load_manifest(self.path('jobs.csv'))
+        self.assertEqual(jobs, [{'input': self.path('cover0.png'), 'output': self.path('out0.png'),
+                                 'algorithm': 'rlsb', 'message': 'Hello', 'seed': '7'}])
+
+    def test_load_jsonl_manifest(self):
+        with open(self.path('jobs.jsonl'), 'w') as manifest:
+            manifest.write(json.dumps({'input': 'cover0.png', 'algorithm': 'lsb', 'action': 'decode'}) + '\n\n')
+        jobs = load_manifest(self.path('jobs.jsonl'))
+        self.assertEqual(jobs, [{'input': self.path('cover0.png'), 'algorithm': 'lsb', 'action': 'decode'}])
+
+    def test_run_job_reports_errors(self):
+        result = run_job({'input': self.path('missing.png'), 'output': self.path('out.png'), 'algorithm': 'lsb', 'message': 'x'})
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('missing.png', result['error'])
+
+    def test_run_batch_from_glob(self):
+        with open(self.path('message.txt'), 'w') as message_file:
+            message_file.write('From a file')
+        jobs = glob_jobs(self.path('cover*.png'), self.path(''), 'rlsb', message_file=self.path('message.txt'), seed=99)
+        for job in jobs:
+            job['output'] = job['output'].replace('cover', 'stego')
+
+        results = []
+        summary = run_batch(jobs, workers=2, report=results.append)
+
+        self.assertEqual(summary['images'], 3)
+        self.assertEqual(summary['succeeded'], 3)
+        self.assertEqual([result['status'] for result in results], ['ok'] * 3)
+        self.assertEqual(decode_rlsb(Image.open(self.path('stego1.png')), 99), b'From a file')
+
+    def test_binary_message_file(self):
+        # Not valid UTF-8, so it must be read as bytes
+        payload = bytes(range(0, 256, 3)) + b'\xff\xfe\x00\x80'
+        with open(self.path('payload.bin'), 'wb') as message_file:
+            message_file.write(payload)
+        result = run_job({'input': self.path('cover0.png'), 'output': self.path('out.png'), 'algorithm': 'rlsb',
+                          'message_file': self.path('payload.bin'), 'seed': '5'})
+        self.assertEqual(result['status'], 'ok', result.get('error'))
+        self.assertEqual(decode_rlsb(Image.open(self.path('out.png')), 5), payload)
+
+    def test_lossy_outputs(self):
+        Image.new('RGB', (20, 20), color = 'white').save(self.path('photo.jpg'))
+        jobs = glob_jobs(self.path('*.jpg'), self.path('out'), 'lsb', message='x', save_profile='fast')
+        self.assertEqual(jobs[0]['output'], self.path(os.path.join('out', 'photo.png')))
+        self.assertEqual(jobs[0]['save_profile'], 'fast')
+
+        result = run_job({'input': self.path('cover0.png'), 'output': self.path('out.jpg'), 'algorithm': 'lsb', 'message': 'x'})
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('JPEG', result['error'])
+        self.assertFalse(os.path.exists(self.path('out.jpg')))
+
+if __name__ == '__main__':
+    unittest.main()
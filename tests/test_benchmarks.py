@@ -0,0 +1,28 @@
+import pytest
+import unittest
+from benchmarks.bench_algorithms import run_grid, build_report, compare
+
+class TestBenchmarks(unittest.TestCase):
+
+    def report(self, seconds, status='ok'):
+        return {'results': [{'id': 'lsb-encode', 'status': status, 'seconds': seconds}]}
+
+    def test_small_grid(self):
+        results = run_grid(sizes=(0.001,), fills=(0.5,), modes=('RGB',), repeat=1)
+        self.assertEqual(len(results), 6)
+        for case in results:
+            self.assertEqual(case['status'], 'ok', case.get('error'))
+            self.assertGreater(case['pixels_per_second'], 0)
+            self.assertGreater(case['peak_bytes'], 0)
+        self.assertEqual(build_report(results)['results'], results)
+
+    def test_compare_flags_regressions(self):
+        self.assertEqual(compare(self.report(1.0), self.report(1.05), 0.1), [])
+        self.assertEqual(compare(self.report(1.0), self.report(1.5), 0.1), [('lsb-encode', 1.0, 1.5, 1.5)])
+
+    def test_compare_flags_failures(self):
+        regressions = compare(self.report(1.0), self.report(None, status='error'), 0.1)
+        self.assertEqual([case for case, *_ in regressions], ['lsb-encode'])
+
+if __name__ == '__main__':
+    unittest.main()
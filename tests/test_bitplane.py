@@ -0,0 +1,108 @@
+import pytest
+import unittest
+import numpy as np
+from functools import partial
+from src.algorithms.bitplane import (BitReader, message_to_bits, read_message, iter_lsb_bits, iter_order_bits, embed_bits,
+                                    extract_bits, embed_ordered)
+from src.algorithms.permutation import pixel_order
+from src.algorithms.lsb import encode_lsb, decode_lsb, decode_lsb_reference
+from PIL import Image
+import os
+
+class TestBitReader(unittest.TestCase):
+
+    def chunks(self, bits, size):
+        # Yield bits in chunks, recording how many were pulled
+        for start in range(0, bits.size, size):
+            self.pulled += 1
+            yield bits[start:start + size]
+
+    def setUp(self):
+        self.pulled = 0
+
+    def test_read_message_stops_at_delimiter(self):
+        bits = np.concatenate((message_to_bits('Hi'), np.ones(8 * 1000, dtype=np.uint8)))
+        self.assertEqual(read_message(self.chunks(bits, 5)), 'Hi')
+        # 'Hi' plus the delimiter is 24 bits, so only 5 chunks of 5 bits are needed
+        self.assertEqual(self.pulled, 5)
+
+    def test_read_exact_bytes_across_chunks(self):
+        bits = np.unpackbits(np.frombuffer(b'abcdef', dtype=np.uint8))
+        reader = BitReader(self.chunks(bits, 3))
+        self.assertEqual(reader.read(2), b'ab')
+        self.assertEqual(reader.read(3), b'cde')
+        self.assertEqual(reader.read(10), b'f')
+
+    def test_read_until_without_delimiter(self):
+        bits = np.unpackbits(np.frombuffer(b'abc', dtype=np.uint8))
+        self.assertEqual(BitReader(self.chunks(bits, 7)).read_until(), b'abc')
+
+class TestMultiBit(unittest.TestCase):
+
+    def test_embed_extract_round_trip(self):
+        bits = np.random.default_rng(0).integers(0, 2, size=1001, dtype=np.uint8)
+        for bits_per_channel in range(1, 5):
+            channels = np.frombuffer(os.urandom(400), dtype=np.uint8).copy()
+            original = channels.copy()
+            count = embed_bits(channels, bits, bits_per_channel)
+
+            self.assertEqual(count, min(bits.size, channels.size * bits_per_channel))
+            np.testing.assert_array_equal(extract_bits(channels, bits_per_channel)[:count], bits[:count])
+            # Only the low bits_per_channel bits may change
+            high_mask = 0xFF ^ ((1 << bits_per_channel) - 1)
+            np.testing.assert_array_equal(channels & high_mask, original & high_mask)
+
+    def test_partial_last_group_is_padded(self):
+        channels = np.full(4, 0xFF, dtype=np.uint8)
+        self.assertEqual(embed_bits(channels, np.array([1, 0, 1, 1, 1], dtype=np.uint8), 3), 5)
+        np.testing.assert_array_equal(channels, [0xFD, 0xFE, 0xFF, 0xFF])
+
+class TestStreamingDecode(unittest.TestCase):
+
+    def test_decode_across_bands(self):
+        # Narrow, tall image so the message spans many row bands
+        image = Image.frombytes('RGB', (7, 300), os.urandom(7 * 300 * 3))
+        message = 'Streaming ' * 40
+        self.assertEqual(decode_lsb(encode_lsb(image, message)), message)
+
+        legacy_image = encode_lsb(image, message, framed=False)
+        self.assertEqual(decode_lsb(legacy_image), message)
+        self.assertEqual(decode_lsb_reference(legacy_image), message)
+
+    def test_bands_cover_whole_plane(self):
+        image = Image.frombytes('RGB', (13, 211), os.urandom(13 * 211 * 3))
+        bits = np.concatenate(list(iter_lsb_bits(image, chunk_pixels=100)))
+        np.testing.assert_array_equal(bits, np.array(image).reshape(-1) & 1)
+
+class TestEmbedOrderedInPlace(unittest.TestCase):
+
+    def test_image_matches_array(self):
+        image = Image.frombytes('RGB', (50, 40), os.urandom(50 * 40 * 3))
+        order = pixel_order(50, 40, 9)
+        for bits_per_channel in (1, 2, 4):
+            for count in (7, 1000, 50 * 40 * 3 * bits_per_channel - 30):
+                bits = np.random.default_rng(count).integers(0, 2, count, dtype=np.uint8)
+                embed = partial(embed_bits, bits_per_channel=bits_per_channel)
+                pixels = np.array(image)
+                target = image.copy()
+                # Small chunks, so positions fall in many bands and the image is passed over several times
+                self.assertEqual(embed_ordered(pixels, order, bits, embed, 3, bits_per_channel, chunk_pixels=64),
+                                 embed_ordered(target, order, bits, embed, 3, bits_per_channel, chunk_pixels=64))
+                self.assertEqual(target.tobytes(), pixels.tobytes())
+
+    def test_sparse_positions_match_array(self):
+        # Wide enough that the first chunks' few positions per band are accessed one by one
+        image = Image.frombytes('RGB', (2000, 200), os.urandom(2000 * 200 * 3))
+        order = pixel_order(2000, 200, 4)
+        bits = np.random.default_rng(1).integers(0, 2, 5000, dtype=np.uint8)
+        pixels = np.array(image)
+        target = image.copy()
+        self.assertEqual(embed_ordered(pixels, order, bits, start=10), embed_ordered(target, order, bits, start=10))
+        self.assertEqual(target.tobytes(), pixels.tobytes())
+
+        for start in (0, 70000):
+            np.testing.assert_array_equal(np.concatenate(list(iter_order_bits(target, order, start, 2))),
+                                          np.concatenate(list(iter_order_bits(pixels, order, start, 2))))
+
+if __name__ == '__main__':
+    unittest.main()
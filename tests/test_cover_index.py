@@ -0,0 +1,103 @@
+import pytest
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+from PIL import Image
+
+# cover_index.py imports its siblings the way main.py does, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from cover_index import open_index, scan_covers, pick_cover, cover_capacities
+from algorithms.payload import payload_capacity
+
+class TestCoverIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        self.covers = self.path('covers')
+        os.makedirs(os.path.join(self.covers, 'nested'))
+        Image.new('RGB', (40, 30), 'white').save(self.path('covers', 'small.png'))
+        Image.new('RGBA', (100, 80), 'white').save(self.path('covers', 'nested', 'large.tif'))
+        frames = [Image.frombytes('RGB', (20, 20), os.urandom(1200)).quantize(16) for _ in range(4)]
+        frames[0].save(self.path('covers', 'animation.gif'), save_all=True, append_images=frames[1:])
+        with open(self.path('covers', 'broken.png'), 'w') as broken:
+            broken.write('not an image')
+        with open(self.path('covers', 'notes.txt'), 'w') as notes:
+            notes.write('skipped')
+        self.database = self.path('covers.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.dir, *names)
+
+    def test_scan(self):
+        reported = []
+        summary = scan_covers(self.database, [self.covers], reported.append)
+        self.assertEqual((summary['added'], summary['failed'], summary['unchanged']), (3, 1, 0))
+        self.assertEqual(len(reported), 4)
+        connection = open_index(self.database)
+        rows = {os.path.basename(row['path']): row for row in connection.execute('SELECT * FROM covers')}
+        self.assertEqual((rows['animation.gif']['mode'], rows['animation.gif']['frames']), ('P', 4))
+        self.assertEqual((rows['large.tif']['width'], rows['large.tif']['height']), (100, 80))
+        self.assertEqual(len(rows['small.png']['sha256']), 64)
+        self.assertIsNotNone(rows['broken.png']['error'])
+        capacity = connection.execute("SELECT bytes FROM capacities WHERE path = ? AND algorithm = 'rlsb' AND bits = 2",
+                                      (self.path('covers', 'nested', 'large.tif'),)).fetchone()[0]
+        self.assertEqual(capacity, payload_capacity(100 * 80 * 4, 2, 4))
+        connection.close()
+
+    def test_rescan_touches_only_changes(self):
+        scan_covers(self.database, [self.covers])
+        summary = scan_covers(self.database, [self.covers])
+        self.assertEqual((summary['added'], summary['updated'], summary['unchanged']), (0, 0, 4))
+
+        Image.new('RGB', (60, 50), 'white').save(self.path('covers', 'small.png'))
+        os.remove(self.path('covers', 'nested', 'large.tif'))
+        summary = scan_covers(self.database, [self.covers])
+        self.assertEqual((summary['updated'], summary['removed'], summary['unchanged']), (1, 1, 2))
+        connection = open_index(self.database)
+        self.assertEqual(connection.execute('SELECT width FROM covers WHERE path = ?',
+                                            (self.path('covers', 'small.png'),)).fetchone()[0], 60)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM capacities WHERE path = ?',
+                                            (self.path('covers', 'nested', 'large.tif'),)).fetchone()[0], 0)
+        connection.close()
+
+    def test_pick(self):
+        scan_covers(self.database, [self.covers])
+        small = payload_capacity(40 * 30 * 3)
+        self.assertEqual(pick_cover(self.database, small)['path'], self.path('covers', 'small.png'))
+        self.assertEqual(pick_cover(self.database, small + 1)['path'], self.path('covers', 'nested', 'large.tif'))
+        self.assertIsNone(pick_cover(self.database, 10 ** 6))
+
+        # With --frames, every frame of the animation counts
+        self.assertGreater(payload_capacity(4 * 20 * 20 * 3), small + 1)
+        self.assertEqual(pick_cover(self.database, small + 1, frames=True)['path'], self.path('covers', 'animation.gif'))
+        self.assertEqual(pick_cover(self.database, small, 'rlsb', frames=True)['path'], self.path('covers', 'small.png'))
+
+    def test_pick_skips_changed_files(self):
+        scan_covers(self.database, [self.covers])
+        Image.new('RGB', (10, 10), 'white').save(self.path('covers', 'small.png'))
+        self.assertEqual(pick_cover(self.database, 10)['path'], self.path('covers', 'animation.gif'))
+        with self.assertRaises(FileNotFoundError):
+            pick_cover(self.path('missing.db'), 10)
+
+    def test_schema_version(self):
+        connection = sqlite3.connect(self.database)
+        connection.execute('CREATE TABLE covers (path TEXT)')
+        connection.commit()
+        connection.close()
+        self.assertEqual(scan_covers(self.database, [self.covers])['added'], 3)
+
+    def test_capacities(self):
+        capacities = {(algorithm, bits): (size, frame_size) for algorithm, bits, size, frame_size in
+                      cover_capacities(10, 10, 'L', frames=3)}
+        self.assertEqual(capacities[('lsbm', 1)], (payload_capacity(100, 1, 1), payload_capacity(300, 1, 1)))
+        self.assertNotIn(('lsbm', 2), capacities)
+        self.assertIn(('lsb', 4), capacities)
+
+if __name__ == '__main__':
+    unittest.main()
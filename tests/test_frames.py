@@ -0,0 +1,97 @@
+import pytest
+import unittest
+import os
+import tempfile
+import numpy as np
+from PIL import Image, ImageSequence
+from src.algorithms.frames import encode_frames, decode_frames, frame_count
+from src.algorithms.lsb import encode_lsb
+from src.algorithms.payload import PayloadError, payload_capacity
+from src.utils.image_utils import save_frames
+
+class TestFrames(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        rng = np.random.default_rng(0)
+        self.frames = [Image.fromarray(rng.integers(0, 256, (30, 40, 3), dtype=np.uint8)).quantize(64) for _ in range(5)]
+        self.gif = self.path('cover.gif')
+        self.frames[0].save(self.gif, save_all=True, append_images=self.frames[1:], duration=[50, 70, 90, 20, 20], loop=3)
+        # More than two frames hold, less than four
+        self.message = os.urandom(1500)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def encode(self, output, algorithm, cover=None, message=None, **options):
+        with Image.open(cover or self.gif) as image:
+            frames = encode_frames(image, self.message if message is None else message, algorithm, **options)
+            save_frames(frames, output, frame_count(image), loop=image.info.get('loop', 0))
+
+    def test_round_trip(self):
+        for algorithm, options, output in [('lsb', {}, 'out.png'), ('lsbm', {'seed': 4}, 'out.png'),
+                                           ('rlsb', {'seed': 7, 'bits_per_channel': 2}, 'out.tif'),
+                                           ('rlsb', {'seed': 7, 'ordering': 'shuffle'}, 'out.png')]:
+            self.encode(self.path(output), algorithm, **options)
+            with Image.open(self.path(output)) as image:
+                self.assertEqual(frame_count(image), 5)
+                self.assertEqual(decode_frames(image, algorithm, options.get('seed'), options.get('ordering', 'feistel')),
+                                 self.message)
+
+    def test_frames_kept(self):
+        self.encode(self.path('out.png'), 'lsb')
+        with Image.open(self.gif) as cover, Image.open(self.path('out.png')) as encoded:
+            self.assertEqual(encoded.info['loop'], 3)
+            changes = []
+            for cover_frame, encoded_frame in zip(ImageSequence.Iterator(cover), ImageSequence.Iterator(encoded)):
+                self.assertEqual(encoded_frame.info['duration'], cover_frame.info['duration'])
+                difference = np.array(cover_frame.convert('RGB'), dtype=np.int16) - np.array(encoded_frame, dtype=np.int16)
+                changes.append(int(np.abs(difference).max()))
+            # Only the LSBs of the frames the payload reaches change
+            self.assertEqual(changes, [1, 1, 1, 1, 0])
+
+    def test_header_spans_frames(self):
+        rng = np.random.default_rng(1)
+        tiny = [Image.fromarray(rng.integers(0, 256, (4, 5, 4), dtype=np.uint8), 'RGBA') for _ in range(10)]
+        tiny[0].save(self.path('tiny.png'), save_all=True, append_images=tiny[1:])
+        self.encode(self.path('tiny.tif'), 'lsb', cover=self.path('tiny.png'), message='Hello frames')
+        with Image.open(self.path('tiny.tif')) as image:
+            self.assertEqual(image.mode, 'RGBA')
+            self.assertEqual(decode_frames(image, 'lsb', strict=True), 'Hello frames')
+
+    def test_streams_lazily(self):
+        too_large = b'x' * (payload_capacity(5 * 30 * 40 * 3) + 1)
+        with Image.open(self.gif) as image:
+            # The payload is checked before any frame is read
+            with self.assertRaises(PayloadError):
+                encode_frames(image, too_large, 'lsb')
+            frames = encode_frames(image, self.message, 'lsb')
+            self.assertEqual(image.tell(), 0)
+            next(frames)
+            next(frames)
+            self.assertEqual(image.tell(), 1)
+
+    def test_still_image(self):
+        cover = Image.fromarray(np.random.default_rng(2).integers(0, 256, (20, 20, 3), dtype=np.uint8))
+        encode_lsb(cover, "Hello").save(self.path('still.png'))
+        with Image.open(self.path('still.png')) as image:
+            self.assertEqual(frame_count(image), 1)
+            self.assertEqual(decode_frames(image, 'lsb'), "Hello")
+
+    def test_save_frames_refuses(self):
+        with Image.open(self.gif) as image:
+            with self.assertRaises(ValueError):
+                save_frames(encode_frames(image, "Hi", 'lsb'), self.path('out.bmp'), 5)
+        mixed = [Image.new('RGB', (10, 10)), Image.new('RGBA', (10, 10))]
+        with self.assertRaises(ValueError):
+            save_frames(iter(mixed), self.path('mixed.png'), 2)
+        self.assertFalse(os.path.exists(self.path('mixed.png')))
+        with self.assertRaises(ValueError):
+            save_frames(iter(mixed[:1]), self.path('short.png'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
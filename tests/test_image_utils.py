@@ -1,6 +1,9 @@
 import pytest
 import unittest
-from src.utils.image_utils import load_image, save_image
+import unittest.mock
+import builtins
+from src.utils.image_utils import (load_image, save_image, create_thumbnail, image_cache, ImageCache, check_lossless, save_options,
+                                   shared_image)
 from PIL import Image
 import os
 
@@ -25,5 +28,99 @@ class TestImageUtils(unittest.TestCase):
         self.assertTrue(os.path.exists(output_path))
         os.remove(output_path)
 
+    def test_save_profiles(self):
+        image = Image.merge('RGB', [Image.linear_gradient('L'), Image.effect_noise((256, 256), 8), Image.linear_gradient('L').rotate(90)])
+        sizes = {}
+        for profile in ('fast', 'default', 'small'):
+            output_path = f'output_{profile}.png'
+            save_image(image, output_path, profile)
+            self.assertEqual(load_image(output_path).tobytes(), image.tobytes())
+            sizes[profile] = os.path.getsize(output_path)
+            os.remove(output_path)
+        self.assertGreaterEqual(sizes['fast'], sizes['small'])
+        self.assertEqual(save_options('PNG', 'fast'), {'compress_level': 1})
+        self.assertTrue(save_options('WEBP', 'default')['lossless'])
+        with self.assertRaises(ValueError):
+            save_options('PNG', 'tiny')
+
+    def test_refuse_lossy(self):
+        for path in ('output.jpg', 'output.JPEG', 'output.gif', 'output.unknown'):
+            with self.assertRaises(ValueError):
+                save_image(self.test_image, path)
+            self.assertFalse(os.path.exists(path))
+        check_lossless('PNG')
+        check_lossless('output.gif', mode='P')
+        check_lossless('output.png', mode='I;16')
+        check_lossless('output.tif', mode='CMYK')
+        for path, mode in (('output.bmp', 'RGBA'), ('output.webp', 'L'), ('output.ppm', 'I;16'), ('output.png', 'CMYK')):
+            with self.assertRaises(ValueError):
+                check_lossless(path, mode)
+        with self.assertRaises(ValueError):
+            check_lossless('JPEG')
+
+    def test_create_thumbnail(self):
+        Image.new('RGB', (400, 100), color = 'red').save(self.test_image_path)
+        for source in (self.test_image_path, load_image(self.test_image_path)):
+            thumbnail = create_thumbnail(source, (200, 200))
+            self.assertEqual(thumbnail.size, (200, 50))
+            self.assertEqual(thumbnail.mode, 'RGBA')
+            self.assertEqual(thumbnail.getpixel((0, 0)), (255, 0, 0, 255))
+
+        # The file is closed once the preview is made, including multi-page files Pillow keeps open
+        pages_path = 'test_pages.tif'
+        Image.new('RGB', (400, 100)).save(pages_path, save_all=True, append_images=[Image.new('RGB', (400, 100))])
+        files = []
+        open_file = builtins.open
+        with unittest.mock.patch('builtins.open', lambda *args, **kwargs: files.append(open_file(*args, **kwargs)) or files[-1]):
+            create_thumbnail(pages_path, (200, 200))
+        os.remove(pages_path)
+        self.assertTrue(files)
+        self.assertTrue(all(image_file.closed for image_file in files))
+
+    def test_preview_shares_cached_decode(self):
+        image_cache.invalidate()
+        before = image_cache.stats()
+        shared = shared_image(self.test_image_path)
+        self.assertIs(shared_image(self.test_image_path), shared)
+        create_thumbnail(shared, (5, 5))
+        self.assertEqual(load_image(self.test_image_path, cache=True).tobytes(), shared.tobytes())
+        stats = image_cache.stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 2)
+
+    def test_cached_load(self):
+        image_cache.invalidate()
+        before = image_cache.stats()
+        first = load_image(self.test_image_path, cache=True)
+        second = load_image(self.test_image_path, cache=True)
+        stats = image_cache.stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(first.tobytes(), second.tobytes())
+
+        # Callers get copies, so changing one does not touch the cache
+        second.putpixel((0, 0), (0, 0, 0))
+        self.assertEqual(load_image(self.test_image_path, cache=True).getpixel((0, 0)), (255, 255, 255))
+
+        # Saving over the file drops its cached image
+        save_image(Image.new('RGB', (10, 10), color = 'black'), self.test_image_path)
+        self.assertEqual(load_image(self.test_image_path, cache=True).getpixel((0, 0)), (0, 0, 0))
+
+    def test_cached_load_mode(self):
+        image = load_image(self.test_image_path, mode='L', cache=True)
+        self.assertEqual(image.mode, 'L')
+        self.assertEqual(load_image(self.test_image_path, cache=True).mode, 'RGB')
+
+    def test_cache_budget(self):
+        cache = ImageCache(max_bytes=250)
+        for i in range(3):
+            cache.put(('image', i), Image.new('RGB', (10, 4)))
+        self.assertEqual(cache.stats()['images'], 2)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertIsNone(cache.get(('image', 0)))
+        self.assertIsNotNone(cache.get(('image', 2)))
+        cache.put(('large', 0), Image.new('RGB', (100, 100)))
+        self.assertIsNone(cache.get(('large', 0)))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,10 @@
 import pytest
 import unittest
-from src.algorithms.lsb import encode_lsb, decode_lsb
+from src.algorithms.lsb import encode_lsb, decode_lsb, encode_lsb_reference, decode_lsb_reference
 from src.utils.image_utils import load_image, save_image
 from PIL import Image
 import os
+import numpy as np
 
 class TestLSB(unittest.TestCase):
 
@@ -33,5 +34,102 @@ class TestLSB(unittest.TestCase):
 
         self.assertEqual(self.test_message, decoded_message)
 
+    def test_matches_reference(self):
+        # A noisy cover so both LSB values occur before encoding
+        image = Image.frombytes('RGB', (10, 10), os.urandom(300))
+        encoded_image = encode_lsb(image, self.test_message, framed=False)
+        reference_image = encode_lsb_reference(image, self.test_message)
+
+        self.assertEqual(encoded_image.tobytes(), reference_image.tobytes())
+        self.assertEqual(decode_lsb(reference_image), decode_lsb_reference(encoded_image))
+
+    def test_message_longer_than_capacity_is_truncated(self):
+        image = Image.new('RGB', (2, 2), color = 'white')
+        encoded_image = encode_lsb(image, self.test_message, framed=False)
+        reference_image = encode_lsb_reference(image, self.test_message)
+
+        self.assertEqual(encoded_image.tobytes(), reference_image.tobytes())
+
+    def test_bits_per_channel(self):
+        image = Image.frombytes('RGB', (30, 30), os.urandom(2700))
+        message = b'\x00\x01 binary ' * 20
+        touched = []
+        for bits_per_channel in range(1, 5):
+            encoded_image = encode_lsb(image, message, bits_per_channel=bits_per_channel)
+            self.assertEqual(decode_lsb(encoded_image), message)
+            changed = np.any(np.array(encoded_image) != np.array(image), axis=2)
+            touched.append(np.flatnonzero(changed).max())
+        # Denser packing finishes the payload in fewer pixels
+        self.assertEqual(touched, sorted(touched, reverse=True))
+
+    def test_more_bits_extend_capacity(self):
+        image = Image.new('RGB', (20, 20), color = 'white')
+        message = 'x' * 300
+        with self.assertRaises(ValueError):
+            encode_lsb(image, message)
+        self.assertEqual(decode_lsb(encode_lsb(image, message, bits_per_channel=3)), message)
+
+    def test_progress(self):
+        image = Image.frombytes('RGB', (300, 300), os.urandom(300 * 300 * 3))
+        message = "p" * 20000
+        for bits_per_channel in (1, 3):
+            calls = []
+            encoded_image = encode_lsb(image, message, bits_per_channel=bits_per_channel,
+                                       progress=lambda done, total: calls.append((done, total)))
+            done = [call[0] for call in calls]
+            self.assertEqual(done, sorted(done))
+            self.assertEqual(calls[-1], ((20000 + 15) * 8,) * 2)
+
+            calls = []
+            decoded = decode_lsb(encoded_image, progress=lambda done, total: calls.append((done, total)))
+            self.assertEqual(decoded, message)
+            self.assertEqual(calls[-1], ((20000 + 15) * 8,) * 2)
+
+    def test_progress_can_abort(self):
+        image = Image.new('RGB', (300, 300), color = 'white')
+        def abort(done, total):
+            raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            encode_lsb(image, "p" * 20000, progress=abort)
+
+    def test_in_place_matches_copy(self):
+        image = Image.frombytes('RGB', (40, 30), os.urandom(40 * 30 * 3))
+        expected = encode_lsb(image, "In place", bits_per_channel=2)
+        target = image.copy()
+        encoded_image = encode_lsb(target, "In place", bits_per_channel=2, in_place=True)
+        self.assertIs(encoded_image, target)
+        self.assertEqual(encoded_image.tobytes(), expected.tobytes())
+        # Rows past the payload are never touched
+        self.assertEqual(encoded_image.crop((0, 10, 40, 30)).tobytes(), image.crop((0, 10, 40, 30)).tobytes())
+
+    def test_native_modes(self):
+        message = os.urandom(60)
+        for mode in ('RGBA', 'L', 'LA', 'CMYK', 'I;16'):
+            size = 40 * 30 * Image.getmodebands(mode) * (2 if mode == 'I;16' else 1)
+            image = Image.frombytes(mode, (40, 30), os.urandom(size))
+            encoded_image = encode_lsb(image, message)
+            self.assertEqual(encoded_image.mode, mode)
+            self.assertEqual(decode_lsb(encoded_image), message)
+            target = image.copy()
+            self.assertEqual(encode_lsb(target, message, in_place=True).tobytes(), encoded_image.tobytes())
+
+    def test_alpha_extends_capacity(self):
+        message = os.urandom(80)
+        with self.assertRaises(ValueError):
+            encode_lsb(Image.new('RGB', (20, 10)), message)
+        encoded_image = encode_lsb(Image.new('RGBA', (20, 10)), message)
+        self.assertEqual(decode_lsb(encoded_image), message)
+        self.assertEqual(np.array(encoded_image)[:, :, 3].max(), 1)
+
+    def test_palette_images_are_expanded(self):
+        image = Image.new('RGB', (20, 20), color = 'red').convert('P')
+        encoded_image = encode_lsb(image, self.test_message)
+        self.assertEqual(encoded_image.mode, 'RGB')
+        self.assertEqual(decode_lsb(encoded_image), self.test_message)
+        image.info['transparency'] = 0
+        self.assertEqual(encode_lsb(image, self.test_message).mode, 'RGBA')
+        with self.assertRaises(ValueError):
+            encode_lsb(Image.new('F', (20, 20)), self.test_message)
+
 if __name__ == '__main__':
     unittest.main()
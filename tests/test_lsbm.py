@@ -3,6 +3,8 @@ import unittest
 from src.algorithms.lsbm import encode_lsbm, decode_lsbm
 from src.utils.image_utils import load_image, save_image
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import os
 
 class TestLSBM(unittest.TestCase):
@@ -32,5 +34,39 @@ class TestLSBM(unittest.TestCase):
 
         self.assertEqual(self.test_message, decoded_message)
 
+    def test_changes_are_plus_or_minus_one(self):
+        image = Image.frombytes('RGB', (10, 10), os.urandom(300))
+        encoded_image = encode_lsbm(image, self.test_message, seed=1)
+
+        difference = (np.array(encoded_image, dtype=np.int16) - np.array(image, dtype=np.int16)) % 256
+        self.assertTrue(np.isin(difference, (0, 1, 255)).all())
+        self.assertEqual(decode_lsbm(encoded_image), self.test_message)
+
+    def test_sixteen_bit_changes_are_plus_or_minus_one(self):
+        image = Image.frombytes('I;16', (20, 20), os.urandom(800))
+        encoded_image = encode_lsbm(image, self.test_message, seed=1)
+
+        difference = (np.array(encoded_image, dtype=np.int32) - np.array(image, dtype=np.int32)) % 65536
+        self.assertTrue(np.isin(difference, (0, 1, 65535)).all())
+        self.assertEqual(decode_lsbm(encoded_image), self.test_message)
+
+    def test_seeded_encodes_are_deterministic_across_threads(self):
+        image = Image.frombytes('RGB', (40, 40), os.urandom(40 * 40 * 3))
+        seeds = list(range(16))
+        expected = [encode_lsbm(image, self.test_message, seed).tobytes() for seed in seeds]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda seed: encode_lsbm(image, self.test_message, seed).tobytes(), seeds))
+
+        self.assertEqual(results, expected)
+
+    def test_in_place_matches_copy(self):
+        image = Image.frombytes('RGB', (40, 30), os.urandom(40 * 30 * 3))
+        expected = encode_lsbm(image, "In place", seed=5)
+        target = image.copy()
+        encoded_image = encode_lsbm(target, "In place", seed=5, in_place=True)
+        self.assertIs(encoded_image, target)
+        self.assertEqual(encoded_image.tobytes(), expected.tobytes())
+
 if __name__ == '__main__':
     unittest.main()
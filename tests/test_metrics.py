@@ -0,0 +1,98 @@
+import pytest
+import unittest
+import os
+import tempfile
+from PIL import Image
+from src.algorithms.metrics import MetricsRegistry, diff_snapshots, format_snapshot, registry
+from src.algorithms.lsb import encode_lsb, decode_lsb
+from src.utils.image_utils import load_image, save_image
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_stage_records_time_and_counts(self):
+        metrics = MetricsRegistry()
+        with metrics.stage('embed', pixels=10) as counts:
+            counts['bytes'] = 4
+        with metrics.stage('embed', pixels=5):
+            pass
+        stats = metrics.snapshot()['embed']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['pixels'], 15)
+        self.assertEqual(stats['bytes'], 4)
+        self.assertGreaterEqual(stats['seconds'], 0)
+
+    def test_stage_records_on_error(self):
+        metrics = MetricsRegistry()
+        with self.assertRaises(RuntimeError):
+            with metrics.stage('save'):
+                raise RuntimeError("disk full")
+        self.assertEqual(metrics.snapshot()['save']['count'], 1)
+
+    def test_listener(self):
+        metrics = MetricsRegistry()
+        calls = []
+        listener = lambda *args: calls.append(args)
+        metrics.add_listener(listener)
+        metrics.record('load', 0.5, pixels=100, nbytes=300)
+        metrics.remove_listener(listener)
+        metrics.record('load', 0.5)
+        self.assertEqual(calls, [('load', 0.5, 100, 300)])
+
+    def test_disabled(self):
+        metrics = MetricsRegistry()
+        metrics.enabled = False
+        metrics.record('load', 1.0)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_merge_and_diff(self):
+        metrics = MetricsRegistry()
+        metrics.record('pack', 1.0, nbytes=10)
+        before = metrics.snapshot()
+        metrics.record('pack', 2.0, nbytes=5)
+        metrics.record('extract', 1.0, pixels=8)
+        delta = diff_snapshots(metrics.snapshot(), before)
+        self.assertEqual(delta['pack']['bytes'], 5)
+        self.assertEqual(delta['extract']['pixels'], 8)
+
+        other = MetricsRegistry()
+        other.merge(delta)
+        other.merge(delta)
+        self.assertEqual(other.snapshot()['pack']['count'], 2)
+        self.assertEqual(other.snapshot()['pack']['seconds'], 4.0)
+
+    def test_format_snapshot(self):
+        metrics = MetricsRegistry()
+        metrics.record('save', 3.0)
+        metrics.record('load', 1.0)
+        lines = format_snapshot(metrics.snapshot()).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith('load'))
+        self.assertIn('75.0%', lines[2])
+
+class TestPipelineMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'cover.png')
+        Image.new('RGB', (20, 20), color = 'white').save(self.path)
+        registry.reset()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stages_recorded(self):
+        image = load_image(self.path)
+        save_image(encode_lsb(image, "Hello"), self.path)
+        self.assertEqual(decode_lsb(load_image(self.path)), "Hello")
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['load']['count'], 2)
+        self.assertEqual(snapshot['load']['pixels'], 800)
+        self.assertEqual(snapshot['load']['bytes'] > 0, True)
+        self.assertEqual(snapshot['save']['bytes'], os.path.getsize(self.path))
+        self.assertEqual(snapshot['pack']['bytes'], 20)
+        self.assertEqual(snapshot['embed']['bytes'], 20)
+        self.assertEqual(snapshot['extract']['bytes'], 20)
+
+if __name__ == '__main__':
+    unittest.main()
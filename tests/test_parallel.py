@@ -0,0 +1,70 @@
+import pytest
+import unittest
+import os
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+from PIL import Image
+from src.algorithms import parallel
+from src.algorithms.parallel import encode_parallel, decode_parallel
+from src.algorithms.lsb import encode_lsb, decode_lsb
+from src.algorithms.lsbm import encode_lsbm
+from src.algorithms.rlsb import encode_rlsb, decode_rlsb
+
+class TestParallel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        # Small stripes so a small image is split across the workers
+        patcher = mock.patch.object(parallel, 'MIN_STRIPE_PIXELS', 64)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.image = Image.frombytes('RGB', (97, 61), os.urandom(97 * 61 * 3))
+        self.message = "Striped " * 200
+
+    def test_lsb_matches_serial(self):
+        for bits_per_channel in (1, 2, 3):
+            encoded_image = encode_parallel(self.image, self.message, 'lsb', bits_per_channel=bits_per_channel,
+                                            executor=self.executor)
+            self.assertEqual(encoded_image.tobytes(), encode_lsb(self.image, self.message, bits_per_channel=bits_per_channel).tobytes())
+            self.assertEqual(decode_parallel(encoded_image, 'lsb', executor=self.executor), self.message)
+
+    def test_rlsb_matches_serial(self):
+        for bits_per_channel in (1, 4):
+            encoded_image = encode_parallel(self.image, self.message, 'rlsb', seed=77, bits_per_channel=bits_per_channel,
+                                            executor=self.executor)
+            self.assertEqual(encoded_image.tobytes(), encode_rlsb(self.image, self.message, 77, bits_per_channel=bits_per_channel).tobytes())
+            self.assertEqual(decode_parallel(encoded_image, 'rlsb', seed=77, executor=self.executor), self.message)
+
+    def test_binary_payload_and_serial_decode(self):
+        payload = os.urandom(1500)
+        encoded_image = encode_parallel(self.image, payload, 'lsb', bits_per_channel=2, executor=self.executor)
+        self.assertEqual(decode_lsb(encoded_image), payload)
+        encoded_image = encode_parallel(self.image, payload, 'rlsb', seed=3, executor=self.executor)
+        self.assertEqual(decode_rlsb(encoded_image, 3), payload)
+
+    def test_legacy_format(self):
+        encoded_image = encode_parallel(self.image, "legacy", 'lsb', framed=False, executor=self.executor)
+        self.assertEqual(encoded_image.tobytes(), encode_lsb(self.image, "legacy", framed=False).tobytes())
+        self.assertEqual(decode_parallel(encoded_image, 'lsb', executor=self.executor), "legacy")
+
+    def test_serial_fallbacks(self):
+        encoded_image = encode_parallel(self.image, self.message, 'lsbm', seed=5, executor=self.executor)
+        self.assertEqual(encoded_image.tobytes(), encode_lsbm(self.image, self.message, seed=5).tobytes())
+        self.assertEqual(decode_parallel(encoded_image, 'lsbm'), self.message)
+
+        encoded_image = encode_parallel(self.image, self.message, 'rlsb', seed=5, ordering='shuffle', executor=self.executor)
+        self.assertEqual(decode_parallel(encoded_image, 'rlsb', seed=5, ordering='shuffle'), self.message)
+
+    def test_own_pool(self):
+        encoded_image = encode_parallel(self.image, self.message, 'lsb', workers=2)
+        self.assertEqual(decode_parallel(encoded_image, 'lsb', workers=2), self.message)
+
+if __name__ == '__main__':
+    unittest.main()
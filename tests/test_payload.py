@@ -0,0 +1,130 @@
+import pytest
+import unittest
+import unittest.mock
+import numpy as np
+import json
+from src.algorithms import payload
+from src.algorithms.payload import (PayloadError, HEADER_SIZE, pack_payload, payload_segments, read_payload, compress_payload,
+                                    header_pixels, payload_capacity)
+from src.algorithms.lsb import encode_lsb, decode_lsb
+from src.algorithms.lsbm import decode_lsbm
+from src.algorithms.rlsb import encode_rlsb, decode_rlsb
+from PIL import Image
+import os
+
+class TestPayload(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.frombytes('RGB', (40, 40), os.urandom(40 * 40 * 3))
+        self.pulled = 0
+
+    def chunks(self, data, size=8):
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        for start in range(0, bits.size, size):
+            self.pulled += 1
+            yield bits[start:start + size]
+
+    def source(self, data):
+        # A bit source for one-bit-per-channel payloads read from the start
+        def bit_source(start_pixel, bits_per_channel):
+            self.assertEqual((start_pixel, bits_per_channel), (0, 1))
+            return self.chunks(data)
+        return bit_source
+
+    def test_binary_payload_round_trip(self):
+        data = bytes(range(256)) + b'\x00\x00'
+        self.assertEqual(decode_lsb(encode_lsb(self.image, data)), data)
+        self.assertEqual(decode_rlsb(encode_rlsb(self.image, data, 5), 5), data)
+
+    def test_text_beyond_latin1(self):
+        message = 'Grüße, мир, 世界 ✓'
+        self.assertEqual(decode_lsb(encode_lsb(self.image, message)), message)
+
+    def test_wrong_algorithm_rejected(self):
+        with self.assertRaisesRegex(PayloadError, 'lsb, not lsbm'):
+            decode_lsbm(encode_lsb(self.image, 'Hello'))
+
+    def test_wrong_seed_rejected_after_header(self):
+        encoded_image = encode_rlsb(self.image, 'Hello', 5)
+        with self.assertRaises(PayloadError):
+            decode_rlsb(encoded_image, 6, strict=True)
+
+    def test_missing_frame_reads_only_header(self):
+        data = b'\xff' * 1000
+        with self.assertRaisesRegex(PayloadError, 'No lsb payload'):
+            read_payload(self.source(data), 'lsb', len(data) * 8, strict=True)
+        self.assertEqual(self.pulled, HEADER_SIZE)
+
+    def test_reads_exactly_payload_length(self):
+        data = pack_payload(b'abc', 'lsb') + b'\xff' * 1000
+        self.assertEqual(read_payload(self.source(data), 'lsb', len(data) * 8), b'abc')
+        self.assertEqual(self.pulled, HEADER_SIZE + 3)
+
+    def test_checksum_mismatch(self):
+        data = bytearray(pack_payload(b'abc', 'lsb'))
+        data[-1] ^= 0x01
+        with self.assertRaisesRegex(PayloadError, 'checksum'):
+            read_payload(self.source(bytes(data)), 'lsb', len(data) * 8)
+
+    def test_length_beyond_capacity_rejected(self):
+        data = pack_payload(b'a' * 100, 'lsb')
+        with self.assertRaisesRegex(PayloadError, 'holds at most'):
+            read_payload(self.source(data), 'lsb', 50 * 8)
+        self.assertEqual(self.pulled, HEADER_SIZE)
+
+    def test_payload_too_large_for_cover(self):
+        with self.assertRaises(PayloadError):
+            payload_segments('x' * 100, 'lsb', 100 * 8)
+
+    def test_cover_too_small_for_header(self):
+        for size in ((1, 1), (3, 1), (39, 1)):
+            with self.assertRaisesRegex(PayloadError, 'too small'):
+                encode_lsb(Image.new('RGB', size), '')
+        self.assertEqual(decode_lsb(encode_lsb(Image.new('RGB', (40, 1)), '')), '')
+
+    def test_header_pixels_by_bands(self):
+        self.assertEqual([header_pixels(bands) for bands in (1, 2, 3, 4)], [120, 60, 40, 30])
+        self.assertEqual(payload_capacity(100 * 4, 1, 4), (400 - 120) // 8)
+        segments = payload_segments(b'abc', 'lsb', 200, bands=1)
+        self.assertEqual(segments[1][0], 120)
+
+    def test_legacy_message_still_decodes(self):
+        for message in ('Hi', 'A legacy message longer than the header'):
+            self.assertEqual(decode_lsb(encode_lsb(self.image, message, framed=False)), message)
+
+    def test_compression_round_trip(self):
+        message = json.dumps([{'id': i, 'name': 'sensor', 'ok': True} for i in range(60)])
+        for compression in ('auto', 'zlib', 'lzma', 'bz2'):
+            encoded_image = encode_lsb(self.image, message, compression=compression)
+            self.assertEqual(decode_lsb(encoded_image), message)
+        data = bytes(1000)
+        self.assertEqual(decode_rlsb(encode_rlsb(self.image, data, 5, compression='auto'), 5), data)
+
+    def test_compression_extends_capacity(self):
+        message = 'a' * 1000
+        with self.assertRaises(PayloadError):
+            encode_lsb(self.image, message)
+        self.assertEqual(decode_lsb(encode_lsb(self.image, message, compression='auto')), message)
+
+    def test_compression_skipped_when_it_does_not_help(self):
+        data = os.urandom(200)
+        self.assertEqual(compress_payload(data, 'auto'), (None, data))
+        self.assertEqual(pack_payload(data, 'lsb', compression='auto'), pack_payload(data, 'lsb'))
+        codec, compressed = compress_payload(b'x' * 500, 'auto')
+        self.assertIn(codec, ('zlib', 'lzma', 'bz2'))
+        self.assertLess(len(compressed), 500)
+
+    def test_compression_rejected_for_legacy_format(self):
+        with self.assertRaises(ValueError):
+            encode_lsb(self.image, 'Hi', framed=False, compression='zlib')
+        with self.assertRaises(ValueError):
+            compress_payload(b'abc', 'gzip')
+
+    def test_decompression_bomb_rejected(self):
+        data = bytearray(pack_payload(b'\x00' * 5000, 'lsb', compression='zlib'))
+        with unittest.mock.patch.object(payload, 'MAX_DECOMPRESSED_SIZE', 1000):
+            with self.assertRaisesRegex(PayloadError, 'inflates past'):
+                read_payload(self.source(bytes(data)), 'lsb', len(data) * 8)
+
+if __name__ == '__main__':
+    unittest.main()
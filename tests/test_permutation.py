@@ -0,0 +1,39 @@
+import pytest
+import unittest
+import numpy as np
+from src.algorithms.permutation import FeistelPermutation, ShuffledOrder, pixel_order
+
+class TestFeistelPermutation(unittest.TestCase):
+
+    def test_is_bijection(self):
+        for size in (1, 2, 3, 17, 256, 1000, 4097):
+            positions = FeistelPermutation(size, 12345).take(0, size)
+            self.assertEqual(sorted(positions.tolist()), list(range(size)))
+
+    def test_prefix_matches_full_permutation(self):
+        permutation = FeistelPermutation(5000, 7)
+        full = permutation.take(0, 5000)
+        np.testing.assert_array_equal(permutation.take(100, 250), full[100:250])
+        self.assertEqual(permutation[4999], full[4999])
+
+    def test_deterministic_per_seed(self):
+        first = FeistelPermutation(1000, 42).take(0, 1000)
+        again = FeistelPermutation(1000, 42).take(0, 1000)
+        other = FeistelPermutation(1000, 43).take(0, 1000)
+        np.testing.assert_array_equal(first, again)
+        self.assertFalse(np.array_equal(first, other))
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            FeistelPermutation(10, 1)[10]
+
+class TestPixelOrder(unittest.TestCase):
+
+    def test_orderings(self):
+        self.assertIsInstance(pixel_order(4, 3, 1), FeistelPermutation)
+        self.assertIsInstance(pixel_order(4, 3, 1, 'shuffle'), ShuffledOrder)
+        with self.assertRaises(ValueError):
+            pixel_order(4, 3, 1, 'unknown')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import pytest
+import unittest
+import os
+import subprocess
+import sys
+from PIL import Image
+from src.algorithms.registry import Algorithm, algorithm_names, get_algorithm, register_algorithm
+from src.algorithms.lsbm import encode_lsbm
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.new('RGB', (20, 20), color = 'white')
+
+    def test_builtin_algorithms(self):
+        self.assertEqual(algorithm_names(), ['lsb', 'lsbm', 'rlsb'])
+        self.assertEqual(algorithm_names('bits'), ['lsb', 'rlsb'])
+        self.assertEqual(algorithm_names('seed'), ['lsbm', 'rlsb'])
+        self.assertEqual(algorithm_names('striped'), ['lsb', 'rlsb'])
+
+    def test_round_trip(self):
+        for name in algorithm_names():
+            algorithm = get_algorithm(name.upper())
+            encoded_image = algorithm.encode(self.image, "Hello", seed=3, ordering='shuffle')
+            self.assertEqual(algorithm.decode(encoded_image, seed=3, ordering='shuffle'), "Hello")
+
+    def test_options(self):
+        rlsb = get_algorithm('rlsb')
+        encoded_image = rlsb.encode(self.image, "Hello", seed=3, bits=2)
+        self.assertNotEqual(rlsb.decode(encoded_image, seed=4), "Hello")
+        self.assertEqual(rlsb.describe(3), "using RLSB with seed 3")
+        self.assertEqual(get_algorithm('lsb').describe(3), "using LSB")
+        with self.assertRaises(ValueError):
+            get_algorithm('lsbm').encode(self.image, "Hello", bits=2)
+
+    def test_lsbm_seed_is_passed_on(self):
+        lsbm = get_algorithm('lsbm')
+        image = Image.frombytes('RGB', (20, 20), os.urandom(20 * 20 * 3))
+        encodings = [lsbm.encode(image, "Hello", seed=seed).tobytes() for seed in (3, 3, 4)]
+        self.assertEqual(encodings[0], encodings[1])
+        self.assertNotEqual(encodings[0], encodings[2])
+        self.assertEqual(encode_lsbm(image, "Hello", seed=3).tobytes(), encodings[0])
+        self.assertEqual(lsbm.describe(3), "using LSBM with seed 3")
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            get_algorithm('dct')
+        with self.assertRaises(ValueError):
+            Algorithm('dct', 'x:encode', 'x:decode', options=('quality',))
+
+    def test_register_duplicate(self):
+        with self.assertRaises(ValueError):
+            register_algorithm(Algorithm('lsb', '.lsb:encode_lsb', '.lsb:decode_lsb'))
+        with self.assertRaises(ValueError):
+            register_algorithm(Algorithm('auto', '.lsb:encode_lsb', '.lsb:decode_lsb'))
+
+    def test_command_line_imports_lazily(self):
+        code = ("import sys, main, algorithms.registry as r; r.algorithms(); "
+                "print(sorted(m for m in ('PIL', 'numpy', 'PyQt5', 'algorithms.lsb') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+    def test_command_line_save_profiles(self):
+        code = "import main, utils.image_utils as image_utils; print(main.SAVE_PROFILES == tuple(image_utils.SAVE_PROFILES))"
+        output = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), 'True')
+
+if __name__ == '__main__':
+    unittest.main()
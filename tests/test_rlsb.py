@@ -3,6 +3,10 @@ import unittest
 from src.algorithms.rlsb import encode_rlsb, decode_rlsb
 from PIL import Image
 import os
+import random
+import tracemalloc
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 class TestRLSB(unittest.TestCase):
     
@@ -38,6 +42,117 @@ class TestRLSB(unittest.TestCase):
         # Assert that the decoded message is the same as the original message
         self.assertEqual(self.message, decoded_message)
 
+    def encode_original(self, image, message, seed):
+        """The RLSB encoder as it was before the Feistel ordering"""
+        binary_message = ''.join([format(ord(char), '08b') for char in message]) + '00000000'
+        encoded_image = image.copy()
+        pixels = encoded_image.load()
+        width, height = image.size
+        random.seed(seed)
+        pixel_positions = [(x, y) for y in range(height) for x in range(width)]
+        random.shuffle(pixel_positions)
+        idx = 0
+        for x, y in pixel_positions:
+            if idx >= len(binary_message):
+                break
+            channels = list(pixels[x, y])
+            for c in range(3):
+                if idx < len(binary_message):
+                    channels[c] = (channels[c] & 0xFE) | int(binary_message[idx])
+                idx += 1
+            pixels[x, y] = tuple(channels)
+        return encoded_image
+
+    def test_shuffle_ordering_matches_original(self):
+        """Images encoded with the original ordering still decode"""
+        image = Image.frombytes('RGB', (20, 15), os.urandom(20 * 15 * 3))
+        original = self.encode_original(image, self.message, self.seed)
+
+        self.assertEqual(decode_rlsb(original, self.seed, ordering='shuffle'), self.message)
+        encoded_image = encode_rlsb(image, self.message, self.seed, ordering='shuffle', framed=False)
+        self.assertEqual(encoded_image.tobytes(), original.tobytes())
+
+    def test_wrong_seed_does_not_decode(self):
+        image = Image.frombytes('RGB', (20, 15), os.urandom(20 * 15 * 3))
+        encoded_image = encode_rlsb(image, self.message, self.seed)
+        self.assertNotEqual(decode_rlsb(encoded_image, self.seed + 1), self.message)
+
+    def test_concurrent_encodes_keep_their_ordering(self):
+        """Threads encoding with different seeds do not share generator state"""
+        image = Image.frombytes('RGB', (30, 30), os.urandom(30 * 30 * 3))
+        jobs = [(seed, ordering) for seed in range(8) for ordering in ('feistel', 'shuffle')]
+
+        def round_trip(job):
+            seed, ordering = job
+            encoded_image = encode_rlsb(image, self.message, seed, ordering)
+            return decode_rlsb(encoded_image, seed, ordering)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(round_trip, jobs))
+
+        self.assertEqual(results, [self.message] * len(jobs))
+
+    def test_global_random_state_untouched(self):
+        state = random.getstate()
+        image = Image.new('RGB', (10, 10), color = 'white')
+        decode_rlsb(encode_rlsb(image, self.message, self.seed, 'shuffle'), self.seed, 'shuffle')
+        self.assertEqual(random.getstate(), state)
+
+    def test_bits_per_channel(self):
+        image = Image.frombytes('RGB', (20, 15), os.urandom(20 * 15 * 3))
+        for bits_per_channel in range(1, 5):
+            encoded_image = encode_rlsb(image, self.message, self.seed, bits_per_channel=bits_per_channel)
+            self.assertEqual(decode_rlsb(encoded_image, self.seed), self.message)
+
+    def test_progress(self):
+        image = Image.new('RGB', (600, 600), color = 'white')
+        calls = []
+        encoded_image = encode_rlsb(image, "r" * 100000, self.seed,
+                                    progress=lambda done, total: calls.append((done, total)))
+        self.assertGreater(len(calls), 2)
+        self.assertEqual(calls[-1], ((100000 + 15) * 8,) * 2)
+        calls = []
+        decode_rlsb(encoded_image, self.seed, progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual(calls[-1], ((100000 + 15) * 8,) * 2)
+
+    def test_in_place_matches_copy(self):
+        """Encoding in place gives the same pixels as encoding a copy"""
+        image = Image.frombytes('RGB', (90, 70), os.urandom(90 * 70 * 3))
+        for ordering in ('feistel', 'shuffle'):
+            for bits_per_channel, message in ((1, "In place"), (3, os.urandom(700))):
+                expected = encode_rlsb(image, message, self.seed, ordering, bits_per_channel=bits_per_channel)
+                target = image.copy()
+                encoded_image = encode_rlsb(target, message, self.seed, ordering, bits_per_channel=bits_per_channel,
+                                            in_place=True)
+                self.assertIs(encoded_image, target)
+                self.assertEqual(encoded_image.tobytes(), expected.tobytes())
+                self.assertEqual(decode_rlsb(encoded_image, self.seed, ordering), message)
+
+    def test_sixteen_bit_channels(self):
+        """16-bit images keep their high bits and decode as they are"""
+        for mode, dtype in (('I;16', '<u2'), ('I;16B', '>u2')):
+            image = Image.frombytes(mode, (60, 50), os.urandom(60 * 50 * 2))
+            message = os.urandom(1000)
+            encoded_image = encode_rlsb(image, message, self.seed, bits_per_channel=3)
+            self.assertEqual(encoded_image.mode, mode)
+            difference = np.frombuffer(encoded_image.tobytes(), dtype) ^ np.frombuffer(image.tobytes(), dtype)
+            self.assertLess(difference.max(), 8)
+            self.assertEqual(decode_rlsb(encoded_image, self.seed), message)
+
+    def test_short_message_cost_does_not_grow_with_cover(self):
+        """Encoding and decoding a short message allocates the same on small and large covers"""
+        peaks = []
+        for width, height in ((100, 100), (100, 100), (2000, 1500)):
+            image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+            tracemalloc.start()
+            encoded_image = encode_rlsb(image, self.message, self.seed)
+            self.assertEqual(decode_rlsb(encoded_image, self.seed), self.message)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        # The first run is a warm-up; a copy of the large cover's pixels would be 9 MB
+        self.assertLess(peaks[2], 2 * peaks[1] + 64 * 1024)
+        self.assertLess(peaks[2], 2000 * 1500 * 3 // 32)
+
     def tearDown(self):
         """Clean up the test environment"""
         if os.path.exists(self.input_image_path):
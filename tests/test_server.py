@@ -0,0 +1,110 @@
+import pytest
+import unittest
+import asyncio
+import base64
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from PIL import Image
+
+# server.py imports its siblings the way main.py does, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from server import StegoServer, handle_request
+from client import StegoClient
+from algorithms.rlsb import decode_rlsb
+
+def png_base64(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+class TestHandleRequest(unittest.TestCase):
+
+    def test_inline_round_trip(self):
+        cover = png_base64(Image.new('RGB', (20, 20), color = 'white'))
+        response = handle_request({'id': 1, 'action': 'encode', 'algorithm': 'rlsb', 'seed': 7,
+                                   'input_base64': cover, 'message': 'Hello'})
+        self.assertEqual(response['status'], 'ok')
+        self.assertEqual(response['id'], 1)
+        self.assertIn('embed', response['metrics'])
+
+        response = handle_request({'id': 2, 'action': 'decode', 'algorithm': 'rlsb', 'seed': 7,
+                                   'input_base64': response['image_base64']})
+        self.assertEqual(response['message'], 'Hello')
+
+    def test_binary_message(self):
+        cover = png_base64(Image.new('RGB', (20, 20), color = 'white'))
+        payload = bytes([0, 255, 10])
+        response = handle_request({'action': 'encode', 'algorithm': 'lsb', 'input_base64': cover,
+                                   'message_base64': base64.b64encode(payload).decode('ascii')})
+        response = handle_request({'action': 'decode', 'algorithm': 'lsb', 'input_base64': response['image_base64']})
+        self.assertEqual(base64.b64decode(response['payload_base64']), payload)
+
+    def test_errors(self):
+        response = handle_request({'id': 3, 'action': 'decode', 'algorithm': 'dct', 'input': 'missing.png'})
+        self.assertEqual(response['status'], 'error')
+        self.assertIn('dct', response['error'])
+        response = handle_request({'action': 'resize'})
+        self.assertEqual(response['status'], 'error')
+        response = handle_request({'action': 'decode', 'algorithm': 'lsb', 'input': 'missing.png'})
+        self.assertEqual(response['status'], 'error')
+
+    def test_output_format_checked_against_cover_mode(self):
+        buffer = io.BytesIO()
+        Image.new('CMYK', (20, 20)).save(buffer, format='TIFF')
+        cover = base64.b64encode(buffer.getvalue()).decode('ascii')
+        response = handle_request({'action': 'encode', 'algorithm': 'lsb', 'input_base64': cover, 'message': 'x'})
+        self.assertEqual(response['status'], 'error')
+        self.assertIn('CMYK', response['error'])
+        self.assertNotIn('embed', response['metrics'])
+        response = handle_request({'action': 'encode', 'algorithm': 'lsb', 'input_base64': cover, 'message': 'x',
+                                   'format': 'TIFF'})
+        self.assertEqual(response['status'], 'ok')
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        self.socket_path = os.path.join(self.dir, 'server.sock')
+        Image.new('RGB', (20, 20), color = 'white').save(os.path.join(self.dir, 'cover.png'))
+
+        self.server = StegoServer(workers=1)
+        self.thread = threading.Thread(target=asyncio.run, args=(self.server.run_unix(self.socket_path),))
+        self.thread.start()
+        deadline = time.time() + 30
+        while not os.path.exists(self.socket_path):
+            self.assertLess(time.time(), deadline, "server did not start")
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.server.stop()
+        self.thread.join()
+        self.temp_dir.cleanup()
+
+    def test_requests_over_socket(self):
+        output = os.path.join(self.dir, 'stego.png')
+        with StegoClient(self.socket_path) as client:
+            self.assertEqual(client.request('ping')['status'], 'ok')
+            response = client.request('encode', algorithm='rlsb', seed=9, message='Hello',
+                                      input=os.path.join(self.dir, 'cover.png'), output=output)
+            self.assertEqual(response['status'], 'ok')
+            self.assertGreaterEqual(response['total_seconds'], response['seconds'])
+            self.assertEqual(decode_rlsb(Image.open(output), 9), 'Hello')
+
+            response = client.request('decode', algorithm='rlsb', seed=9, input=output)
+            self.assertEqual(response['message'], 'Hello')
+            self.assertEqual(client.request('decode', algorithm='lsb', input='missing.png')['status'], 'error')
+
+    def test_shutdown_request(self):
+        with StegoClient(self.socket_path) as client:
+            self.assertEqual(client.request('shutdown')['status'], 'ok')
+        self.thread.join(30)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+if __name__ == '__main__':
+    unittest.main()
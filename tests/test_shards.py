@@ -0,0 +1,108 @@
+import pytest
+import unittest
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# shards.py imports its siblings the way main.py does, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from shards import SHARD_HEADER_SIZE, pack_shard, unpack_shard, plan_shards, shard_capacity, split_payload, join_payload
+from algorithms.payload import PayloadError
+
+class TestPlanShards(unittest.TestCase):
+
+    def test_fewest_covers(self):
+        plan = plan_shards([100, 500, 300, 50], 700)
+        self.assertEqual([cover for cover, _ in plan], [1, 2])
+        self.assertEqual(sum(length for _, length in plan), 700)
+        for cover, length in plan:
+            self.assertLessEqual(length, [100, 500, 300, 50][cover])
+
+    def test_proportional_lengths(self):
+        self.assertEqual(plan_shards([300, 100], 399), [(0, 300), (1, 99)])
+        self.assertEqual(plan_shards([10, 10, 10], 20), [(0, 10), (1, 10)])
+        self.assertEqual(plan_shards([10, 20], 0), [(1, 0)])
+
+    def test_too_large(self):
+        with self.assertRaises(ValueError):
+            plan_shards([10, 20], 31)
+        with self.assertRaises(ValueError):
+            plan_shards([], 0)
+
+    def test_shard_round_trip(self):
+        blob = pack_shard(b'abc', b'd' * 16, 2, 3, 10, 13)
+        self.assertEqual(len(blob), SHARD_HEADER_SIZE + 3)
+        fields, data = unpack_shard(blob)
+        self.assertEqual(data, b'abc')
+        self.assertEqual((fields['index'], fields['count'], fields['offset'], fields['total']), (2, 3, 10, 13))
+        with self.assertRaises(PayloadError):
+            unpack_shard(blob[:-1] + b'x')
+        with self.assertRaises(PayloadError):
+            unpack_shard("text")
+
+class TestSplitJoin(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        self.covers = []
+        for i, size in enumerate([(40, 30), (100, 80), (60, 60), (20, 20)]):
+            path = os.path.join(self.dir, f'cover{i}.png')
+            Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(path)
+            self.covers.append(path)
+        self.payload = os.urandom(4000)
+        self.payload_path = os.path.join(self.dir, 'payload.bin')
+        with open(self.payload_path, 'wb') as payload_file:
+            payload_file.write(self.payload)
+        self.output_dir = os.path.join(self.dir, 'out')
+        os.makedirs(self.output_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        results = split_payload(self.payload_path, self.covers, self.output_dir, 'rlsb', seed=5, workers=2)
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok'])
+        self.assertEqual([os.path.basename(result['output']) for result in results], ['cover1.png', 'cover2.png'])
+        self.assertLessEqual(results[0]['bytes'], shard_capacity(100, 80))
+
+        # Shards are found in any order, and covers without one are skipped
+        joined = os.path.join(self.dir, 'joined.bin')
+        reported = []
+        covers = [results[1]['output'], self.covers[3], results[0]['output']]
+        summary = join_payload(joined, covers, 'rlsb', seed=5, workers=2, report=reported.append)
+        self.assertEqual((summary['shards'], summary['bytes'], summary['skipped']), (2, 4000, 1))
+        self.assertEqual(len(reported), 3)
+        with open(joined, 'rb') as joined_file:
+            self.assertEqual(joined_file.read(), self.payload)
+
+    def test_missing_shard(self):
+        results = split_payload(self.payload_path, self.covers, self.output_dir, 'lsb', bits=2, compression='auto', workers=1)
+        self.assertEqual(len(results), 1)
+        split_payload(self.payload_path, self.covers, self.output_dir, 'lsb', workers=1)
+        joined = os.path.join(self.dir, 'joined.bin')
+        with self.assertRaises(PayloadError):
+            join_payload(joined, [os.path.join(self.output_dir, 'cover1.png')], 'lsb', workers=1)
+        self.assertFalse(os.path.exists(joined))
+
+    def test_mixed_payloads(self):
+        split_payload(self.payload_path, self.covers[:3], self.output_dir, 'lsb', workers=1)
+        other_dir = os.path.join(self.dir, 'other')
+        os.makedirs(other_dir)
+        with open(self.payload_path, 'wb') as payload_file:
+            payload_file.write(os.urandom(50))
+        other = split_payload(self.payload_path, self.covers[3:], other_dir, 'lsb', workers=1)
+        joined = os.path.join(self.dir, 'joined.bin')
+        covers = [os.path.join(self.output_dir, 'cover1.png'), os.path.join(self.output_dir, 'cover2.png'), other[0]['output']]
+        with self.assertRaises(PayloadError):
+            join_payload(joined, covers, 'lsb', workers=1)
+
+    def test_does_not_fit(self):
+        with self.assertRaises(ValueError):
+            split_payload(self.payload_path, self.covers[3:], self.output_dir, 'lsb', workers=1)
+        with self.assertRaises(ValueError):
+            split_payload(self.payload_path, self.covers, self.output_dir, 'lsbm', bits=2, workers=1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import pytest
+import unittest
+import numpy as np
+from src.algorithms.tiled import map_pixels, encode_file, decode_file
+from src.algorithms.lsb import decode_lsb
+from src.algorithms.lsbm import decode_lsbm
+from src.algorithms.rlsb import decode_rlsb
+from PIL import Image
+import os
+import tempfile
+
+class TestTiled(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # An odd width so BMP rows are padded
+        self.image = Image.frombytes('RGB', (37, 23), os.urandom(37 * 23 * 3))
+        self.message = 'Tiled message ' * 5
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def save(self, name, **params):
+        path = os.path.join(self.temp_dir.name, name)
+        self.image.save(path, **params)
+        return path
+
+    def test_map_pixels_matches_decoded_image(self):
+        for name in ('cover.bmp', 'cover.ppm', 'cover.tif'):
+            pixels = map_pixels(self.save(name))
+            self.assertIsNotNone(pixels, name)
+            np.testing.assert_array_equal(pixels, np.array(self.image))
+
+    def test_compressed_formats_are_not_mapped(self):
+        self.assertIsNone(map_pixels(self.save('cover.png')))
+        self.assertIsNone(map_pixels(self.save('cover_lzw.tif', compression='tiff_lzw')))
+
+    def test_encode_file_through_memory_map(self):
+        decoders = {
+            'lsb': lambda image: decode_lsb(image),
+            'lsbm': lambda image: decode_lsbm(image),
+            'rlsb': lambda image: decode_rlsb(image, 7),
+        }
+        for name in ('cover.bmp', 'cover.ppm', 'cover.tif'):
+            input_path = self.save(name)
+            for algorithm, decode in decoders.items():
+                output_path = os.path.join(self.temp_dir.name, f'{algorithm}_{name}')
+                mapped = encode_file(input_path, output_path, self.message, algorithm, seed=7, chunk_pixels=100)
+                self.assertTrue(mapped)
+                self.assertEqual(decode_file(output_path, algorithm, seed=7, chunk_pixels=100), self.message)
+                with Image.open(output_path) as encoded_image:
+                    self.assertEqual(decode(encoded_image), self.message)
+
+    def test_encode_file_bits_per_channel(self):
+        input_path = self.save('cover.bmp')
+        output_path = os.path.join(self.temp_dir.name, 'encoded.bmp')
+        for algorithm in ('lsb', 'rlsb'):
+            self.assertTrue(encode_file(input_path, output_path, self.message, algorithm, seed=3, bits_per_channel=4))
+            self.assertEqual(decode_file(output_path, algorithm, seed=3), self.message)
+
+    def test_encode_file_falls_back_to_pillow(self):
+        input_path = self.save('cover.png')
+        output_path = os.path.join(self.temp_dir.name, 'encoded.png')
+        self.assertFalse(encode_file(input_path, output_path, self.message, 'lsb'))
+        self.assertEqual(decode_file(output_path, 'lsb'), self.message)
+
+        # The fallback saves through save_image, so lossy outputs are refused
+        with self.assertRaises(ValueError):
+            encode_file(input_path, os.path.join(self.temp_dir.name, 'encoded.jpg'), self.message, 'lsb')
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, 'encoded.jpg')))
+
+if __name__ == '__main__':
+    unittest.main()